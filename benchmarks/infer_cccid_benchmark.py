@@ -0,0 +1,67 @@
+"""
+Report paths per second for path based cccId inference: the original
+per-path loop printing one line at a time, against the streaming
+DtsRunner.infer_cccIds with a buffered TSV writer, in one process and
+across a process pool.
+
+usage: python -m benchmarks.infer_cccid_benchmark [--paths N] [--jobs N]
+"""
+from __future__ import print_function
+
+import argparse
+import multiprocessing
+import os
+import time
+
+from ccc_client import DtsRunner
+from ccc_client.utils import TsvWriter
+
+
+def synthetic_paths(n):
+    for i in range(n):
+        yield "/archive/project{0}/run{1}/sample{2}.bam".format(
+            i % 50, i % 1000, i
+        )
+
+
+def per_path_loop(runner, n, out):
+    for filepath in synthetic_paths(n):
+        cccId = runner.infer_cccId(filepath, "SHA-1")
+        print("{0}\t{1}".format(filepath, cccId), file=out)
+        out.flush()
+
+
+def streaming(runner, n, out, jobs):
+    results = runner.infer_cccIds(synthetic_paths(n), "SHA-1", jobs=jobs)
+    with TsvWriter(out) as writer:
+        for filepath, cccId, _ in results:
+            writer.writerow(filepath, cccId)
+
+
+def paths_per_second(func, n, *args):
+    with open(os.devnull, "w") as out:
+        start = time.time()
+        func(DtsRunner(), n, out, *args)
+        return n / (time.time() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--paths", type=int, default=500000)
+    parser.add_argument("--jobs", type=int,
+                        default=multiprocessing.cpu_count())
+    args = parser.parse_args()
+
+    results = [
+        ("per-path loop", paths_per_second(per_path_loop, args.paths)),
+        ("streaming, --jobs 1",
+         paths_per_second(streaming, args.paths, 1)),
+        ("streaming, --jobs {0}".format(args.jobs),
+         paths_per_second(streaming, args.paths, args.jobs)),
+    ]
+    for name, rate in results:
+        print("{0:<30}{1:>12.0f} paths/s".format(name, rate))
+
+
+if __name__ == "__main__":
+    main()
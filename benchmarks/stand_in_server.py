@@ -0,0 +1,205 @@
+"""
+Minimal local stand-in for the CCC services, used by the benchmarks
+and tests.
+
+Speaks HTTP/1.1 with keep-alive so that connection reuse on the client side
+is actually observable. Every request is answered with a small JSON body.
+
+ChunkedUploadHandler adds the AppRepo chunked upload endpoints used by
+AppRepoRunner.upload_image_chunked; see start_upload_server.
+"""
+from __future__ import print_function
+
+import hashlib
+import json
+import threading
+import uuid
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body go out in separate writes; without TCP_NODELAY a
+    # kept-alive connection stalls on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def _iter_body(self, block_size=1024 * 1024):
+        """
+        Yield the request body in blocks, whether it is sent with a
+        Content-Length or with chunked transfer encoding.
+        """
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            while True:
+                size = int(self.rfile.readline().split(b";")[0], 16)
+                if size == 0:
+                    # trailer, up to the closing blank line
+                    while self.rfile.readline() not in (b"\r\n", b"\n", b""):
+                        pass
+                    return
+                while size > 0:
+                    data = self.rfile.read(min(size, block_size))
+                    size -= len(data)
+                    yield data
+                self.rfile.readline()
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        while length > 0:
+            data = self.rfile.read(min(length, block_size))
+            length -= len(data)
+            yield data
+
+    def _respond(self, status=200, body=None, drain=True):
+        if drain:
+            # discard the body a block at a time so that large uploads do
+            # not inflate the server's memory
+            for _ in self._iter_body():
+                pass
+        if body is None:
+            body = {"path": self.path, "method": self.command}
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        self._respond()
+
+    def do_POST(self):
+        self._respond(201)
+
+    def do_PUT(self):
+        self._respond()
+
+    def do_DELETE(self):
+        self._respond()
+
+    def log_message(self, *args):
+        pass
+
+
+class ChunkedUploadHandler(StandInHandler):
+    """
+    Keeps uploads in memory on the server: `server.uploads` maps uploadId
+    to {"meta": ..., "chunks": {index: bytes}}, `server.chunk_puts` lists
+    the chunk indices received, and an index in `server.fail_chunks` is
+    refused once with a 500, to interrupt a transfer.
+    """
+    prefix = "/api/v1/tool/upload"
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length).decode("utf-8"))
+
+    def _route(self):
+        if self.path == self.prefix:
+            return None, None
+        if not self.path.startswith(self.prefix + "/"):
+            return False, None
+        parts = self.path[len(self.prefix) + 1:].split("/")
+        with self.server.lock:
+            upload = self.server.uploads.get(parts[0])
+        return upload, parts[1:]
+
+    def do_POST(self):
+        upload, rest = self._route()
+        if upload is False:
+            return StandInHandler.do_POST(self)
+        if rest is None:
+            uploadId = uuid.uuid4().hex
+            with self.server.lock:
+                self.server.uploads[uploadId] = {"meta": self._read_json(),
+                                                 "chunks": {}}
+            return self._respond(201, {"uploadId": uploadId}, drain=False)
+        if upload is None or rest != ["complete"]:
+            return self._respond(404)
+
+        digests = self._read_json()["chunks"]
+        with self.server.lock:
+            chunks = dict(upload["chunks"])
+        if sorted(chunks) != list(range(len(digests))) or any(
+            hashlib.sha256(chunks[i]).hexdigest() != digest
+            for i, digest in enumerate(digests)
+        ):
+            return self._respond(400, {"error": "chunks do not match"},
+                                 drain=False)
+        sha256 = hashlib.sha256()
+        size = 0
+        for i in range(len(digests)):
+            sha256.update(chunks[i])
+            size += len(chunks[i])
+        body = dict(upload["meta"], size=size, sha256=sha256.hexdigest())
+        self._respond(201, body, drain=False)
+
+    def do_GET(self):
+        upload, rest = self._route()
+        if upload is False:
+            return StandInHandler.do_GET(self)
+        if upload is None:
+            return self._respond(404)
+        with self.server.lock:
+            received = sorted(upload["chunks"])
+        self._respond(body={"chunks": received})
+
+    def do_PUT(self):
+        upload, rest = self._route()
+        if upload is False:
+            return StandInHandler.do_PUT(self)
+        if upload is None or len(rest) != 1:
+            return self._respond(404)
+        index = int(rest[0])
+        length = int(self.headers.get("Content-Length") or 0)
+        data = self.rfile.read(length)
+        with self.server.lock:
+            self.server.chunk_puts.append(index)
+            if index in self.server.fail_chunks:
+                self.server.fail_chunks.discard(index)
+                return self._respond(500, drain=False)
+        if hashlib.sha256(data).hexdigest() != \
+                self.headers.get("X-Chunk-Sha256"):
+            return self._respond(400, {"error": "checksum mismatch"},
+                                 drain=False)
+        with self.server.lock:
+            upload["chunks"][index] = data
+        self._respond(drain=False)
+
+
+class StandInServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def start_server(handler=StandInHandler, host="127.0.0.1", port=0):
+    """
+    Start a stand-in server in a background thread. Returns the server;
+    its bound port is `server.server_address[1]`.
+    """
+    server = StandInServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+def start_upload_server(fail_chunks=()):
+    """
+    Start a stand-in server that also implements the chunked upload
+    endpoints, refusing each chunk in `fail_chunks` once.
+    """
+    server = StandInServer(("127.0.0.1", 0), ChunkedUploadHandler)
+    server.lock = threading.Lock()
+    server.uploads = {}
+    server.chunk_puts = []
+    server.fail_chunks = set(fail_chunks)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
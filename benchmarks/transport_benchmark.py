@@ -0,0 +1,64 @@
+"""
+Compare calls per second for DtsRunner.get against a local stand-in server
+using module-level requests calls (a new connection per call) versus the
+pooled HttpTransport.
+
+usage: python -m benchmarks.transport_benchmark [--calls N]
+"""
+from __future__ import print_function
+
+import argparse
+import time
+
+import requests
+
+from benchmarks.stand_in_server import start_server
+from ccc_client import DtsRunner
+from ccc_client.transport import HttpTransport
+
+
+class UnpooledTransport(object):
+    """
+    Mimics the pre-transport behaviour: every call goes through the
+    module-level requests functions and opens a fresh connection.
+    """
+    def get(self, url, **kwargs):
+        return requests.get(url, **kwargs)
+
+
+def calls_per_second(runner, calls):
+    start = time.time()
+    for i in range(calls):
+        r = runner.get("bench-{0}".format(i))
+        assert r.status_code == 200
+    return calls / (time.time() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    server = start_server()
+    port = server.server_address[1]
+    try:
+        unpooled = DtsRunner("127.0.0.1", port,
+                             transport=UnpooledTransport())
+        with HttpTransport() as transport:
+            pooled = DtsRunner("127.0.0.1", port, transport=transport)
+            results = [
+                ("requests.get (no pooling)",
+                 calls_per_second(unpooled, args.calls)),
+                ("HttpTransport (keep-alive)",
+                 calls_per_second(pooled, args.calls)),
+            ]
+    finally:
+        server.shutdown()
+
+    for name, rate in results:
+        print("{0:<30}{1:>10.1f} calls/s".format(name, rate))
+    print("speedup: {0:.2f}x".format(results[1][1] / results[0][1]))
+
+
+if __name__ == "__main__":
+    main()
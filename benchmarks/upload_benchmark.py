@@ -0,0 +1,112 @@
+"""
+Report peak client memory and throughput for AppRepoRunner.upload_image
+against a local stand-in server: requests' own multipart encoding (which
+builds the whole body in memory) versus the streaming MultipartEncoder.
+
+Each upload runs in its own process so its peak RSS can be read back.
+
+usage: python -m benchmarks.upload_benchmark [--sizes MB [MB ...]]
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+from benchmarks.stand_in_server import start_server
+from ccc_client import AppRepoRunner
+
+
+def buffered_upload(port, path):
+    # the original upload_image request
+    with open(path, "rb") as fh:
+        return requests.post(
+            "http://127.0.0.1:{0}/api/v1/tool".format(port),
+            files={"file": fh,
+                   "imageName": (None, "bench"),
+                   "imageTag": (None, "latest")}
+        )
+
+
+def streaming_upload(port, path):
+    return AppRepoRunner("127.0.0.1", port).upload_image(path, "bench",
+                                                         "latest")
+
+
+MODES = [
+    ("requests files= (buffered)", buffered_upload),
+    ("MultipartEncoder (streaming)", streaming_upload),
+]
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    if sys.platform == "darwin":
+        return peak / (1024.0 * 1024)
+    return peak / 1024.0
+
+
+def synthetic_tarball(path, size_mb):
+    block = os.urandom(1024 * 1024)
+    with open(path, "wb") as fh:
+        for _ in range(size_mb):
+            fh.write(block)
+
+
+def child(mode, port, path):
+    func = dict(MODES)[mode]
+    start = time.time()
+    r = func(port, path)
+    elapsed = time.time() - start
+    assert r.status_code == 201, r.status_code
+    print(elapsed, peak_rss_mb())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[256, 1024, 2048],
+                        help="tarball sizes in MB")
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        mode, port, path = args.child
+        child(mode, int(port), path)
+        return
+
+    root = tempfile.mkdtemp()
+    server = start_server()
+    port = server.server_address[1]
+    try:
+        print("{0:<30}{1:>10}{2:>14}{3:>12}".format(
+            "", "size (MB)", "peak RSS (MB)", "MB/s"
+        ))
+        for size in args.sizes:
+            path = os.path.join(root, "image-{0}.tar".format(size))
+            synthetic_tarball(path, size)
+            for name, _ in MODES:
+                out = subprocess.check_output([
+                    sys.executable, "-m", "benchmarks.upload_benchmark",
+                    "--child", name, str(port), path
+                ])
+                elapsed, rss = [float(v) for v in out.split()]
+                print("{0:<30}{1:>10}{2:>14.0f}{3:>12.1f}".format(
+                    name, size, rss, size / elapsed
+                ))
+            os.remove(path)
+    finally:
+        server.shutdown()
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,12 +6,14 @@ from ccc_client.dcs.DcsRunner import DcsRunner
 from ccc_client.app_repo.AppRepoRunner import AppRepoRunner
 from ccc_client.exec_engine.ExecEngineRunner import ExecEngineRunner
 from ccc_client.eve_mongo.EveMongoRunner import EveMongoRunner
+from ccc_client.transport import HttpTransport
 
 __all__ = ["DtsRunner",
            "DcsRunner",
            "AppRepoRunner",
            "ExecEngineRunner",
-           "EveMongoRunner"]
+           "EveMongoRunner",
+           "HttpTransport"]
 
 __version__ = "undefined"
 try:
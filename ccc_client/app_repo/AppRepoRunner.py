@@ -1,19 +1,36 @@
 from __future__ import print_function
 
+import hashlib
 import json
 import os
 import re
 import sys
-import requests
 import uuid
-from ccc_client.utils import parseAuthToken
+
+from requests.compat import urljoin
+
+from ccc_client.app_repo import chunked
+from ccc_client.app_repo.image import FileRegion, HashingReader, \
+    ManifestReader, image_name_from_manifest, read_layout, read_manifest, \
+    region_sha256
+from ccc_client.app_repo.multipart import MultipartEncoder, remaining_size
+from ccc_client.transport import get_default_transport
+from ccc_client.utils import Journal, bounded_map, parseAuthToken
+
+
+# media types of the manifests put by push_image_layers; docker save
+# layers are uncompressed tars
+OCI_MANIFEST = "application/vnd.oci.image.manifest.v1+json"
+OCI_CONFIG = "application/vnd.oci.image.config.v1+json"
+OCI_LAYER = "application/vnd.oci.image.layer.v1.tar"
 
 
 class AppRepoRunner(object):
     """
     Send requests to the AppRepo
     """
-    def __init__(self, host=None, port=None, authToken=None):
+    def __init__(self, host=None, port=None, authToken=None,
+                 transport=None):
 
         if host is not None:
             self.host = re.sub("^http[s]?://",  "", host)
@@ -30,35 +47,225 @@ class AppRepoRunner(object):
         else:
             self.authToken = ""
 
+        if transport is not None:
+            self.transport = transport
+        else:
+            self.transport = get_default_transport()
+
         self.endpoint = "api/v1/tool"
 
         self.headers = {
             "Authorization": " ".join(["Bearer", self.authToken])
         }
 
-    def upload_image(self, imageBlob, imageName, imageTag):
+    def upload_image(self, imageBlob, imageName=None, imageTag=None):
+        """
+        Upload a `docker save` tarball: `imageBlob` is its path, "-" for
+        stdin, or a readable binary file object, which is not closed. The
+        image is streamed as it is read, never held in memory.
+
+        A missing `imageName` or `imageTag` is taken from the first
+        RepoTag in the image's manifest.json, else from the file name and
+        "latest". A pipe is sent with chunked transfer encoding and, as
+        its manifest is only seen at the end, the name fields after it.
+
+        The SHA-256 of the image is computed as it is sent and set as the
+        `sha256` attribute of the returned response (None if the image
+        was not read to the end).
+        """
+        if imageBlob == "-":
+            imageBlob = getattr(sys.stdin, "buffer", sys.stdin)
+        if hasattr(imageBlob, "read"):
+            return self.__upload_image_stream(imageBlob, imageName, imageTag)
+        with open(imageBlob, 'rb') as image:
+            return self.__upload_image_stream(image, imageName, imageTag)
+
+    def __upload_image_stream(self, image, imageName, imageTag):
         endpoint = "http://{0}:{1}/{2}".format(self.host,
                                                self.port,
                                                self.endpoint)
+        filename = _stream_filename(image)
 
-        if imageName is None:
-            imageName = re.sub("(\.tar)", "",
-                               os.path.basename(imageBlob))
+        if imageName is not None and imageTag is not None:
+            names = [imageName, imageTag]
+        elif remaining_size(image) is not None:
+            names = _resolve_image_name(imageName, imageTag,
+                                        read_manifest(image), filename)
+        else:
+            image = ManifestReader(image)
+            resolved = []
 
-        if imageTag is None:
-            imageTag = "latest"
+            def resolve(index):
+                if not resolved:
+                    resolved.extend(_resolve_image_name(
+                        imageName, imageTag, image.manifest, filename
+                    ))
+                return resolved[index]
 
-        form_data = {'file': open(imageBlob, 'rb'),
-                     "imageName": (None, imageName),
-                     "imageTag": (None, imageTag)}
+            names = [lambda: resolve(0), lambda: resolve(1)]
 
+        image = HashingReader(image)
+        body = MultipartEncoder([
+            ("file", (filename or "image.tar", image)),
+            ("imageName", names[0]),
+            ("imageTag", names[1])
+        ])
         headers = self.__setup_call_headers("post")
-        response = requests.post(endpoint,
-                                 files=form_data,
-                                 headers=headers)
+        headers["Content-Type"] = body.content_type
+        response = self.transport.post(endpoint,
+                                       data=body,
+                                       headers=headers)
+        response.sha256 = image.hexdigest()
         return response
 
-    def upload_metadata(self, imageId, metadata):
+    def upload_image_chunked(self, imageBlob, imageName=None, imageTag=None,
+                             chunk_size=chunked.CHUNK_SIZE, jobs=4,
+                             journal=None):
+        """
+        Upload an image in pieces of `chunk_size` bytes, sending up to
+        `jobs` at a time, each with its SHA-256 for the server to check.
+
+        Chunks the server has accepted are recorded in the `journal` file
+        (by default one under ~/.ccc_client keyed on the image), so if the
+        upload is interrupted, running it again sends only the chunks that
+        are still missing. Raises ValueError if any chunk fails; returns
+        the response to completing the upload.
+        """
+        if imageName is None or imageTag is None:
+            with open(imageBlob, 'rb') as image:
+                imageName, imageTag = _resolve_image_name(
+                    imageName, imageTag, read_manifest(image),
+                    os.path.basename(imageBlob)
+                )
+
+        if journal is None:
+            journal = chunked.default_journal_path(self.host, self.port,
+                                                   imageBlob, chunk_size)
+        size = os.path.getsize(imageBlob)
+        count = chunked.num_chunks(size, chunk_size)
+        endpoint = "http://{0}:{1}/{2}/upload".format(self.host,
+                                                      self.port,
+                                                      self.endpoint)
+        headers = self.__setup_call_headers("post", "application/json")
+
+        done = Journal(journal)
+        try:
+            uploadId, digests = self.__resume_upload(endpoint, done)
+            if uploadId is None and len(done):
+                # the server no longer knows the journalled upload
+                done.close()
+                os.remove(journal)
+                done = Journal(journal)
+            if uploadId is None:
+                response = self.transport.post(
+                    endpoint,
+                    data=json.dumps({"imageName": imageName,
+                                     "imageTag": imageTag,
+                                     "size": size,
+                                     "chunkSize": chunk_size,
+                                     "chunks": count}, sort_keys=True),
+                    headers=headers
+                )
+                if response.status_code // 100 != 2:
+                    print("[ERROR] unable to start the upload of",
+                          imageBlob, file=sys.stderr)
+                    print("[STATUS CODE - {0}] {1}".format(
+                        response.status_code, response.text
+                    ), file=sys.stderr)
+                    raise ValueError
+                uploadId = response.json()["uploadId"]
+                done.add("upload {0}".format(uploadId))
+
+            chunk_headers = self.__setup_call_headers(
+                "put", "application/octet-stream"
+            )
+
+            def send_chunk(index):
+                data = chunked.read_chunk(imageBlob, index, chunk_size)
+                digest = hashlib.sha256(data).hexdigest()
+                call_headers = dict(chunk_headers)
+                call_headers["X-Chunk-Sha256"] = digest
+                r = self.transport.put(
+                    "{0}/{1}/{2}".format(endpoint, uploadId, index),
+                    data=data,
+                    headers=call_headers
+                )
+                return digest, r
+
+            missing = [i for i in range(count) if i not in digests]
+            failed = 0
+            for index, result, error in bounded_map(send_chunk, missing,
+                                                    jobs):
+                if error is None and result[1].status_code // 100 == 2:
+                    digests[index] = result[0]
+                    done.add("chunk {0} {1}".format(index, result[0]))
+                    continue
+                failed += 1
+                if error is None:
+                    error = "[STATUS CODE - {0}] {1}".format(
+                        result[1].status_code, result[1].text
+                    )
+                print("[ERROR] chunk {0} of {1} failed: {2}".format(
+                    index, imageBlob, error
+                ), file=sys.stderr)
+            if failed:
+                print("[ERROR] {0} of {1} chunks failed; upload again to "
+                      "send only those".format(failed, count),
+                      file=sys.stderr)
+                raise ValueError
+
+            response = self.transport.post(
+                "{0}/{1}/complete".format(endpoint, uploadId),
+                data=json.dumps({"chunks": [digests[i]
+                                            for i in range(count)]}),
+                headers=headers
+            )
+        finally:
+            done.close()
+
+        if response.status_code // 100 == 2:
+            os.remove(journal)
+        return response
+
+    def __resume_upload(self, endpoint, done):
+        """
+        Return the upload id in the journal `done` and the digests of its
+        chunks that the server still has, or (None, {}).
+        """
+        uploadId = None
+        digests = {}
+        for key in done.done:
+            fields = key.split()
+            if fields[0] == "upload":
+                uploadId = fields[1]
+            elif fields[0] == "chunk":
+                digests[int(fields[1])] = fields[2]
+        if uploadId is None:
+            return None, {}
+
+        response = self.transport.get(
+            "{0}/{1}".format(endpoint, uploadId),
+            headers=self.__setup_call_headers("get")
+        )
+        if response.status_code == 404:
+            return None, {}
+        if response.status_code // 100 != 2:
+            print("[ERROR] unable to resume upload", uploadId,
+                  file=sys.stderr)
+            print("[STATUS CODE - {0}] {1}".format(response.status_code,
+                                                   response.text),
+                  file=sys.stderr)
+            raise ValueError
+        received = set(response.json()["chunks"])
+        return uploadId, dict((i, digest) for i, digest in digests.items()
+                              if i in received)
+
+    def upload_metadata(self, imageId, metadata, sha256=None):
+        """
+        Create the metadata entry of an image. `sha256`, such as the
+        digest set on the response of upload_image, is recorded in the
+        metadata as "imageSha256".
+        """
         response = self.get_metadata(imageId)
         if response.status_code // 100 == 2:
             m = "[ERROR] An entry with this id already exists in the database"
@@ -66,12 +273,13 @@ class AppRepoRunner(object):
             print(response.text, file=sys.stderr)
             raise ValueError
         else:
-            self.__create_or_update_metadata(imageId, metadata)
+            return self.__create_or_update_metadata(imageId, metadata,
+                                                    sha256)
 
-    def update_metadata(self, imageId, metadata):
-        self.__create_or_update_metadata(imageId, metadata)
+    def update_metadata(self, imageId, metadata, sha256=None):
+        return self.__create_or_update_metadata(imageId, metadata, sha256)
 
-    def __create_or_update_metadata(self, imageId, metadata):
+    def __create_or_update_metadata(self, imageId, metadata, sha256=None):
         if isinstance(metadata, str):
             if os.path.isfile(metadata):
                 with open(metadata) as metadata_filehandle:
@@ -96,12 +304,15 @@ class AppRepoRunner(object):
             else:
                 assert loaded_metadata['id'] == imageId
 
+        if sha256 is not None:
+            loaded_metadata['imageSha256'] = sha256
+
         headers = self.__setup_call_headers("put")
         endpoint = "http://{0}:{1}/{2}/{3}".format(self.host,
                                                    self.port,
                                                    self.endpoint,
                                                    imageId)
-        response = requests.put(
+        response = self.transport.put(
             endpoint,
             data=json.dumps(loaded_metadata, sort_keys=True),
             headers=headers
@@ -114,7 +325,7 @@ class AppRepoRunner(object):
                                                    self.endpoint,
                                                    image_id_or_name)
         headers = self.__setup_call_headers("get")
-        response = requests.get(
+        response = self.transport.get(
             endpoint,
             headers=headers
         )
@@ -124,7 +335,7 @@ class AppRepoRunner(object):
                                                             self.endpoint,
                                                             image_id_or_name)
             headers = self.__setup_call_headers("get")
-            response = requests.get(
+            response = self.transport.get(
                 endpoint,
                 headers=headers
             )
@@ -136,28 +347,175 @@ class AppRepoRunner(object):
                                                    self.endpoint,
                                                    imageId)
         headers = self.__setup_call_headers("delete")
-        response = requests.delete(
+        response = self.transport.delete(
             endpoint,
             headers=headers
         )
         return response
 
     def list_tools(self):
-        if self.host == "central-gateway.ccc.org":
-            host = "docker-centos7"
-        else:
-            host = self.host
-        endpoint = "https://{0}:5000/v2/_catalog".format(host)
-        response = requests.get(
+        endpoint = "{0}/_catalog".format(self.__registry_endpoint())
+        response = self.transport.get(
             endpoint,
             verify=False
         )
         return response
 
-    def __setup_call_headers(self, method):
+    def push_image_layers(self, imageBlob, imageName=None, imageTag=None,
+                          jobs=4):
+        """
+        Push the `docker save` tarball at `imageBlob` to the registry
+        layer by layer, through its v2 API, sending only the blobs it does
+        not already have.
+
+        The config and every layer are hashed, up to `jobs` at a time, and
+        the registry is asked which of those blobs exist; the rest are
+        uploaded, then an OCI image manifest referencing them is put under
+        the image's tag. imageName and imageTag default as for
+        upload_image. Raises ValueError if a blob cannot be uploaded.
+
+        Returns the response to the manifest PUT, with the digests of the
+        blobs sent set as its `pushed` attribute and those the registry
+        already had as `existing`.
+        """
+        manifest, config, layers = read_layout(imageBlob)
+        imageName, imageTag = _resolve_image_name(
+            imageName, imageTag, manifest, os.path.basename(imageBlob)
+        )
+        registry = self.__registry_endpoint()
+
+        def hash_blob(region):
+            return "sha256:" + region_sha256(imageBlob, *region)
+
+        digests = {}
+        for region, digest, error in bounded_map(hash_blob,
+                                                 set([config] + layers),
+                                                 jobs):
+            if error is not None:
+                raise error
+            digests[region] = digest
+
+        # identical layers are one blob
+        blobs = dict((digest, region) for region, digest in digests.items())
+
+        def blob_exists(digest):
+            r = self.transport.head(
+                "{0}/{1}/blobs/{2}".format(registry, imageName, digest),
+                verify=False
+            )
+            return r.status_code // 100 == 2
+
+        def push_blob(digest):
+            r = self.transport.post(
+                "{0}/{1}/blobs/uploads/".format(registry, imageName),
+                verify=False
+            )
+            if r.status_code // 100 != 2:
+                return r
+            location = urljoin(registry + "/", r.headers["Location"])
+            sep = "&" if "?" in location else "?"
+            return self.transport.put(
+                "{0}{1}digest={2}".format(location, sep, digest),
+                data=FileRegion(imageBlob, *blobs[digest]),
+                headers={"Content-Type": "application/octet-stream"},
+                verify=False
+            )
+
+        missing = []
+        existing = []
+        for digest, found, error in bounded_map(blob_exists, sorted(blobs),
+                                                jobs):
+            if found:
+                existing.append(digest)
+            else:
+                missing.append(digest)
+
+        pushed = []
+        failed = 0
+        for digest, r, error in bounded_map(push_blob, missing, jobs):
+            if error is None and r.status_code // 100 == 2:
+                pushed.append(digest)
+                continue
+            failed += 1
+            if error is None:
+                error = "[STATUS CODE - {0}] {1}".format(r.status_code,
+                                                         r.text)
+            print("[ERROR] unable to push blob {0}: {1}".format(
+                digest, error
+            ), file=sys.stderr)
+        if failed:
+            print("[ERROR] {0} of {1} blobs could not be pushed; the image "
+                  "manifest was not".format(failed, len(missing)),
+                  file=sys.stderr)
+            raise ValueError
+
+        image_manifest = {
+            "schemaVersion": 2,
+            "mediaType": OCI_MANIFEST,
+            "config": {
+                "mediaType": OCI_CONFIG,
+                "digest": digests[config],
+                "size": config[1]
+            },
+            "layers": [
+                {"mediaType": OCI_LAYER,
+                 "digest": digests[layer],
+                 "size": layer[1]}
+                for layer in layers
+            ]
+        }
+        response = self.transport.put(
+            "{0}/{1}/manifests/{2}".format(registry, imageName, imageTag),
+            data=json.dumps(image_manifest, sort_keys=True),
+            headers={"Content-Type": OCI_MANIFEST},
+            verify=False
+        )
+        response.pushed = pushed
+        response.existing = existing
+        return response
+
+    def __registry_endpoint(self):
+        if self.host == "central-gateway.ccc.org":
+            host = "docker-centos7"
+        else:
+            host = self.host
+        return "https://{0}:5000/v2".format(host)
+
+    def __setup_call_headers(self, method, content_type=None):
         call_header = self.headers.copy()
-        if method == "post":
+        if content_type is not None:
+            call_header.update({'Content-Type': content_type})
+        elif method == "post":
             call_header.update({'Content-Type': 'multipart/form-data'})
         else:
             call_header.update({'Content-Type': 'application/json'})
         return call_header
+
+
+def _stream_filename(fileobj):
+    name = getattr(fileobj, "name", None)
+    if not isinstance(name, str) or name.startswith("<"):
+        # stdin and other unnamed streams
+        return None
+    return os.path.basename(name)
+
+
+def _resolve_image_name(imageName, imageTag, manifest, filename):
+    """
+    Fill in a missing imageName or imageTag from the image's manifest.json
+    (bytes, or None), else from the tarball's `filename` and "latest".
+    """
+    found_name, found_tag = None, None
+    if manifest is not None:
+        found_name, found_tag = image_name_from_manifest(manifest)
+    if imageName is None:
+        imageName = found_name
+    if imageName is None and filename is not None:
+        imageName = re.sub("(\.tar)", "", filename)
+    if imageName is None:
+        print("[ERROR] no imageName given and none found in the image's",
+              "manifest", file=sys.stderr)
+        raise ValueError
+    if imageTag is None:
+        imageTag = found_tag or "latest"
+    return imageName, imageTag
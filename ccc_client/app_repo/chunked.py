@@ -0,0 +1,39 @@
+from __future__ import print_function
+
+import hashlib
+import os
+
+
+CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def default_journal_path(host, port, imageBlob, chunk_size=CHUNK_SIZE):
+    """
+    Resume journals are kept under ~/.ccc_client, one per AppRepo instance
+    and image file. The file's size and mtime are part of the key, so a
+    rebuilt image never resumes an upload of the old one.
+    """
+    st = os.stat(imageBlob)
+    key = "{0}\0{1}\0{2}\0{3}".format(os.path.abspath(imageBlob),
+                                      st.st_size, st.st_mtime, chunk_size)
+    return os.path.join(
+        os.path.expanduser("~"), ".ccc_client", "app-repo-uploads",
+        "{0}-{1}-{2}.journal".format(
+            host, port, hashlib.sha1(key.encode("utf-8")).hexdigest()
+        )
+    )
+
+
+def num_chunks(size, chunk_size=CHUNK_SIZE):
+    # an empty image is still sent as one (empty) chunk
+    return max(1, (size + chunk_size - 1) // chunk_size)
+
+
+def read_chunk(imageBlob, index, chunk_size=CHUNK_SIZE):
+    """
+    Read chunk `index` of the file; each call opens the file itself, so
+    chunks can be read from several threads at once.
+    """
+    with open(imageBlob, "rb") as fh:
+        fh.seek(index * chunk_size)
+        return fh.read(chunk_size)
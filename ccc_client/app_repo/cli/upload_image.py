@@ -1,16 +1,53 @@
+from __future__ import print_function
+
 import argparse
+import sys
 
 from ccc_client.app_repo.AppRepoRunner import AppRepoRunner
+from ccc_client.transport import get_transport
 from ccc_client.utils import print_API_response
 
 
 def run(args):
-    runner = AppRepoRunner(args.host, args.port, args.authToken)
-    r = runner.upload_image(args.imageBlob, args.imageName, args.imageTag)
+    runner = AppRepoRunner(args.host, args.port, args.authToken,
+                           transport=get_transport(args.jobs))
+    mode = "--chunked" if args.chunked else "--layers"
+    if args.chunked and args.layers:
+        print("[ERROR] --chunked and --layers cannot be combined",
+              file=sys.stderr)
+        raise ValueError
+    if (args.chunked or args.layers) and args.imageBlob == "-":
+        print("[ERROR] {0} needs an image file; it cannot read from "
+              "stdin".format(mode), file=sys.stderr)
+        raise ValueError
+    if (args.chunked or args.layers) and args.recordDigest:
+        print("[ERROR] --recordDigest is not available with {0}; the image "
+              "is not read in order".format(mode), file=sys.stderr)
+        raise ValueError
+
+    if args.layers:
+        r = runner.push_image_layers(args.imageBlob, args.imageName,
+                                     args.imageTag, jobs=args.jobs)
+        print("pushed {0} blobs; {1} were already in the registry".format(
+            len(r.pushed), len(r.existing)
+        ), file=sys.stderr)
+    elif args.chunked:
+        r = runner.upload_image_chunked(
+            args.imageBlob, args.imageName, args.imageTag,
+            chunk_size=args.chunkSize * 1024 * 1024, jobs=args.jobs,
+            journal=args.journal
+        )
+    else:
+        r = runner.upload_image(args.imageBlob, args.imageName,
+                                args.imageTag)
+        print("image sha256:", r.sha256, file=sys.stderr)
     print_API_response(r)
 
     if args.metadata is not None:
-        r = runner.upload_metadata(None, args.metadata)
+        if args.recordDigest:
+            r = runner.upload_metadata(None, args.metadata, sha256=r.sha256)
+        else:
+            r = runner.upload_metadata(None, args.metadata)
         print_API_response(r)
 
 
@@ -19,20 +56,57 @@ parser.set_defaults(runner=run)
 parser.add_argument(
     "--imageBlob", "-b",
     type=str,
-    help="name of file or path"
+    help="path of a 'docker save' tarball, or '-' to read it from stdin"
 )
 parser.add_argument(
     "--imageName", "-n",
     type=str,
-    help="name of docker image"
+    help="name of docker image (default: from the image's manifest)"
 )
 parser.add_argument(
     "--imageTag", "-t",
     type=str,
-    default="latest",
-    help="docker image version tag"
+    help="docker image version tag (default: from the image's manifest, "
+         "else latest)"
 )
 parser.add_argument(
     "--metadata", "-m", type=str,
     help="tool metadata; can be a filepath or json string"
 )
+parser.add_argument(
+    "--recordDigest",
+    action="store_true",
+    help="record the SHA-256 of the image, computed while it is sent, as "
+         "imageSha256 in the --metadata"
+)
+parser.add_argument(
+    "--chunked",
+    action="store_true",
+    help="upload in checksummed chunks, several at a time; an interrupted "
+         "upload resumes where it stopped when run again"
+)
+parser.add_argument(
+    "--layers",
+    action="store_true",
+    help="push the image's layers straight to the registry, skipping "
+         "those it already has"
+)
+parser.add_argument(
+    "--chunkSize",
+    type=int,
+    default=8,
+    help="with --chunked, chunk size in MB (default: 8)"
+)
+parser.add_argument(
+    "--jobs", "-j",
+    type=int,
+    default=4,
+    help="with --chunked or --layers, number of chunks or layers to send "
+         "concurrently (default: 4)"
+)
+parser.add_argument(
+    "--journal",
+    type=str,
+    help="with --chunked, file recording the chunks sent (default: one "
+         "per image under ~/.ccc_client/app-repo-uploads)"
+)
@@ -0,0 +1,277 @@
+from __future__ import print_function
+
+import hashlib
+import json
+import posixpath
+import tarfile
+
+
+MANIFEST = "manifest.json"
+_BLOCK = 512
+# members larger than this are never buffered, whatever their name
+_MAX_CAPTURE = 16 * 1024 * 1024
+
+
+def parse_repo_tag(repo_tag):
+    """
+    Split a `docker save` RepoTag such as "registry:5000/tools/bwa:0.7"
+    into its image name, without the registry, and its tag (None if it
+    has none).
+    """
+    name, sep, tag = repo_tag.rpartition(":")
+    if not sep or "/" in tag:
+        name, tag = repo_tag, None
+    first, sep, rest = name.partition("/")
+    if sep and ("." in first or ":" in first or first == "localhost"):
+        name = rest
+    return name, tag
+
+
+def image_name_from_manifest(manifest):
+    """
+    Return (imageName, imageTag) from the first RepoTag in the bytes of a
+    `docker save` manifest.json, or (None, None) if it has none.
+    """
+    try:
+        entries = json.loads(manifest.decode("utf-8"))
+        repo_tags = entries[0].get("RepoTags") or []
+    except (ValueError, IndexError, KeyError, AttributeError, TypeError):
+        return None, None
+    if not repo_tags:
+        return None, None
+    return parse_repo_tag(repo_tags[0])
+
+
+def read_manifest(fileobj):
+    """
+    Return the manifest.json of the `docker save` tarball `fileobj`, which
+    must be seekable, or None. The file is left where it was.
+    """
+    position = fileobj.tell()
+    try:
+        with tarfile.open(fileobj=fileobj, mode="r:") as tar:
+            member = tar.extractfile(_find_member(tar))
+            return member.read() if member is not None else None
+    except (tarfile.TarError, KeyError):
+        return None
+    finally:
+        fileobj.seek(position)
+
+
+def _find_member(tar):
+    for name in (MANIFEST, "./" + MANIFEST):
+        try:
+            return tar.getmember(name)
+        except KeyError:
+            pass
+    raise KeyError(MANIFEST)
+
+
+def read_layout(path):
+    """
+    Locate the parts of the `docker save` tarball at `path`: returns the
+    bytes of its manifest.json, and the (offset, size) within the file of
+    the first image's config and of each of its layers, in order.
+    """
+    with tarfile.open(path, mode="r:") as tar:
+        manifest = tar.extractfile(_find_member(tar)).read()
+        entry = json.loads(manifest.decode("utf-8"))[0]
+        config = _region(tar, entry["Config"])
+        layers = [_region(tar, name) for name in entry["Layers"]]
+    return manifest, config, layers
+
+
+def _region(tar, name):
+    member = tar.getmember(name)
+    # docker save links layers shared between images to one copy
+    for _ in range(16):
+        if member.issym():
+            name = posixpath.normpath(posixpath.join(
+                posixpath.dirname(member.name), member.linkname
+            ))
+        elif member.islnk():
+            name = member.linkname
+        else:
+            return member.offset_data, member.size
+        member = tar.getmember(name)
+    raise tarfile.TarError("too many links to {0}".format(name))
+
+
+def region_sha256(path, offset, size, block_size=1024 * 1024):
+    """
+    Return the hex SHA-256 of `size` bytes of the file at `path` from
+    `offset`.
+    """
+    sha256 = hashlib.sha256()
+    region = FileRegion(path, offset, size)
+    data = region.read(block_size)
+    while data:
+        sha256.update(data)
+        data = region.read(block_size)
+    return sha256.hexdigest()
+
+
+class FileRegion(object):
+    """
+    A readable stream of `size` bytes of the file at `path` from `offset`,
+    such as one member of a tarball, to send as a request body; `len` is
+    its size. The file is opened on the first read and closed at the end.
+    """
+    def __init__(self, path, offset, size):
+        self.path = path
+        self.offset = offset
+        self.len = size
+        self._left = size
+        self._fh = None
+
+    def read(self, size=-1):
+        if self._fh is None and self._left:
+            self._fh = open(self.path, "rb")
+            self._fh.seek(self.offset)
+        if size < 0 or size > self._left:
+            size = self._left
+        data = self._fh.read(size) if size else b""
+        # a file cut short ends the region early
+        self._left = self._left - len(data) if data else 0
+        if not self._left:
+            self.close()
+        return data
+
+    def close(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+
+class HashingReader(object):
+    """
+    Wrap a file object, feeding everything read from it to a SHA-256 as
+    it goes by, so the image's digest costs no second pass over it. Other
+    attributes are those of the wrapped file.
+    """
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.sha256 = hashlib.sha256()
+        self.complete = False
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        if data:
+            self.sha256.update(data)
+        elif size != 0:
+            self.complete = True
+        return data
+
+    def hexdigest(self):
+        """
+        The SHA-256 of what was read, or None until the end of the file
+        has been reached.
+        """
+        if not self.complete:
+            return None
+        return self.sha256.hexdigest()
+
+    def __getattr__(self, name):
+        return getattr(self.fileobj, name)
+
+
+class ManifestReader(object):
+    """
+    Wrap a (possibly unseekable) `docker save` stream, passing reads
+    through while picking manifest.json out of the tar as it goes by.
+    `manifest` holds its bytes once they have been read, else None.
+    """
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.name = getattr(fileobj, "name", None)
+        self.manifest = None
+        self._buffer = bytearray()
+        self._skip = 0
+        self._member = None
+        self._next_name = None
+        self._next_size = None
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        if data:
+            self._feed(data)
+        return data
+
+    def image_name(self):
+        if self.manifest is None:
+            return None, None
+        return image_name_from_manifest(self.manifest)
+
+    def _feed(self, data):
+        self._buffer.extend(data)
+        while True:
+            if self._skip:
+                n = min(self._skip, len(self._buffer))
+                del self._buffer[:n]
+                self._skip -= n
+                if self._skip:
+                    return
+            if self._member is not None:
+                kind, size, padded = self._member
+                if len(self._buffer) < padded:
+                    return
+                self._capture(kind, bytes(self._buffer[:size]))
+                del self._buffer[:padded]
+                self._member = None
+                continue
+            if len(self._buffer) < _BLOCK:
+                return
+            header = bytes(self._buffer[:_BLOCK])
+            del self._buffer[:_BLOCK]
+            self._header(header)
+
+    def _header(self, header):
+        if header.count(b"\0") == _BLOCK:
+            # end of archive padding
+            return
+        name = header[0:100].split(b"\0", 1)[0].decode("utf-8", "replace")
+        if header[257:262] == b"ustar":
+            prefix = header[345:500].split(b"\0", 1)[0]
+            if prefix:
+                name = prefix.decode("utf-8", "replace") + "/" + name
+        size = _tar_number(header[124:136])
+        kind = header[156:157]
+        if self._next_name is not None:
+            name, self._next_name = self._next_name, None
+        if self._next_size is not None:
+            size, self._next_size = self._next_size, None
+
+        padded = (size + _BLOCK - 1) // _BLOCK * _BLOCK
+        if size <= _MAX_CAPTURE and (
+            kind in (b"x", b"L") or
+            (kind in (b"0", b"\0") and name in (MANIFEST, "./" + MANIFEST))
+        ):
+            self._member = (kind, size, padded)
+        else:
+            self._skip = padded
+
+    def _capture(self, kind, data):
+        if kind == b"L":
+            # GNU long name of the next member
+            self._next_name = data.rstrip(b"\0").decode("utf-8", "replace")
+        elif kind == b"x":
+            # pax extended header: "<length> <key>=<value>\n" records
+            for record in data.split(b"\n"):
+                _, _, keyvalue = record.partition(b" ")
+                key, _, value = keyvalue.partition(b"=")
+                if key == b"path":
+                    self._next_name = value.decode("utf-8", "replace")
+                elif key == b"size":
+                    self._next_size = int(value)
+        else:
+            self.manifest = data
+
+
+def _tar_number(field):
+    if field[0:1] and ord(field[0:1]) & 0x80:
+        # GNU base-256 encoding, for members of 8 GB and over
+        n = 0
+        for byte in bytearray(field[1:]):
+            n = n << 8 | byte
+        return n
+    return int(field.strip(b"\0 ") or b"0", 8)
@@ -0,0 +1,127 @@
+from __future__ import print_function
+
+import io
+import os
+import stat
+import uuid
+from collections import deque
+
+
+class MultipartEncoder(object):
+    """
+    A multipart/form-data body that is read from its files as it is sent,
+    instead of being assembled in memory.
+
+    `fields` is a list of (name, value) pairs where value is a str, a
+    callable returning one (called when the part is reached, so it can
+    depend on the files before it), or a (filename, fileobj) or
+    (filename, fileobj, content_type) tuple for a file part. File parts
+    are read from their current position and not closed.
+
+    Pass the encoder as `data=` with `content_type` as the Content-Type
+    header: requests reads the body a block at a time, so memory use does
+    not grow with the size of the files. `len` is the size of the body,
+    which requests sends as Content-Length, or None when a file part is
+    not seekable or a value is callable; the body is then sent with
+    chunked transfer encoding.
+    """
+    block_size = 1024 * 1024
+
+    def __init__(self, fields, boundary=None):
+        if boundary is None:
+            boundary = uuid.uuid4().hex
+        self.boundary = boundary
+        self.content_type = "multipart/form-data; boundary={0}".format(
+            boundary
+        )
+
+        self._parts = deque()
+        self.len = 0
+        for name, value in fields:
+            if isinstance(value, tuple):
+                filename, fileobj = value[:2]
+                content_type = "application/octet-stream"
+                if len(value) > 2:
+                    content_type = value[2]
+                header = (
+                    'Content-Disposition: form-data; name="{0}"; '
+                    'filename="{1}"\r\nContent-Type: {2}\r\n\r\n'
+                ).format(name, filename, content_type)
+                self._add_bytes("--{0}\r\n{1}".format(boundary, header))
+                self._parts.append(fileobj)
+                self._add_length(remaining_size(fileobj))
+                self._add_bytes("\r\n")
+            elif callable(value):
+                self._add_bytes(
+                    '--{0}\r\nContent-Disposition: form-data; name="{1}"'
+                    '\r\n\r\n'.format(boundary, name)
+                )
+                self._parts.append(value)
+                self._add_length(None)
+                self._add_bytes("\r\n")
+            else:
+                self._add_bytes(
+                    '--{0}\r\nContent-Disposition: form-data; name="{1}"'
+                    '\r\n\r\n{2}\r\n'.format(boundary, name, value)
+                )
+        self._add_bytes("--{0}--\r\n".format(boundary))
+
+    def _add_bytes(self, text):
+        data = text.encode("utf-8")
+        self._parts.append(io.BytesIO(data))
+        self._add_length(len(data))
+
+    def _add_length(self, size):
+        if size is None or self.len is None:
+            self.len = None
+        else:
+            self.len += size
+
+    def read(self, size=-1):
+        """
+        Return the next `size` bytes of the body, or all that is left if
+        `size` is negative; b"" once the body has been sent.
+        """
+        chunks = []
+        wanted = size
+        while self._parts and wanted != 0:
+            if callable(self._parts[0]):
+                value = "{0}".format(self._parts[0]())
+                self._parts[0] = io.BytesIO(value.encode("utf-8"))
+            data = self._parts[0].read(wanted)
+            if not data:
+                self._parts.popleft()
+                continue
+            chunks.append(data)
+            if wanted > 0:
+                wanted -= len(data)
+        return b"".join(chunks)
+
+    def __iter__(self):
+        while True:
+            data = self.read(self.block_size)
+            if not data:
+                return
+            yield data
+
+
+def remaining_size(fileobj):
+    """
+    Return the number of bytes left to read from `fileobj`, or None if
+    that cannot be known without reading it, as for a pipe.
+    """
+    try:
+        st = os.fstat(fileobj.fileno())
+        if not stat.S_ISREG(st.st_mode):
+            return None
+        return st.st_size - fileobj.tell()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        pass
+    try:
+        position = fileobj.tell()
+        fileobj.seek(0, os.SEEK_END)
+        end = fileobj.tell()
+        fileobj.seek(position)
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+    return end - position
@@ -44,6 +44,12 @@ services = {
         'delete': ccc_client.dts.cli.delete,
         'infer-cccId': ccc_client.dts.cli.infer_cccid,
         'query': ccc_client.dts.cli.query,
+        'sync': ccc_client.dts.cli.sync,
+        'build-bloom': ccc_client.dts.cli.build_bloom,
+        'relocate': ccc_client.dts.cli.relocate,
+        'delete-prefix': ccc_client.dts.cli.delete_prefix,
+        'watch': ccc_client.dts.cli.watch,
+        'reconcile': ccc_client.dts.cli.reconcile,
     },
     'dcs': {
         'create-link': ccc_client.dcs.cli.create_link,
@@ -52,6 +58,8 @@ services = {
         'list-resources': ccc_client.dcs.cli.list_resources,
         'delete-link': ccc_client.dcs.cli.delete_link,
         'delete-set': ccc_client.dcs.cli.delete_set,
+        'walk': ccc_client.dcs.cli.walk,
+        'sync': ccc_client.dcs.cli.sync,
     },
     'eve-mongo': {
         'status': ccc_client.eve_mongo.cli.status,
@@ -3,16 +3,21 @@ from __future__ import print_function
 import json
 import uuid
 import re
-import requests
+from collections import OrderedDict
 
-from ccc_client.utils import parseAuthToken
+from ccc_client.dcs.adjacency import CHILDREN, PARENTS, parse_ids, \
+    parse_items
+from ccc_client.transport import get_default_transport
+from ccc_client.utils import bounded_map, cached_response, chunked, \
+    parseAuthToken
 
 
 class DcsRunner(object):
     """
     Send requests to the DCS
     """
-    def __init__(self, host=None, port=None, authToken=None):
+    def __init__(self, host=None, port=None, authToken=None,
+                 transport=None, adjacency=None):
 
         if host is not None:
             self.host = re.sub("^http[s]?://",  "", host)
@@ -29,6 +34,11 @@ class DcsRunner(object):
         else:
             self.authToken = ""
 
+        if transport is not None:
+            self.transport = transport
+        else:
+            self.transport = get_default_transport()
+
         self.headers = {
             "Content-Type": "application/json",
             "Authorization": " ".join(["Bearer", self.authToken])
@@ -36,19 +46,48 @@ class DcsRunner(object):
 
         self.endpoint = "api/v1/dcs"
 
+        # optional ccc_client.dcs.adjacency.AdjacencyCache; list_sets,
+        # list_resources and find_common_sets answer from it when they
+        # can, and changes to links invalidate it
+        self.adjacency = adjacency
+
     def create_link(self, setId, cccId):
         endpoint = "http://{0}:{1}/{2}/resourceLink".format(self.host,
                                                             self.port,
                                                             self.endpoint)
         payload = json.dumps(self._set_relationship(setId, cccId))
-        response = requests.put(endpoint,
-                                data=payload,
-                                headers=self.headers)
+        response = self.transport.put(endpoint,
+                                      data=payload,
+                                      headers=self.headers)
+        if self.adjacency is not None:
+            self.adjacency.invalidate_link(setId, cccId)
         return response
 
-    def find_common_sets(self, ids):
+    def create_links(self, setId, cccIds, jobs=4, ordered=False):
+        """
+        Link a stream of cccIds to `setId` with at most `jobs` requests in
+        flight. Yields (cccId, response, error) tuples in completion
+        order, or in input order if `ordered`; a failed link does not stop
+        the rest.
+        """
+        def link(cccId):
+            return self.create_link(setId, cccId)
+
+        return bounded_map(link, cccIds, jobs, ordered=ordered)
+
+    def find_common_sets(self, ids, chunk_size=None, jobs=4):
+        """
+        Find the sets that contain all of `ids`.
+
+        With `chunk_size`, `ids` may be any iterable: it is searched
+        `chunk_size` ids at a time with at most `jobs` searches in flight,
+        and the answers are intersected here. The result is a JSON list of
+        the matching entries of the first chunk's answer.
+        """
         if isinstance(ids, str):
             ids = [ids]
+        elif chunk_size is not None:
+            return self._find_common_sets_chunked(ids, chunk_size, jobs)
         else:
             assert isinstance(ids, list) is True
 
@@ -57,8 +96,15 @@ class DcsRunner(object):
             self.port,
             self.endpoint
         )
+        if self.adjacency is not None:
+            common = self.adjacency.common_parents(ids)
+            if common is not None:
+                return cached_response(endpoint, json.dumps(common))
+
         payload = json.dumps(self._common_ids(ids))
-        response = requests.post(endpoint, data=payload, headers=self.headers)
+        response = self.transport.post(endpoint,
+                                       data=payload,
+                                       headers=self.headers)
         return response
 
     def list_sets(self, cccId):
@@ -68,29 +114,136 @@ class DcsRunner(object):
             self.endpoint,
             cccId
         )
-        response = requests.get(endpoint, headers=self.headers)
-        return response
+        return self._list(PARENTS, cccId, endpoint)
 
-    def list_resources(self, setId):
+    def list_resources(self, setId, fresh=False):
+        """
+        List the members of `setId`. With `fresh`, the adjacency cache is
+        not consulted, only refreshed with the server's answer.
+        """
         endpoint = "http://{0}:{1}/{2}/resource/{3}/children".format(
             self.host,
             self.port,
             self.endpoint,
             setId
         )
-        response = requests.get(endpoint, headers=self.headers)
-        return response
+        return self._list(CHILDREN, setId, endpoint, fresh)
+
+    def walk(self, setId, jobs=4):
+        """
+        Expand the hierarchy under `setId` breadth first, listing the
+        children of up to `jobs` nodes at a time. Every node is listed
+        once, so shared subsets and cycles are not walked twice.
+
+        Yields (cccId, error) tuples as they are found: a node without
+        children is a leaf and comes with error None; a node whose
+        children could not be listed comes with the failed response or
+        exception.
+        """
+        visited = set([setId])
+        frontier = [setId]
+        while frontier:
+            level = []
+            for node, r, error in bounded_map(self.list_resources, frontier,
+                                              jobs):
+                if error is None and r.status_code // 100 != 2 and \
+                        r.status_code != 404:
+                    error = r
+                if error is not None:
+                    yield node, error
+                    continue
+                children = []
+                if r.status_code != 404:
+                    try:
+                        children = parse_ids(r.text)
+                    except ValueError as e:
+                        yield node, e
+                        continue
+                if not children and node != setId:
+                    yield node, None
+                for child in children:
+                    if child not in visited:
+                        visited.add(child)
+                        level.append(child)
+            frontier = level
+
+    def sync(self, membership, jobs=4, prune=True, dry_run=False):
+        """
+        Make the DCS membership of the sets in `membership`, a dict of
+        setId -> iterable of cccIds, match it. The current members of
+        every set are listed concurrently, from the server even when an
+        adjacency cache is attached, and only the missing links are
+        created and, if `prune`, the extra ones deleted, with at most
+        `jobs` requests in flight.
+
+        Yields (action, setId, cccId, response, error) tuples, where
+        action is "link" or "unlink", or "read" (cccId None) for a set
+        whose members could not be listed and which is left alone. With
+        `dry_run`, the changes are yielded without being applied.
+        """
+        membership = dict((setId, set(cccIds))
+                          for setId, cccIds in membership.items())
+
+        def list_fresh(setId):
+            return self.list_resources(setId, fresh=True)
+
+        changes = []
+        for setId, r, error in bounded_map(list_fresh, sorted(membership),
+                                           jobs):
+            if error is None and r.status_code == 404:
+                # a new set, created by its first link
+                current = set()
+            elif error is None and r.status_code // 100 == 2:
+                try:
+                    current = set(parse_ids(r.text))
+                except ValueError as e:
+                    yield "read", setId, None, r, e
+                    continue
+            else:
+                yield "read", setId, None, r, error
+                continue
+            wanted = membership[setId]
+            changes.extend(("link", setId, cccId)
+                           for cccId in sorted(wanted - current))
+            if prune:
+                changes.extend(("unlink", setId, cccId)
+                               for cccId in sorted(current - wanted))
+
+        if dry_run:
+            for action, setId, cccId in changes:
+                yield action, setId, cccId, None, None
+            return
+
+        def apply_change(change):
+            action, setId, cccId = change
+            if action == "link":
+                return self.create_link(setId, cccId)
+            return self.delete_link(setId, cccId)
+
+        for change, r, error in bounded_map(apply_change, changes, jobs):
+            yield change + (r, error)
 
     def delete_link(self, setId, cccId):
         endpoint = "http://{0}:{1}/{2}/resourceLink".format(self.host,
                                                             self.port,
                                                             self.endpoint)
         payload = json.dumps(self._set_relationship(setId, cccId))
-        response = requests.delete(endpoint,
-                                   data=payload,
-                                   headers=self.headers)
+        response = self.transport.delete(endpoint,
+                                         data=payload,
+                                         headers=self.headers)
+        if self.adjacency is not None:
+            self.adjacency.invalidate_link(setId, cccId)
         return response
 
+    def delete_links(self, setId, cccIds, jobs=4, ordered=False):
+        """
+        Unlink a stream of cccIds from `setId`; works like create_links.
+        """
+        def unlink(cccId):
+            return self.delete_link(setId, cccId)
+
+        return bounded_map(unlink, cccIds, jobs, ordered=ordered)
+
     def delete_set(self, setId):
         endpoint = "http://{0}:{1}/{2}/resource/{3}".format(
             self.host,
@@ -98,7 +251,57 @@ class DcsRunner(object):
             self.endpoint,
             setId
         )
-        response = requests.delete(endpoint, headers=self.headers)
+        response = self.transport.delete(endpoint, headers=self.headers)
+        if self.adjacency is not None:
+            self.adjacency.invalidate_set(setId)
+        return response
+
+    def _find_common_sets_chunked(self, ids, chunk_size, jobs):
+        endpoint = "http://{0}:{1}/{2}/resourceLink/search".format(
+            self.host,
+            self.port,
+            self.endpoint
+        )
+        common = None
+        results = bounded_map(self.find_common_sets,
+                              chunked(ids, chunk_size), jobs, ordered=True)
+        try:
+            for chunk, response, error in results:
+                if error is not None:
+                    raise error
+                if response.status_code // 100 != 2:
+                    return response
+                items = parse_items(response.text)
+                if common is None:
+                    common = OrderedDict(items)
+                else:
+                    found = set(i for i, _ in items)
+                    common = OrderedDict(
+                        (i, item) for i, item in common.items() if i in found
+                    )
+                if not common:
+                    # nothing later chunks say can add to an empty answer
+                    break
+        finally:
+            results.close()
+
+        if common is None:
+            common = {}
+        return cached_response(endpoint, json.dumps(list(common.values())))
+
+    def _list(self, kind, node, endpoint, fresh=False):
+        if self.adjacency is not None and not fresh:
+            body = self.adjacency.get(kind, node)
+            if body is not None:
+                return cached_response(endpoint, body)
+        response = self.transport.get(endpoint, headers=self.headers)
+        if self.adjacency is not None and response.status_code // 100 == 2:
+            try:
+                ids = parse_ids(response.text)
+            except ValueError:
+                pass
+            else:
+                self.adjacency.put(kind, node, response.text, ids)
         return response
 
     @staticmethod
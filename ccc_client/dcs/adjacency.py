@@ -0,0 +1,283 @@
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+PARENTS = "parents"
+CHILDREN = "children"
+
+
+def default_adjacency_path(host, port):
+    """
+    Caches are kept per DCS instance under ~/.ccc_client
+    """
+    return os.path.join(
+        os.path.expanduser("~"), ".ccc_client",
+        "dcs-adjacency-{0}-{1}.sqlite".format(host, port)
+    )
+
+
+cache_parser = argparse.ArgumentParser(add_help=False)
+cache_parser.add_argument(
+    '--no-cache',
+    dest='no_cache',
+    action='store_true',
+    help='bypass the local cache of set membership'
+)
+cache_parser.add_argument(
+    '--cacheTtl',
+    type=int,
+    default=3600,
+    help='seconds cached set membership is trusted for (default: 3600)'
+)
+
+
+def attach_adjacency(runner, args):
+    """
+    Give the DcsRunner `runner` the on-disk AdjacencyCache of its DCS,
+    unless --no-cache was given; for commands whose parser has
+    cache_parser among its parents.
+    """
+    if not args.no_cache:
+        runner.adjacency = AdjacencyCache(
+            default_adjacency_path(runner.host, runner.port),
+            ttl=args.cacheTtl
+        )
+    return runner.adjacency
+
+
+def parse_ids(text):
+    """
+    Pull the list of ids out of a DCS response body listing resources or
+    sets: a JSON list of ids, or of objects carrying one, possibly wrapped
+    in an object.
+    """
+    return [i for i, _ in parse_items(text)]
+
+
+def parse_items(text):
+    """
+    Like parse_ids, but return (id, item) pairs where item is the JSON
+    value the id came from.
+    """
+    found = json.loads(text)
+    if isinstance(found, dict):
+        for key in ("ids", "cccIds", PARENTS, CHILDREN, "resources", "sets"):
+            if isinstance(found.get(key), list):
+                found = found[key]
+                break
+        else:
+            found = [found]
+    items = []
+    for item in found:
+        i = item
+        if isinstance(item, dict):
+            key = next((k for k in ("cccId", "id", "setId") if k in item),
+                       None)
+            if key is None:
+                raise ValueError("no id in {0!r}".format(item))
+            i = item[key]
+        items.append((str(i), item))
+    return items
+
+
+class _Namespace(object):
+    """
+    Interns ids as small integers so a set of them can be held as the
+    bits of one Python int; intersections are then a single `&`.
+    """
+    def __init__(self):
+        self.ids = []
+        self.bits = {}
+
+    def mask(self, ids):
+        mask = 0
+        for i in ids:
+            bit = self.bits.get(i)
+            if bit is None:
+                bit = self.bits[i] = len(self.ids)
+                self.ids.append(i)
+            mask |= 1 << bit
+        return mask
+
+    def unmask(self, mask):
+        ids = []
+        while mask:
+            low = mask & -mask
+            ids.append(self.ids[low.bit_length() - 1])
+            mask ^= low
+        return ids
+
+
+class AdjacencyCache(object):
+    """
+    Cache of DCS set membership: resource -> parent sets, filled by
+    list_sets, and set -> children, filled by list_resources.
+
+    Adjacency is held in memory as bitsets and, when `path` is given,
+    persisted to SQLite so later processes can reuse it. Entries older
+    than `ttl` seconds are treated as missing. Safe to share between
+    threads; `hits` and `misses` count lookups.
+    """
+    def __init__(self, path=None, ttl=3600):
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+        # parent bitsets index set ids and child bitsets resource ids, so
+        # the (few) sets never share a bit space with the (many) resources
+        self._namespaces = {PARENTS: _Namespace(), CHILDREN: _Namespace()}
+        self._edges = {PARENTS: {}, CHILDREN: {}}
+        self._lock = threading.RLock()
+
+        self.conn = None
+        if path is not None:
+            dirname = os.path.dirname(os.path.abspath(path))
+            if not os.path.isdir(dirname):
+                os.makedirs(dirname)
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            for kind in (PARENTS, CHILDREN):
+                self.conn.execute(
+                    "CREATE TABLE IF NOT EXISTS {0} ("
+                    "node TEXT PRIMARY KEY, body TEXT NOT NULL, "
+                    "ids TEXT NOT NULL, fetched REAL NOT NULL)".format(kind)
+                )
+            self.conn.commit()
+
+    def get(self, kind, node):
+        """
+        Return the cached response body listing the `kind` (PARENTS or
+        CHILDREN) of `node`, if it is fresh.
+        """
+        with self._lock:
+            entry = self._entry(kind, node)
+            self._count(entry is not None)
+        if entry is None:
+            return None
+        return entry[1]
+
+    def ids(self, kind, node):
+        """
+        Return the cached list of the `kind` of `node`, if fresh.
+        """
+        with self._lock:
+            entry = self._entry(kind, node)
+            self._count(entry is not None)
+            if entry is None:
+                return None
+            return self._namespaces[kind].unmask(entry[0])
+
+    def put(self, kind, node, body, ids):
+        now = time.time()
+        with self._lock:
+            mask = self._namespaces[kind].mask(ids)
+            self._edges[kind][node] = (mask, body, now)
+            if self.conn is not None:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO {0} (node, body, ids, fetched) "
+                    "VALUES (?, ?, ?, ?)".format(kind),
+                    (node, body, json.dumps(ids), now)
+                )
+                self.conn.commit()
+
+    def common_parents(self, cccIds):
+        """
+        Return the sets that contain every one of `cccIds`, or None unless
+        the parents of all of them are cached. Sets are returned as the
+        items the server listed them with, as found in the cached parents
+        of the first of `cccIds`.
+        """
+        with self._lock:
+            common = None
+            body = None
+            for cccId in cccIds:
+                entry = self._entry(PARENTS, cccId)
+                if entry is None:
+                    self._count(False)
+                    return None
+                if common is None:
+                    common, body = entry[0], entry[1]
+                else:
+                    common &= entry[0]
+            self._count(True)
+            if body is None:
+                return []
+            found = set(self._namespaces[PARENTS].unmask(common))
+        return [item for i, item in parse_items(body) if i in found]
+
+    def invalidate_link(self, setId, cccId):
+        """
+        Forget what is known about a relationship that changed.
+        """
+        with self._lock:
+            self._drop(PARENTS, cccId)
+            self._drop(CHILDREN, setId)
+
+    def invalidate_set(self, setId):
+        """
+        Forget a deleted set: its own entries, and every entry that lists
+        it as a parent or child.
+        """
+        with self._lock:
+            for kind in (PARENTS, CHILDREN):
+                self._drop(kind, setId)
+                bit = self._namespaces[kind].bits.get(setId)
+                if bit is not None:
+                    for node, entry in list(self._edges[kind].items()):
+                        if entry[0] >> bit & 1:
+                            del self._edges[kind][node]
+                if self.conn is not None:
+                    self.conn.execute(
+                        "DELETE FROM {0} WHERE ids LIKE ?".format(kind),
+                        ("%" + json.dumps(setId) + "%",)
+                    )
+            if self.conn is not None:
+                self.conn.commit()
+
+    def close(self):
+        with self._lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _entry(self, kind, node):
+        oldest = time.time() - self.ttl
+        entry = self._edges[kind].get(node)
+        if entry is None and self.conn is not None:
+            row = self.conn.execute(
+                "SELECT body, ids, fetched FROM {0} WHERE node = ?".format(
+                    kind
+                ), (node,)
+            ).fetchone()
+            if row is not None:
+                mask = self._namespaces[kind].mask(json.loads(row[1]))
+                entry = self._edges[kind][node] = (mask, row[0], row[2])
+        if entry is None or entry[2] < oldest:
+            return None
+        return entry
+
+    def _drop(self, kind, node):
+        self._edges[kind].pop(node, None)
+        if self.conn is not None:
+            self.conn.execute(
+                "DELETE FROM {0} WHERE node = ?".format(kind), (node,)
+            )
+            self.conn.commit()
+
+    def _count(self, hit):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
@@ -1,5 +1,5 @@
 from . import create_link, find_common_sets, list_sets, list_resources, \
-              delete_link, delete_set
+              delete_link, delete_set, walk, sync
 
 __all__ = [
     'create_link',
@@ -8,4 +8,6 @@ __all__ = [
     'list_resources',
     'delete_link',
     'delete_set',
+    'walk',
+    'sync',
 ]
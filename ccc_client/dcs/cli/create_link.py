@@ -1,18 +1,45 @@
+from __future__ import print_function
+
 import argparse
+import itertools
+import sys
 
 from ccc_client.dcs.DcsRunner import DcsRunner
-from ccc_client.utils import print_API_response
+from ccc_client.dcs.adjacency import attach_adjacency, cache_parser
+from ccc_client.transport import get_transport
+from ccc_client.utils import print_API_response, iter_lines, ndjson_result
 
 
 def run(args):
-    runner = DcsRunner(args.host, args.port, args.authToken)
-    for i in args.cccId:
-        r = runner.create_link(args.setId, i)
-        print_API_response(r)
+    runner = DcsRunner(args.host, args.port, args.authToken,
+                       transport=get_transport(args.jobs))
+    attach_adjacency(runner, args)
+    if args.fromFile is None and args.jobs == 1:
+        if not args.cccId:
+            print("[ERROR] provide --cccId or --fromFile", file=sys.stderr)
+            raise ValueError
+        for i in args.cccId:
+            r = runner.create_link(args.setId, i)
+            print_API_response(r)
+        return
+
+    cccIds = args.cccId or []
+    if args.fromFile is not None:
+        cccIds = itertools.chain(cccIds, iter_lines(args.fromFile))
+    failed = 0
+    results = runner.create_links(args.setId, cccIds, jobs=args.jobs)
+    for i, r, error in results:
+        if error is not None or r.status_code // 100 != 2:
+            failed += 1
+        print(ndjson_result({"setId": args.setId, "cccId": i}, r, error))
+    if failed:
+        print("[ERROR] {0} cccIds could not be linked".format(failed),
+              file=sys.stderr)
 
 
 parser = argparse.ArgumentParser(
-    description='Assign one or more resources to a set'
+    description='Assign one or more resources to a set',
+    parents=[cache_parser]
 )
 parser.set_defaults(runner=run)
 parser.add_argument(
@@ -27,3 +54,16 @@ parser.add_argument(
     nargs='+',
     help='CCC_ID(s) of data to be assigned to set'
 )
+parser.add_argument(
+    '--fromFile', '-f',
+    type=str,
+    help="also read newline delimited CCC_IDs from this file, or from "
+         "stdin if '-'; results are written as one JSON line per CCC_ID"
+)
+parser.add_argument(
+    '--jobs', '-j',
+    type=int,
+    default=1,
+    help='number of requests to run concurrently; above 1, results are '
+         'written as one JSON line per CCC_ID (default: 1)'
+)
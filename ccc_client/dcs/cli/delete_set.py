@@ -1,18 +1,21 @@
 import argparse
 
 from ccc_client.dcs.DcsRunner import DcsRunner
+from ccc_client.dcs.adjacency import attach_adjacency, cache_parser
 from ccc_client.utils import print_API_response
 
 
 def run(args):
     runner = DcsRunner(args.host, args.port, args.authToken)
+    attach_adjacency(runner, args)
     for i in args.setId:
         r = runner.delete_set(i)
         print_API_response(r)
 
 
 parser = argparse.ArgumentParser(
-    description='Remove a UUID corresponding to a set from the DCS'
+    description='Remove a UUID corresponding to a set from the DCS',
+    parents=[cache_parser]
 )
 parser.set_defaults(runner=run)
 parser.add_argument(
@@ -1,22 +1,64 @@
+from __future__ import print_function
+
 import argparse
+import itertools
+import sys
 
 from ccc_client.dcs.DcsRunner import DcsRunner
-from ccc_client.utils import print_API_response
+from ccc_client.dcs.adjacency import attach_adjacency, cache_parser
+from ccc_client.transport import get_transport
+from ccc_client.utils import print_API_response, iter_lines
 
 
 def run(args):
-    runner = DcsRunner(args.host, args.port, args.authToken)
-    r = runner.find_common_sets(args.ids)
+    runner = DcsRunner(args.host, args.port, args.authToken,
+                       transport=get_transport(args.jobs))
+    attach_adjacency(runner, args)
+    if args.fromFile is None:
+        if not args.cccId:
+            print("[ERROR] provide CCC_IDs or --fromFile", file=sys.stderr)
+            raise ValueError
+        ids = args.cccId
+    else:
+        ids = itertools.chain(args.cccId, iter_lines(args.fromFile))
+        if args.chunkSize is None:
+            ids = list(ids)
+
+    if args.chunkSize is None:
+        r = runner.find_common_sets(ids)
+    else:
+        r = runner.find_common_sets(ids, chunk_size=args.chunkSize,
+                                    jobs=args.jobs)
     print_API_response(r)
 
 
 parser = argparse.ArgumentParser(
-    description='Find common resource sets given a list of CCC_IDs'
+    description='Find common resource sets given a list of CCC_IDs',
+    parents=[cache_parser]
 )
 parser.set_defaults(runner=run)
 parser.add_argument(
     'cccId',
     type=str,
-    nargs='+',
+    nargs='*',
     help='CCC_IDs to search'
 )
+parser.add_argument(
+    '--fromFile', '-f',
+    type=str,
+    help="also read newline delimited CCC_IDs from this file, or from "
+         "stdin if '-'"
+)
+parser.add_argument(
+    '--chunkSize',
+    type=int,
+    help='search this many CCC_IDs per request and intersect the answers '
+         'locally, for lists too large for one request'
+)
+parser.add_argument(
+    '--jobs', '-j',
+    type=int,
+    default=4,
+    help='number of chunks to search concurrently with --chunkSize '
+         '(default: 4)'
+)
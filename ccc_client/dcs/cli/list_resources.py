@@ -1,17 +1,20 @@
 import argparse
 
 from ccc_client.dcs.DcsRunner import DcsRunner
+from ccc_client.dcs.adjacency import attach_adjacency, cache_parser
 from ccc_client.utils import print_API_response
 
 
 def run(args):
     runner = DcsRunner(args.host, args.port, args.authToken)
-    r = runner.list_all_resources(args.setId)
+    attach_adjacency(runner, args)
+    r = runner.list_resources(args.setId)
     print_API_response(r)
 
 
 parser = argparse.ArgumentParser(
-    description='List all resources belonging to a set'
+    description='List all resources belonging to a set',
+    parents=[cache_parser]
 )
 parser.set_defaults(runner=run)
 parser.add_argument(
@@ -0,0 +1,90 @@
+from __future__ import print_function
+
+import argparse
+import sys
+from collections import Counter, OrderedDict
+
+from ccc_client.dcs.DcsRunner import DcsRunner
+from ccc_client.dcs.adjacency import attach_adjacency, cache_parser
+from ccc_client.transport import get_transport
+from ccc_client.utils import iter_lines
+
+
+def run(args):
+    # membership is always read from the DCS itself; the cache is only
+    # attached so the links changed here invalidate it
+    runner = DcsRunner(args.host, args.port, args.authToken,
+                       transport=get_transport(args.jobs))
+    attach_adjacency(runner, args)
+
+    results = runner.sync(_read_manifest(args.manifest), jobs=args.jobs,
+                          prune=not args.addOnly, dry_run=args.dryRun)
+    counts = Counter()
+    for action, setId, cccId, r, error in results:
+        if action == "read":
+            counts["failed"] += 1
+            if error is None:
+                error = "[STATUS CODE - {0}] {1}".format(r.status_code,
+                                                         r.text)
+            print("[ERROR] unable to list the members of {0}, "
+                  "skipping it: {1}".format(setId, error), file=sys.stderr)
+        elif error is not None or (r is not None and
+                                   r.status_code // 100 != 2):
+            counts["failed"] += 1
+            if error is None:
+                error = "[STATUS CODE - {0}] {1}".format(r.status_code,
+                                                         r.text)
+            print("[ERROR] unable to {0} {1} and {2}: {3}".format(
+                action, setId, cccId, error
+            ), file=sys.stderr)
+        else:
+            counts[action] += 1
+            print("{0}\t{1}\t{2}".format(action, setId, cccId))
+
+    print("linked: {0}, unlinked: {1}, failed: {2}".format(
+        counts["link"], counts["unlink"], counts["failed"]
+    ), file=sys.stderr)
+
+
+def _read_manifest(source):
+    membership = OrderedDict()
+    for line in iter_lines(source):
+        if line.startswith("#"):
+            continue
+        fields = line.split("\t")
+        if len(fields) != 2:
+            print("[ERROR] expected 'setId<TAB>cccId', got:", line,
+                  file=sys.stderr)
+            raise ValueError
+        membership.setdefault(fields[0], set()).add(fields[1])
+    return membership
+
+
+parser = argparse.ArgumentParser(
+    description='Make the membership of sets match a manifest, creating '
+                'and deleting only the links that differ',
+    parents=[cache_parser]
+)
+parser.set_defaults(runner=run)
+parser.add_argument(
+    'manifest',
+    type=str,
+    help="TSV of 'setId<TAB>cccId' lines, or '-' to read it from stdin; "
+         "every set it names ends up with exactly the listed members"
+)
+parser.add_argument(
+    '--addOnly',
+    action='store_true',
+    help='only create missing links; never delete links'
+)
+parser.add_argument(
+    '--dryRun',
+    action='store_true',
+    help='print the changes without making them'
+)
+parser.add_argument(
+    '--jobs', '-j',
+    type=int,
+    default=4,
+    help='number of requests to run concurrently (default: 4)'
+)
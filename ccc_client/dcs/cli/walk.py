@@ -0,0 +1,42 @@
+from __future__ import print_function
+
+import argparse
+import sys
+
+from ccc_client.dcs.DcsRunner import DcsRunner
+from ccc_client.dcs.adjacency import attach_adjacency, cache_parser
+from ccc_client.transport import get_transport
+
+
+def run(args):
+    runner = DcsRunner(args.host, args.port, args.authToken,
+                       transport=get_transport(args.jobs))
+    attach_adjacency(runner, args)
+    for cccId, error in runner.walk(args.setId, jobs=args.jobs):
+        if error is None:
+            print(cccId)
+        elif isinstance(error, Exception):
+            print("[ERROR] unable to list {0}: {1!r}".format(cccId, error),
+                  file=sys.stderr)
+        else:
+            print("[ERROR] unable to list {0}: [STATUS CODE - {1}] "
+                  "{2}".format(cccId, error.status_code, error.text),
+                  file=sys.stderr)
+
+
+parser = argparse.ArgumentParser(
+    description='List every resource under a set, following nested sets',
+    parents=[cache_parser]
+)
+parser.set_defaults(runner=run)
+parser.add_argument(
+    'setId',
+    type=str,
+    help='UUID of resource set'
+)
+parser.add_argument(
+    '--jobs', '-j',
+    type=int,
+    default=4,
+    help='number of sets to list concurrently (default: 4)'
+)
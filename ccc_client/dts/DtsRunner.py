@@ -1,20 +1,27 @@
 from __future__ import print_function
 
+import copy
+import itertools
 import json
 import os
 import re
-import requests
 import sys
+import threading
 import uuid
 
-from ccc_client.utils import parseAuthToken
+from ccc_client.dts import hashing, scanner, watcher
+from ccc_client.transport import get_default_transport
+from ccc_client.utils import bounded_map, cached_response, chunked, \
+    parseAuthToken, print_API_response
 
 
 class DtsRunner(object):
     """
     Send requests to the DTS
     """
-    def __init__(self, host=None, port=None, authToken=None):
+    def __init__(self, host=None, port=None, authToken=None,
+                 transport=None, uuid_strategy="SHA-1", hash_cache=None,
+                 index=None, known_cccIds=None):
 
         if host is not None:
             self.host = re.sub("^http[s]?://",  "", host)
@@ -31,6 +38,11 @@ class DtsRunner(object):
         else:
             self.authToken = ""
 
+        if transport is not None:
+            self.transport = transport
+        else:
+            self.transport = get_default_transport()
+
         self.headers = {
             'Content-Type': 'application/json',
             "Authorization": " ".join(["Bearer", self.authToken])
@@ -38,81 +50,143 @@ class DtsRunner(object):
 
         self.endpoint = "api/v1/dts/file"
 
-    def get(self, cccId):
+        # strategy used for cccIds generated by post/put/scan; hash_cache
+        # may be a HashCache or the path of one, opened on first use
+        self.uuid_strategy = uuid_strategy
+        self.hash_cache = hash_cache
+        self._hash_cache_lock = threading.Lock()
+
+        # optional ccc_client.dts.index.RecordIndex; get and query answer
+        # from it while its entries are fresh, writes keep it current
+        self.index = index
+
+        # optional set of every registered cccId, e.g. a
+        # ccc_client.dts.bloom.BloomFilter; ids not in it are taken to be
+        # free without asking the server
+        self.known_cccIds = known_cccIds
+
+    def close(self):
+        """
+        Close the hash cache and record index held by this runner, writing
+        out any digests not yet committed. A hash cache opened from a path
+        is opened again if the runner is used afterwards.
+        """
+        with self._hash_cache_lock:
+            if isinstance(self.hash_cache, hashing.HashCache):
+                self.hash_cache.close()
+                self.hash_cache = self.hash_cache.path
+        if self.index is not None:
+            self.index.close()
+            self.index = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def get(self, cccId, fresh=False):
+        """
+        GET a record. With `fresh`, the local index is not read, only
+        refreshed: reads that precede a write must see the server's copy.
+        """
         endpoint = "http://{0}:{1}/{2}/{3}".format(self.host, self.port,
                                                    self.endpoint, cccId)
-        response = requests.get(
+        if self.index is not None and not fresh:
+            body = self.index.get(cccId)
+            if body is not None:
+                return cached_response(endpoint, body)
+        response = self.transport.get(
             endpoint,
             headers=self.headers
         )
+        if self.index is not None and response.status_code // 100 == 2:
+            self.index.add_records(self._parse_records(response))
         return response
 
     def delete(self, cccId):
         endpoint = "http://{0}:{1}/{2}/{3}".format(self.host, self.port,
                                                    self.endpoint, cccId)
-        response = requests.delete(
+        response = self.transport.delete(
             endpoint,
             headers=self.headers
         )
+        if self.index is not None and response.status_code // 100 == 2:
+            self.index.forget(cccId)
         return response
 
+    def get_many(self, cccIds, jobs=4, ordered=False):
+        """
+        GET a stream of cccIds with at most `jobs` requests in flight.
+        Yields (cccId, response, error) tuples in completion order, or in
+        input order if `ordered`.
+        """
+        return bounded_map(self.get, cccIds, jobs, ordered=ordered)
+
+    def delete_many(self, cccIds, jobs=4, ordered=False):
+        """
+        DELETE a stream of cccIds; works like get_many.
+        """
+        return bounded_map(self.delete, cccIds, jobs, ordered=ordered)
+
     def put(self, cccId, filepath, sites, user=None):
-        filepath = os.path.abspath(filepath)
+        record = self._put_file_record(filepath)
         sites = self._process_sites(sites)
         user = self._process_user(user)
 
         # get current record
-        resp = self.get(cccId)
+        resp = self.get(cccId, fresh=True)
         data = json.loads(resp.text)
 
-        # some checks for safety
-        try:
-            assert data['cccId'] == self._generate_cccId(filepath)
-        except:
-            print("[WARNING] the cccId was not generated via the",
-                  "standard method provided by this library",
-                  file=sys.stderr)
-
-        try:
-            assert data['name'] == os.path.basename(filepath)
-            assert data['size'] == os.path.getsize(filepath)
-        except:
-            print("[ERROR] the name and/or size of this file doesn't",
-                  "match the current record",
-                  file=sys.stderr)
-            raise ValueError
+        data = self._checked_update(data, record, sites, user)
+        return self._put_record(data)
+
+    def put_many(self, items, sites, user=None, jobs=4):
+        """
+        Update the records of many files with at most `jobs` files in
+        flight. Each item is a filepath or FileRecord, whose cccId is
+        generated with this runner's strategy, or a (cccId, filepath)
+        pair.
+
+        The current records are fetched concurrently and the updated
+        record is computed locally; a PUT is only sent when it differs.
+        Yields (item, status, response, error) tuples as files complete,
+        where status is one of "unchanged", "updated" or "failed".
+        """
+        sites = self._process_sites(sites)
+        user = self._process_user(user)
 
-        # update record
-        locations = []
-        location = {}
-        for site in sites:
-            if not any(site in s for s in data['location']):
-                location = {}
+        def put_one(item):
+            if isinstance(item, tuple) and \
+                    not isinstance(item, scanner.FileRecord):
+                cccId, filepath = item
+                record = self._put_file_record(filepath)
             else:
-                i = next(
-                    (i for i, d in enumerate(data['location']) if site in d),
-                    None
-                )
-                location = data['location'][i]
-
-            location['site'] = self._map_site_to_ip(site)
-            location['path'] = os.path.dirname(filepath)
-            location['timestampUpdated'] = os.stat(filepath)[-2]
-            location['user'] = {"name": user}
-            locations.append(location)
-
-        data['location'] = locations
-        endpoint = "http://{0}:{1}/{2}".format(self.host, self.port,
-                                               self.endpoint)
-        response = requests.put(
-            endpoint,
-            data=json.dumps(data, sort_keys=True),
-            headers=self.headers
-        )
-        return response
+                record = self._put_file_record(item)
+                cccId = record.cccId
+
+            response = self.get(cccId, fresh=True)
+            if response.status_code // 100 != 2:
+                return "failed", response
+            data = json.loads(response.text)
+            updated = self._checked_update(copy.deepcopy(data), record,
+                                           sites, user)
+            if updated == data:
+                return "unchanged", response
+            response = self._put_record(updated)
+            if response.status_code // 100 != 2:
+                return "failed", response
+            return "updated", response
+
+        for item, result, error in bounded_map(put_one, items, jobs):
+            if error is not None:
+                yield item, "failed", None, error
+            else:
+                yield item, result[0], result[1], None
 
     def post(self, filepath, sites, user=None, cccId=None):
-        filepath = os.path.abspath(filepath)
+        record = self._file_record(filepath)
+        filepath = record.path
         sites = self._process_sites(sites)
         user = self._process_user(user)
 
@@ -126,17 +200,19 @@ class DtsRunner(object):
             else:
                 data['cccId'] = cccId
         else:
-            data['cccId'] = self._generate_cccId(filepath)
+            data['cccId'] = record.cccId
 
         data['name'] = os.path.basename(filepath)
-        data['size'] = os.path.getsize(filepath)
+        data['size'] = record.size
+        if record.checksum is not None:
+            data['checksum'] = record.checksum
 
         locations = []
         for site in sites:
             location = {}
             location['site'] = self._map_site_to_ip(site)
             location['path'] = os.path.dirname(filepath)
-            location['timestampUpdated'] = os.stat(filepath)[-2]
+            location['timestampUpdated'] = record.mtime
             location['user'] = {"name": user}
             locations.append(location)
 
@@ -145,13 +221,18 @@ class DtsRunner(object):
         endpoint = "http://{0}:{1}/{2}".format(self.host,
                                                self.port,
                                                self.endpoint)
-        response = requests.post(
+        response = self.transport.post(
             endpoint,
             data=json.dumps(data, sort_keys=True),
             headers=self.headers
         )
 
-        if response.status_code // 100 != 2:
+        if response.status_code // 100 == 2:
+            if self.index is not None:
+                self.index.add_records([data])
+            if self.known_cccIds is not None:
+                self.known_cccIds.add(data['cccId'])
+        else:
             print("[ERROR] Registration with the DTS failed for:",
                   filepath,
                   file=sys.stderr)
@@ -162,46 +243,599 @@ class DtsRunner(object):
                 raise ValueError
         return response
 
+    def post_many(self, filepaths, sites, user=None, jobs=4):
+        """
+        Register many files with at most `jobs` requests in flight.
+
+        Yields (filepath, response, error) tuples as each registration
+        completes; a failure on one file is reported as `error` and does
+        not stop the rest of the batch.
+        """
+        sites = self._process_sites(sites)
+        user = self._process_user(user)
+
+        def post_one(filepath):
+            return self.post(filepath, sites, user, None)
+
+        return bounded_map(post_one, filepaths, jobs)
+
+    def watch(self, paths, sites, user=None, jobs=4, settle=5.0,
+              interval=1.0, batch_size=100, poll=False, max_retries=3):
+        """
+        Watch the directories in `paths` and register each new file once
+        it has stopped growing for `settle` seconds. Files are posted in
+        micro-batches of up to `batch_size`, with at most `jobs` requests
+        in flight; see ccc_client.dts.watcher.Watcher.
+
+        Returns a generator of (filepath, response, error) tuples that
+        runs until the caller stops iterating; files that appear after
+        this call returns are registered. A file whose registration fails
+        is tried again, up to `max_retries` times with a growing delay,
+        unless the failure is a ValueError (e.g. its cccId is taken) or a
+        4xx response, which no retry would change.
+        """
+        sites = self._process_sites(sites)
+        user = self._process_user(user)
+        w = watcher.Watcher(paths, settle, interval, poll, max_retries)
+
+        def register():
+            try:
+                for batch in w.batches(batch_size):
+                    results = self.post_many(batch, sites, user, jobs)
+                    for filepath, r, error in results:
+                        if error is None and r.status_code // 100 == 2:
+                            w.done(filepath)
+                        elif isinstance(error, ValueError) or \
+                                (error is None and r.status_code // 100 == 4):
+                            print("[ERROR] not retrying", filepath,
+                                  file=sys.stderr)
+                            w.done(filepath)
+                        elif not w.retry(filepath):
+                            print("[ERROR] giving up on", filepath,
+                                  file=sys.stderr)
+                        yield filepath, r, error
+            finally:
+                w.close()
+
+        return register()
+
+    def sync(self, paths, sites, ledger, user=None, jobs=4):
+        """
+        Register the new files and update the changed ones under `paths`,
+        using `ledger` (a ccc_client.dts.ledger.Ledger) to skip every file
+        that is unchanged since the last successful sync.
+
+        Yields (record, action, response, error) tuples, where action is
+        one of "unchanged", "posted" or "updated". The ledger is updated
+        as registrations succeed.
+        """
+        sites = self._process_sites(sites)
+        user = self._process_user(user)
+
+        def pending():
+            for record in self.scan(paths):
+                yield record, ledger.get(record.path)
+
+        def check_unchanged(item):
+            record, entry = item
+            if ledger.is_current(record, sites, entry):
+                return "unchanged", None
+
+        def sync_one(item):
+            record, entry = item
+            if entry is None:
+                try:
+                    return "posted", self.post(record, sites, user)
+                except ValueError:
+                    # registered before this ledger knew about it
+                    pass
+            response = self.get(record.cccId, fresh=True)
+            if response.status_code == 404:
+                return "posted", self.post(record, sites, user)
+            elif response.status_code // 100 != 2:
+                return "updated", response
+            data = json.loads(response.text)
+            data['name'] = os.path.basename(record.path)
+            data['size'] = record.size
+            data = self._update_record(data, record, sites, user)
+            return "updated", self._put_record(data)
+
+        results = bounded_map(sync_one, pending(), jobs,
+                              shortcut=check_unchanged)
+        for (record, entry), result, error in results:
+            if error is not None:
+                yield record, None, None, error
+                continue
+            action, response = result
+            if action != "unchanged" and response.status_code // 100 == 2:
+                ledger.add(record, sites)
+            yield record, action, response, None
+
+        ledger.commit()
+
+    def scan(self, paths, jobs=1, ordered=False):
+        """
+        Yield a FileRecord for every regular file under `paths`, stat'ing
+        each file once. Records can be passed to post/put in place of a
+        filepath.
+        """
+        return scanner.scan(paths, self._identify, jobs, ordered)
+
+    def reconcile(self, prefix, site, jobs=1, records=None):
+        """
+        Compare the files under the local directory `prefix` with the
+        records registered at `site` under the same prefix. `records`
+        defaults to list_records(site, prefix).
+
+        Both sides are put in path component order, the order the scanner
+        walks in, and merge-joined, so the local tree is streamed and never
+        held in memory. Yields (status, filepath, local, remote) tuples in
+        path order, where `local` is a FileRecord or None, `remote` a DTS
+        record or None, and status is one of "ok", "unregistered" (no
+        record), "missing" (no local file), "size-mismatch" or
+        "duplicate" (a second record for the same file; the record kept
+        is the one whose cccId is the local file's, if any). A `prefix`
+        that is not an existing directory is an error, rather than an
+        empty tree whose records would all be "missing".
+        """
+        prefix = _normalize_prefix(prefix)
+        if not os.path.isdir(prefix):
+            print("[ERROR]", prefix, "is not a directory", file=sys.stderr)
+            raise ValueError
+        site_ip = self._map_site_to_ip(site)
+        if records is None:
+            records = self.list_records(site, prefix)
+
+        remote_entries = []
+        for record in records:
+            for location in self._prefix_locations(record, site_ip, prefix):
+                path = os.path.join(location['path'], record.get('name', ''))
+                remote_entries.append((_path_key(path), path, record))
+        remote_entries.sort(key=lambda entry: entry[0])
+        # every record at a path at once, to pick which one is kept
+        remote = ((key, [entry[1:] for entry in group])
+                  for key, group in itertools.groupby(
+                      remote_entries, key=lambda entry: entry[0]))
+
+        local = ((_path_key(r.path), r.path, r)
+                 for r in self.scan(prefix, jobs, ordered=True))
+
+        lhs = next(local, None)
+        rhs = next(remote, None)
+        while lhs is not None or rhs is not None:
+            if rhs is None or (lhs is not None and lhs[0] < rhs[0]):
+                yield "unregistered", lhs[1], lhs[2], None
+                lhs = next(local, None)
+            elif lhs is None or rhs[0] < lhs[0]:
+                for path, record in rhs[1]:
+                    yield "missing", path, None, record
+                rhs = next(remote, None)
+            else:
+                # the record with the local file's cccId is the one kept
+                entries = rhs[1]
+                keep = next((i for i, (_, record) in enumerate(entries)
+                             if record.get('cccId') == lhs[2].cccId), 0)
+                record = entries.pop(keep)[1]
+                status = "ok"
+                if record.get('size') != lhs[2].size:
+                    status = "size-mismatch"
+                yield status, lhs[1], lhs[2], record
+                for path, duplicate in entries:
+                    yield "duplicate", path, None, duplicate
+                lhs = next(local, None)
+                rhs = next(remote, None)
+
+    def apply_reconcile(self, diffs, site, user=None, jobs=4):
+        """
+        Act on the output of reconcile with at most `jobs` requests in
+        flight: unregistered files are posted, or added as a location to
+        the record of their cccId if it is registered at another site,
+        records whose size does not match are updated, and the location
+        at `site` is removed from missing and duplicate records (deleting
+        records left with no location). Entries that are "ok" are passed
+        over.
+
+        Yields (diff, action, response, error) tuples as changes complete.
+        """
+        site_ip = self._map_site_to_ip(site)
+        user = self._process_user(user)
+
+        def apply_one(diff):
+            status, filepath, local, remote = diff
+            if status == "unregistered":
+                return self._register_here(local, site, user)
+            here = [loc for loc in self._prefix_locations(remote, site_ip)
+                    if loc.get('path') == os.path.dirname(filepath)]
+            if status in ("missing", "duplicate"):
+                return self._remove_locations(remote, here)
+            data = copy.deepcopy(remote)
+            data['size'] = local.size
+            if local.checksum is not None:
+                data['checksum'] = local.checksum
+            for location in data['location']:
+                if location in here:
+                    location['timestampUpdated'] = local.mtime
+                    location['user'] = {"name": user}
+            return "updated", self._put_record(data)
+
+        changes = (diff for diff in diffs if diff[0] != "ok")
+        for diff, result, error in bounded_map(apply_one, changes, jobs):
+            if error is not None:
+                yield diff, None, None, error
+            else:
+                yield diff, result[0], result[1], None
+
     def query(self, filepath, site):
         name = os.path.basename(filepath)
         path = os.path.dirname(filepath)
+        site_ip = self._map_site_to_ip(site)
         terms = [
             "name={0}".format(name),
             "path={0}".format(path),
-            "site={0}".format(self._map_site_to_ip(site))
+            "site={0}".format(site_ip)
         ]
         query_string = "&".join(terms)
         endpoint = "http://{0}:{1}/{2}/?{3}".format(
             self.host, self.port, self.endpoint, query_string
         )
-        response = requests.get(endpoint, headers=self.headers)
+        if self.index is not None:
+            body = self.index.query(name, path, site_ip)
+            if body is not None:
+                return cached_response(endpoint, body)
+        response = self.transport.get(endpoint, headers=self.headers)
+        if self.index is not None and response.status_code // 100 == 2:
+            records = self._parse_records(response)
+            if records:
+                self.index.add_query(name, path, site_ip, records)
         return response
 
-    def infer_cccId(self, filepath, uuid_strategy="SHA-1"):
+    def query_many(self, filepaths, sites, jobs=4):
+        """
+        Query every (filepath, site) pair concurrently, with at most
+        `jobs` requests in flight, and merge the answers for each file.
+
+        Yields (filepath, records, errors) tuples as soon as all sites
+        have answered for a file: `records` is the list of matching DTS
+        records from all sites, de-duplicated by cccId, and `errors` maps
+        each site that failed to its response or exception.
+        """
+        sites = self._process_sites(sites)
+        for site in sites:
+            self._map_site_to_ip(site)
+
+        def pairs():
+            for filepath in filepaths:
+                filepath = os.path.abspath(filepath)
+                for site in sites:
+                    yield filepath, site
+
+        def query_one(pair):
+            return self.query(*pair)
+
+        partial = {}
+        for (filepath, site), r, error in bounded_map(query_one, pairs(),
+                                                      jobs):
+            responses = partial.setdefault(filepath, {})
+            responses[site] = error if error is not None else r
+            if len(responses) == len(sites):
+                del partial[filepath]
+                records, errors = self._merge_query_responses(responses)
+                yield filepath, records, errors
+
+    def list_records(self, site, prefix=None):
+        """
+        Return the DTS records with a location at `site`, optionally only
+        those whose path at that site is `prefix` or below it. The query
+        API cannot match on a path prefix, so the records at the site are
+        fetched and filtered here.
+        """
+        site_ip = self._map_site_to_ip(site)
+        endpoint = "http://{0}:{1}/{2}/?site={3}".format(
+            self.host, self.port, self.endpoint, site_ip
+        )
+        response = self.transport.get(endpoint, headers=self.headers)
+        if response.status_code // 100 != 2:
+            print("[ERROR] unable to list the records at", site,
+                  file=sys.stderr)
+            print_API_response(response)
+            raise ValueError
+        return [r for r in self._parse_records(response)
+                if self._prefix_locations(r, site_ip, prefix)]
+
+    def relocate(self, old_prefix, new_prefix, site, jobs=4, journal=None,
+                 records=None):
+        """
+        Move the location at `site` of every record under `old_prefix` to
+        the same place under `new_prefix`, with at most `jobs` updates in
+        flight. `records` defaults to list_records(site, old_prefix).
+
+        Records whose cccId is in `journal` (a ccc_client.utils.Journal)
+        are skipped and successful ones are added to it, so an interrupted
+        run can be resumed. Yields (record, response, error) tuples as
+        records complete.
+        """
+        old_prefix = _normalize_prefix(old_prefix)
+        new_prefix = _normalize_prefix(new_prefix)
+        site_ip = self._map_site_to_ip(site)
+        if records is None:
+            records = self.list_records(site, old_prefix)
+
+        def relocate_one(record):
+            data = copy.deepcopy(record)
+            for location in self._prefix_locations(data, site_ip,
+                                                   old_prefix):
+                relpath = os.path.relpath(location['path'], old_prefix)
+                location['path'] = os.path.normpath(
+                    os.path.join(new_prefix, relpath)
+                )
+            return self._put_record(data)
+
+        for record, r, error in self._bulk(relocate_one, records, jobs,
+                                           journal):
+            yield record, r, error
+
+    def delete_prefix(self, prefix, site, jobs=4, journal=None,
+                      records=None):
+        """
+        Remove the location at `site` of every record under `prefix`,
+        deleting records that are left with no location. Works like
+        relocate; yields (record, action, response, error) tuples where
+        action is "deleted" or "updated".
+        """
+        prefix = _normalize_prefix(prefix)
+        site_ip = self._map_site_to_ip(site)
+        if records is None:
+            records = self.list_records(site, prefix)
+
+        def delete_one(record):
+            return self._remove_locations(
+                record, self._prefix_locations(record, site_ip, prefix)
+            )
+
+        for record, result, error in self._bulk(
+                delete_one, records, jobs, journal,
+                status=lambda result: result[1]):
+            if error is not None:
+                yield record, None, None, error
+            else:
+                yield record, result[0], result[1], None
+
+    def _bulk(self, func, records, jobs, journal, status=None):
+        def check_journal(record):
+            if journal is not None and record['cccId'] in journal:
+                return "skipped"
+
+        for record, result, error in bounded_map(func, records, jobs,
+                                                 shortcut=check_journal):
+            if error is None and result == "skipped":
+                continue
+            if journal is not None and error is None:
+                response = result if status is None else status(result)
+                if response.status_code // 100 == 2:
+                    journal.add(record['cccId'])
+            yield record, result, error
+
+    def _register_here(self, record, site, user):
+        # a file whose cccId is registered at another site gets a location
+        # added to that record, as posting it again would conflict
+        response = None
+        if self.known_cccIds is None or record.cccId in self.known_cccIds:
+            response = self.get(record.cccId, fresh=True)
+        if response is None or response.status_code // 100 != 2:
+            return "posted", self.post(record, [site], user)
+        data = json.loads(response.text)
+        site_ip = self._map_site_to_ip(site)
+        path = os.path.dirname(record.path)
+        locations = data.setdefault('location', [])
+        if any(loc.get('site') == site_ip and loc.get('path') == path
+               for loc in locations):
+            return "unchanged", response
+        locations.append({
+            'site': site_ip,
+            'path': path,
+            'timestampUpdated': record.mtime,
+            'user': {"name": user}
+        })
+        return "located", self._put_record(data)
+
+    def _remove_locations(self, record, remove):
+        data = copy.deepcopy(record)
+        data['location'] = [loc for loc in data['location']
+                            if loc not in remove]
+        if not data['location']:
+            return "deleted", self.delete(data['cccId'])
+        return "updated", self._put_record(data)
+
+    @staticmethod
+    def _prefix_locations(record, site_ip, prefix=None):
+        return [loc for loc in record.get('location', [])
+                if loc.get('site') == site_ip and
+                (prefix is None or _under_prefix(loc.get('path', ''),
+                                                 prefix))]
+
+    def infer_cccId(self, filepath, uuid_strategy=None):
         return self._generate_cccId(filepath, uuid_strategy)
 
+    def infer_cccIds(self, filepaths, uuid_strategy=None, jobs=1,
+                     batch_size=10000):
+        """
+        Yield (filepath, cccId, error) tuples for a stream of filepaths.
+
+        Path based strategies work through `batch_size` paths at a time,
+        across `jobs` worker processes, and keep the input order. Content
+        based strategies hash across `jobs` processes and yield in
+        completion order.
+        """
+        if uuid_strategy is None:
+            uuid_strategy = self.uuid_strategy
+        filepaths = (os.path.abspath(f) for f in filepaths)
+
+        algorithm = self._content_algorithm(uuid_strategy)
+        if algorithm is not None:
+            hasher = hashing.ContentHasher(algorithm,
+                                           self._open_hash_cache())
+            for filepath, digest, error in hasher.digest_many(filepaths,
+                                                              jobs):
+                if error is not None:
+                    yield filepath, None, error
+                else:
+                    yield (filepath, hashing.content_cccId(algorithm, digest),
+                           None)
+            return
+
+        batches = ((batch, uuid_strategy)
+                   for batch in chunked(filepaths, batch_size))
+        results = bounded_map(_path_cccId_batch, batches, jobs,
+                              ordered=True, processes=jobs > 1)
+        for _, cccIds, error in results:
+            if error is not None:
+                raise error
+            for filepath, cccId in cccIds:
+                yield filepath, cccId, None
+
+    def _file_record(self, filepath):
+        if isinstance(filepath, scanner.FileRecord):
+            return filepath
+        return scanner.stat_file(filepath, self._identify)
+
+    def _identify(self, filepath, st=None, uuid_strategy=None):
+        """
+        Return the (cccId, checksum) pair for `filepath`; checksum is None
+        unless a content based strategy is in use.
+        """
+        algorithm = self._content_algorithm(uuid_strategy)
+        if algorithm is None:
+            return self._generate_cccId(filepath, uuid_strategy), None
+        hasher = hashing.ContentHasher(algorithm, self._open_hash_cache())
+        digest = hasher.digest(filepath, st)
+        return (hashing.content_cccId(algorithm, digest),
+                "{0}:{1}".format(algorithm, digest))
+
+    def _open_hash_cache(self):
+        with self._hash_cache_lock:
+            if isinstance(self.hash_cache, str):
+                self.hash_cache = hashing.HashCache(self.hash_cache)
+        return self.hash_cache
+
+    def _content_algorithm(self, uuid_strategy=None):
+        if uuid_strategy is None:
+            uuid_strategy = self.uuid_strategy
+        uuid_strategy = uuid_strategy.upper()
+        if uuid_strategy.startswith("CONTENT-"):
+            return uuid_strategy[len("CONTENT-"):].lower()
+        return None
+
+    def _put_file_record(self, filepath):
+        try:
+            return self._file_record(filepath)
+        except OSError:
+            print("[ERROR] unable to stat", filepath,
+                  file=sys.stderr)
+            raise ValueError
+
+    def _checked_update(self, data, record, sites, user):
+        # some checks for safety
+        try:
+            assert data['cccId'] == record.cccId
+        except:
+            print("[WARNING] the cccId was not generated via the",
+                  "standard method provided by this library",
+                  file=sys.stderr)
+
+        try:
+            assert data['name'] == os.path.basename(record.path)
+            assert data['size'] == record.size
+        except:
+            print("[ERROR] the name and/or size of this file doesn't",
+                  "match the current record",
+                  file=sys.stderr)
+            raise ValueError
+
+        return self._update_record(data, record, sites, user)
+
+    def _update_record(self, data, record, sites, user):
+        locations = []
+        location = {}
+        for site in sites:
+            site_ip = self._map_site_to_ip(site)
+            i = next(
+                (i for i, d in enumerate(data['location'])
+                 if d.get('site') == site_ip),
+                None
+            )
+            if i is None:
+                location = {}
+            else:
+                location = data['location'][i]
+
+            location['site'] = site_ip
+            location['path'] = os.path.dirname(record.path)
+            location['timestampUpdated'] = record.mtime
+            location['user'] = {"name": user}
+            locations.append(location)
+
+        data['location'] = locations
+        if record.checksum is not None:
+            data['checksum'] = record.checksum
+        return data
+
+    def _put_record(self, data):
+        endpoint = "http://{0}:{1}/{2}".format(self.host, self.port,
+                                               self.endpoint)
+        response = self.transport.put(
+            endpoint,
+            data=json.dumps(data, sort_keys=True),
+            headers=self.headers
+        )
+        if self.index is not None and response.status_code // 100 == 2:
+            self.index.add_records([data])
+        return response
+
+    @staticmethod
+    def _parse_records(response):
+        try:
+            found = json.loads(response.text)
+        except ValueError:
+            return []
+        if isinstance(found, dict):
+            found = [found]
+        return [r for r in found if isinstance(r, dict) and 'cccId' in r]
+
+    @staticmethod
+    def _merge_query_responses(responses):
+        records = []
+        seen = set()
+        errors = {}
+        for site, r in sorted(responses.items()):
+            if isinstance(r, Exception) or r.status_code // 100 != 2:
+                errors[site] = r
+                continue
+            found = json.loads(r.text)
+            if isinstance(found, dict):
+                found = [found]
+            for record in found:
+                key = record.get('cccId')
+                if key is None or key not in seen:
+                    seen.add(key)
+                    records.append(record)
+        return records, errors
+
     def _check_cccId(self, cccId):
-        cccId_check_response = self.get(cccId)
+        if self.known_cccIds is not None and cccId not in self.known_cccIds:
+            return False
+        cccId_check_response = self.get(cccId, fresh=True)
         if cccId_check_response.status_code // 100 == 2:
             return True
         else:
             return False
 
-    def _generate_cccId(self, filepath, uuid_strategy="SHA-1"):
+    def _generate_cccId(self, filepath, uuid_strategy=None):
+        if uuid_strategy is None:
+            uuid_strategy = self.uuid_strategy
         filepath = os.path.abspath(filepath)
-        if uuid_strategy.upper() == "RANDOM":
-            cccId = str(uuid.uuid4())
-        elif uuid_strategy.upper() == "MD5":
-            cccId = str(uuid.uuid3(uuid.NAMESPACE_DNS, filepath))
-        elif uuid_strategy.upper() == "SHA-1":
-            cccId = str(uuid.uuid5(uuid.NAMESPACE_DNS, filepath))
-        else:
-            raise RuntimeError(
-                "uuid hashing strategy: {0} not supported\n".format(
-                    uuid_strategy
-                )
-            )
-        return cccId
+        if self._content_algorithm(uuid_strategy) is not None:
+            return self._identify(filepath, uuid_strategy=uuid_strategy)[0]
+        return path_cccId(filepath, uuid_strategy)
 
     def _map_site_to_ip(self, site):
         site_map = {"central": "http://10.73.127.1",
@@ -232,3 +866,46 @@ class DtsRunner(object):
         if user is None:
             user = os.environ['USER']
         return user
+
+
+def path_cccId(filepath, uuid_strategy="SHA-1"):
+    """
+    Generate a cccId from an absolute filepath
+    """
+    if uuid_strategy.upper() == "RANDOM":
+        cccId = str(uuid.uuid4())
+    elif uuid_strategy.upper() == "MD5":
+        cccId = str(uuid.uuid3(uuid.NAMESPACE_DNS, filepath))
+    elif uuid_strategy.upper() == "SHA-1":
+        cccId = str(uuid.uuid5(uuid.NAMESPACE_DNS, filepath))
+    else:
+        raise RuntimeError(
+            "uuid hashing strategy: {0} not supported\n".format(
+                uuid_strategy
+            )
+        )
+    return cccId
+
+
+def _normalize_prefix(prefix):
+    prefix = os.path.abspath(prefix)
+    if prefix != "/":
+        prefix = prefix.rstrip("/")
+    return prefix
+
+
+def _under_prefix(path, prefix):
+    prefix = _normalize_prefix(prefix)
+    if prefix == "/":
+        return path.startswith("/")
+    return path == prefix or path.startswith(prefix + "/")
+
+
+def _path_key(path):
+    # the order scanner.walk_files yields files in
+    return tuple(path.split(os.sep))
+
+
+def _path_cccId_batch(item):
+    filepaths, uuid_strategy = item
+    return [(f, path_cccId(f, uuid_strategy)) for f in filepaths]
@@ -0,0 +1,120 @@
+from __future__ import print_function
+
+import hashlib
+import json
+import math
+import os
+import struct
+import threading
+
+from ccc_client.utils import iter_lines
+
+
+MAGIC = b"CCCBLOOM"
+_HEADER = struct.Struct(">QIQ")
+
+
+def default_bloom_path(host, port):
+    """
+    Filters are kept per DTS instance under ~/.ccc_client
+    """
+    return os.path.join(
+        os.path.expanduser("~"), ".ccc_client",
+        "dts-bloom-{0}-{1}.bin".format(host, port)
+    )
+
+
+class BloomFilter(object):
+    """
+    Compact probabilistic set of cccIds. `in` never gives a false
+    negative, and gives a false positive with probability close to
+    `error_rate` while no more than `capacity` ids have been added.
+    """
+    def __init__(self, capacity=1000000, error_rate=0.001):
+        if capacity < 1 or not 0 < error_rate < 1:
+            raise ValueError(
+                "capacity must be positive and error_rate between 0 and 1"
+            )
+        num_bits = int(math.ceil(
+            -capacity * math.log(error_rate) / math.log(2) ** 2
+        ))
+        num_hashes = max(1, int(round(
+            float(num_bits) / capacity * math.log(2)
+        )))
+        self._setup(num_bits, num_hashes, 0, bytearray((num_bits + 7) // 8))
+
+    def _setup(self, num_bits, num_hashes, count, bits):
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.count = count
+        self.bits = bits
+        self._lock = threading.Lock()
+
+    def _positions(self, cccId):
+        digest = hashlib.sha256(cccId.encode("utf-8")).digest()
+        h1, h2 = struct.unpack(">QQ", digest[:16])
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, cccId):
+        with self._lock:
+            for pos in self._positions(cccId):
+                self.bits[pos >> 3] |= 1 << (pos & 7)
+            self.count += 1
+
+    def update(self, cccIds):
+        for cccId in cccIds:
+            self.add(cccId)
+
+    def __contains__(self, cccId):
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7))
+                   for pos in self._positions(cccId))
+
+    def __len__(self):
+        return self.count
+
+    def save(self, path):
+        with self._lock:
+            with open(path, "wb") as fh:
+                fh.write(MAGIC)
+                fh.write(_HEADER.pack(self.num_bits, self.num_hashes,
+                                      self.count))
+                fh.write(self.bits)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as fh:
+            if fh.read(len(MAGIC)) != MAGIC:
+                raise ValueError("{0} is not a bloom filter".format(path))
+            header = fh.read(_HEADER.size)
+            if len(header) != _HEADER.size:
+                raise ValueError("{0} is truncated".format(path))
+            num_bits, num_hashes, count = _HEADER.unpack(header)
+            bits = bytearray(fh.read())
+        if len(bits) != (num_bits + 7) // 8:
+            raise ValueError("{0} is truncated".format(path))
+        bloom = cls.__new__(cls)
+        bloom._setup(num_bits, num_hashes, count, bits)
+        return bloom
+
+    @classmethod
+    def from_cccIds(cls, cccIds, capacity=1000000, error_rate=0.001):
+        bloom = cls(capacity, error_rate)
+        bloom.update(cccIds)
+        return bloom
+
+
+def iter_export_cccIds(source):
+    """
+    Yield the cccIds in a DTS export: newline delimited cccIds or JSON
+    records, read from a file or from stdin if `source` is '-'.
+    """
+    for line in iter_lines(source):
+        if line.startswith("{"):
+            yield json.loads(line)["cccId"]
+        elif line.startswith("["):
+            for record in json.loads(line):
+                yield record["cccId"]
+        else:
+            yield line
@@ -1,3 +1,6 @@
-from . import get, post, put, delete, query, infer_cccid
+from . import get, post, put, delete, query, infer_cccid, sync, \
+    build_bloom, relocate, delete_prefix, watch, reconcile
 
-__all__ = ['get', 'post', 'put', 'delete', 'query', 'infer_cccid']
+__all__ = ['get', 'post', 'put', 'delete', 'query', 'infer_cccid', 'sync',
+           'build_bloom', 'relocate', 'delete_prefix', 'watch',
+           'reconcile']
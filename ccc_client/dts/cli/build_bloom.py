@@ -0,0 +1,74 @@
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+
+from ccc_client.dts.DtsRunner import DtsRunner
+from ccc_client.dts.bloom import BloomFilter, default_bloom_path, \
+    iter_export_cccIds
+from ccc_client.dts.ledger import Ledger
+
+
+def run(args):
+    if args.fromFile is None and args.ledger is None:
+        print("[ERROR] provide --fromFile and/or --ledger", file=sys.stderr)
+        raise ValueError
+
+    if args.output is None:
+        runner = DtsRunner(args.host, args.port, args.authToken)
+        args.output = default_bloom_path(runner.host, runner.port)
+    dirname = os.path.dirname(os.path.abspath(args.output))
+    if not os.path.isdir(dirname):
+        os.makedirs(dirname)
+
+    bloom = BloomFilter(args.capacity, args.errorRate)
+    if args.fromFile is not None:
+        bloom.update(iter_export_cccIds(args.fromFile))
+    if args.ledger is not None:
+        with Ledger(args.ledger) as ledger:
+            bloom.update(ledger.cccIds())
+    bloom.save(args.output)
+
+    if len(bloom) > args.capacity:
+        print("[WARNING] {0} cccIds exceed the capacity of {1}; the false "
+              "positive rate will be higher than {2}".format(
+                  len(bloom), args.capacity, args.errorRate
+              ), file=sys.stderr)
+    print("{0}\t{1}".format(args.output, len(bloom)))
+
+
+parser = argparse.ArgumentParser(
+    description="Build a bloom filter of registered cccIds, which "
+                "'dts post --bloom' uses to skip existence checks"
+)
+parser.set_defaults(runner=run)
+parser.add_argument(
+    "--fromFile", "-f",
+    type=str,
+    help="DTS export of newline delimited cccIds or JSON records, or '-' "
+         "to read it from stdin"
+)
+parser.add_argument(
+    "--ledger",
+    type=str,
+    help="add the cccIds recorded in this 'dts sync' ledger"
+)
+parser.add_argument(
+    "--output", "-o",
+    type=str,
+    help="where to write the filter "
+         "(default: ~/.ccc_client/dts-bloom-<host>-<port>.bin)"
+)
+parser.add_argument(
+    "--capacity",
+    type=int,
+    default=1000000,
+    help="number of cccIds the filter is sized for (default: 1000000)"
+)
+parser.add_argument(
+    "--errorRate",
+    type=float,
+    default=0.001,
+    help="false positive rate at capacity (default: 0.001)"
+)
@@ -0,0 +1,107 @@
+from __future__ import print_function
+
+import argparse
+import sys
+
+from ccc_client.dts.DtsRunner import DtsRunner
+from ccc_client.dts.index import RecordIndex, default_index_path
+from ccc_client.transport import get_transport
+from ccc_client.utils import Journal, print_API_response
+
+
+def run(args):
+    runner = DtsRunner(args.host, args.port, args.authToken,
+                       transport=get_transport(args.jobs))
+    journal = None
+    failed = 0
+    try:
+        if not args.no_cache:
+            runner.index = RecordIndex(
+                default_index_path(runner.host, runner.port), ttl=args.cacheTtl
+            )
+
+        records = runner.list_records(args.site, args.prefix)
+        if args.journal is not None:
+            journal = Journal(args.journal)
+        todo = len([r for r in records
+                    if journal is None or r['cccId'] not in journal])
+        print("removing {0} of {1} records at {2}".format(
+            todo, len(records), args.site
+        ), file=sys.stderr)
+
+        results = runner.delete_prefix(args.prefix, args.site,
+                                       jobs=args.jobs, journal=journal,
+                                       records=records)
+        for n, (record, action, r, error) in enumerate(results, 1):
+            if error is not None:
+                failed += 1
+                print("[ERROR] Removal failed for {0}: {1!r}".format(
+                    record['cccId'], error
+                ), file=sys.stderr)
+            elif r.status_code // 100 == 2:
+                print("{0}\t{1}".format(record['cccId'], action))
+            else:
+                failed += 1
+                print_API_response(r)
+            if n % args.progress == 0:
+                print("{0}/{1} done".format(n, todo),
+                      file=sys.stderr)
+    finally:
+        if journal is not None:
+            journal.close()
+        runner.close()
+
+    if failed:
+        print("[ERROR] {0} records could not be removed; re-run with the "
+              "same --journal to retry them".format(failed), file=sys.stderr)
+
+
+parser = argparse.ArgumentParser(
+    description="Remove the location at a site of every record under a "
+                "path prefix, deleting records left with no location"
+)
+parser.set_defaults(runner=run)
+parser.add_argument(
+    "--prefix", "-p",
+    required=True,
+    type=str,
+    help="path prefix of the records to remove"
+)
+parser.add_argument(
+    "--site", "-s",
+    required=True,
+    type=str,
+    choices=["central", "dfci", "ohsu", "oicr"],
+    help="site the data resides at"
+)
+parser.add_argument(
+    "--jobs", "-j",
+    type=int,
+    default=1,
+    help="number of records to remove concurrently (default: 1)"
+)
+parser.add_argument(
+    "--journal",
+    type=str,
+    help="file recording the records already removed; re-running with "
+         "the same journal resumes an interrupted removal"
+)
+parser.add_argument(
+    "--progress",
+    type=int,
+    default=100,
+    help="report progress every this many records (default: 100)"
+)
+parser.add_argument(
+    "--no-cache",
+    dest="no_cache",
+    action="store_true",
+    help="bypass the local index of DTS records"
+)
+parser.add_argument(
+    "--cacheTtl",
+    type=int,
+    default=3600,
+    help="seconds a record in the local index is trusted for "
+         "(default: 3600)"
+)
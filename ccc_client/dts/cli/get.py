@@ -1,14 +1,45 @@
+from __future__ import print_function
+
 import argparse
+import itertools
+import sys
 
 from ccc_client.dts.DtsRunner import DtsRunner
-from ccc_client.utils import print_API_response
+from ccc_client.dts.index import RecordIndex, default_index_path
+from ccc_client.transport import get_transport
+from ccc_client.utils import print_API_response, iter_lines, ndjson_result
 
 
 def run(args):
-    runner = DtsRunner(args.host, args.port, args.authToken)
-    for i in args.cccId:
-        r = runner.get(i)
-        print_API_response(r)
+    runner = DtsRunner(args.host, args.port, args.authToken,
+                       transport=get_transport(args.jobs))
+    try:
+        if not args.no_cache:
+            runner.index = RecordIndex(
+                default_index_path(runner.host, runner.port), ttl=args.cacheTtl
+            )
+        if args.fromFile is None and args.jobs == 1:
+            if not args.cccId:
+                print("[ERROR] provide cccId(s) or --fromFile",
+                      file=sys.stderr)
+                raise ValueError
+            for i in args.cccId:
+                r = runner.get(i)
+                print_API_response(r)
+        else:
+            cccIds = args.cccId
+            if args.fromFile is not None:
+                cccIds = itertools.chain(cccIds, iter_lines(args.fromFile))
+            results = runner.get_many(cccIds, jobs=args.jobs,
+                                      ordered=args.ordered)
+            for i, r, error in results:
+                print(ndjson_result({"cccId": i}, r, error))
+        if runner.index is not None and args.debug:
+            print("[DEBUG] local index hits: {0}, misses: {1}".format(
+                runner.index.hits, runner.index.misses
+            ), file=sys.stderr)
+    finally:
+        runner.close()
 
 
 parser = argparse.ArgumentParser()
@@ -16,6 +47,37 @@ parser.set_defaults(runner=run)
 parser.add_argument(
     "cccId",
     type=str,
-    nargs="+",
+    nargs="*",
     help="cccId entry to GET"
 )
+parser.add_argument(
+    "--fromFile", "-f",
+    type=str,
+    help="also read newline delimited cccIds from this file, or from "
+         "stdin if '-'; results are written as one JSON line per cccId"
+)
+parser.add_argument(
+    "--jobs", "-j",
+    type=int,
+    default=1,
+    help="number of requests to run concurrently; above 1, results are "
+         "written as one JSON line per cccId (default: 1)"
+)
+parser.add_argument(
+    "--ordered",
+    action="store_true",
+    help="write JSON lines in input order rather than as requests complete"
+)
+parser.add_argument(
+    "--no-cache",
+    dest="no_cache",
+    action="store_true",
+    help="bypass the local index of DTS records"
+)
+parser.add_argument(
+    "--cacheTtl",
+    type=int,
+    default=3600,
+    help="seconds a record in the local index is trusted for "
+         "(default: 3600)"
+)
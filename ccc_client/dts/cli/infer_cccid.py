@@ -1,15 +1,40 @@
+from __future__ import print_function
+
 import argparse
+import sys
 
 from ccc_client.dts.DtsRunner import DtsRunner
-from ccc_client.utils import resolve_filepath_from_pattern
+from ccc_client.dts.hashing import default_cache_path
+from ccc_client.utils import TsvWriter, iter_filepath_from_pattern, \
+    iter_lines
 
 
 def run(args):
-    runner = DtsRunner(args.host, args.port, args.authToken)
-    file_list = resolve_filepath_from_pattern(args.filepath)
-    for file_iter in file_list:
-        cccId = runner.infer_cccId(file_iter, args.strategy)
-        print("{0}\t{1}".format(file_iter, cccId))
+    runner = DtsRunner(args.host, args.port, args.authToken,
+                       uuid_strategy=args.strategy,
+                       hash_cache=args.hashCache)
+    try:
+        if args.fromFile is not None:
+            file_list = iter_lines(args.fromFile, strip=False)
+        elif args.filepath:
+            file_list = iter_filepath_from_pattern(args.filepath)
+        else:
+            print("[ERROR] provide filepath(s) or --fromFile",
+                  file=sys.stderr)
+            raise ValueError
+
+        results = runner.infer_cccIds(file_list, jobs=args.jobs,
+                                      batch_size=args.batchSize)
+        with TsvWriter(sys.stdout) as writer:
+            for file_iter, cccId, error in results:
+                if error is not None:
+                    print("[ERROR] Unable to hash {0}: {1!r}".format(
+                        file_iter, error
+                    ), file=sys.stderr)
+                else:
+                    writer.writerow(file_iter, cccId)
+    finally:
+        runner.close()
 
 
 parser = argparse.ArgumentParser()
@@ -17,13 +42,40 @@ parser.set_defaults(runner=run)
 parser.add_argument(
     "filepath",
     type=str,
-    nargs="+",
-    help="name of file(s) or pattern to glob on"
+    nargs="*",
+    help="name of file(s) or pattern to glob on; '**' matches"
+         " any number of directories"
+)
+parser.add_argument(
+    "--fromFile", "-f",
+    type=str,
+    help="read newline delimited filepaths from this file instead, "
+         "or from stdin if '-'; paths are not globbed"
 )
 parser.add_argument(
     "--strategy", "-s",
     type=str,
     default="SHA-1",
-    choices=["MD5", "SHA-1"],
-    help="hashing strategy to use to generate the cccId (default: SHA-1)"
+    choices=["MD5", "SHA-1", "CONTENT-SHA256", "CONTENT-BLAKE2B"],
+    help="hashing strategy to use to generate the cccId; the CONTENT-* "
+         "strategies hash the file contents (default: SHA-1)"
+)
+parser.add_argument(
+    "--hashCache",
+    type=str,
+    default=default_cache_path(),
+    help="cache of content hashes used by the CONTENT-* strategies "
+         "(default: ~/.ccc_client/hash-cache.sqlite)"
+)
+parser.add_argument(
+    "--jobs", "-j",
+    type=int,
+    default=1,
+    help="number of worker processes (default: 1)"
+)
+parser.add_argument(
+    "--batchSize",
+    type=int,
+    default=10000,
+    help="paths handed to a worker at a time (default: 10000)"
 )
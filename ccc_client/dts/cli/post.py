@@ -1,21 +1,57 @@
+from __future__ import print_function
+
 import argparse
+import sys
 
 from ccc_client.dts.DtsRunner import DtsRunner
-from ccc_client.utils import print_API_response, resolve_filepath_from_pattern
+from ccc_client.dts.bloom import BloomFilter
+from ccc_client.dts.hashing import default_cache_path
+from ccc_client.dts.index import RecordIndex, default_index_path
+from ccc_client.transport import get_transport
+from ccc_client.utils import print_API_response, iter_filepath_from_pattern
 
 
 def run(args):
-    runner = DtsRunner(args.host, args.port, args.authToken)
-    file_list = resolve_filepath_from_pattern(args.filepath)
-
-    for file_iter in file_list:
-        r = runner.post(file_iter, args.site,
-                        args.user, args.cccId)
+    runner = DtsRunner(args.host, args.port, args.authToken,
+                       transport=get_transport(args.jobs),
+                       uuid_strategy=args.strategy,
+                       hash_cache=args.hashCache)
+    loaded = None
+    try:
+        if args.bloom is not None:
+            runner.known_cccIds = BloomFilter.load(args.bloom)
+            loaded = len(runner.known_cccIds)
+        if not args.no_cache:
+            runner.index = RecordIndex(
+                default_index_path(runner.host, runner.port), ttl=args.cacheTtl
+            )
+        file_list = iter_filepath_from_pattern(args.filepath)
 
-        if r.status_code // 100 == 2:
-            print("{0}\t{1}".format(file_iter, r.text))
+        if args.cccId is not None:
+            # a user supplied cccId only makes sense for a single file, so keep
+            # the serial path and let a conflict stop the run
+            results = (
+                (f, runner.post(f, args.site, args.user, args.cccId), None)
+                for f in file_list
+            )
         else:
-            print_API_response(r)
+            results = runner.post_many(file_list, args.site, args.user,
+                                       jobs=args.jobs)
+
+        for file_iter, r, error in results:
+            if error is not None:
+                print("[ERROR] Registration failed for {0}: {1!r}".format(
+                    file_iter, error
+                ), file=sys.stderr)
+            elif r.status_code // 100 == 2:
+                print("{0}\t{1}".format(file_iter, r.text))
+            else:
+                print_API_response(r)
+    finally:
+        # keep the cccIds registered by this run in the filter
+        if loaded is not None and len(runner.known_cccIds) != loaded:
+            runner.known_cccIds.save(args.bloom)
+        runner.close()
 
 
 parser = argparse.ArgumentParser()
@@ -25,7 +61,8 @@ parser.add_argument(
     required=True,
     type=str,
     nargs="+",
-    help="name of file(s) and/or pattern(s) to glob on"
+    help="name of file(s) and/or pattern(s) to glob on; '**' matches"
+         " any number of directories"
 )
 parser.add_argument(
     "--user", "-u",
@@ -48,3 +85,46 @@ parser.add_argument(
     type=str,
     help="cccId; if not given one will be generated automatically"
 )
+parser.add_argument(
+    "--jobs", "-j",
+    required=False,
+    default=1,
+    type=int,
+    help="number of files to register concurrently (default: 1)"
+)
+parser.add_argument(
+    "--strategy",
+    type=str,
+    default="SHA-1",
+    choices=["MD5", "SHA-1", "CONTENT-SHA256", "CONTENT-BLAKE2B"],
+    help="strategy used to generate cccIds; the CONTENT-* strategies hash "
+         "the file contents and add a checksum to the record "
+         "(default: SHA-1)"
+)
+parser.add_argument(
+    "--hashCache",
+    type=str,
+    default=default_cache_path(),
+    help="cache of content hashes used by the CONTENT-* strategies "
+         "(default: ~/.ccc_client/hash-cache.sqlite)"
+)
+parser.add_argument(
+    "--no-cache",
+    dest="no_cache",
+    action="store_true",
+    help="bypass the local index of DTS records"
+)
+parser.add_argument(
+    "--cacheTtl",
+    type=int,
+    default=3600,
+    help="seconds a record in the local index is trusted for "
+         "(default: 3600)"
+)
+parser.add_argument(
+    "--bloom",
+    type=str,
+    help="bloom filter of every registered cccId, from 'dts build-bloom'; "
+         "a --cccId it does not contain is not checked with the DTS, and "
+         "the cccIds registered are added to it"
+)
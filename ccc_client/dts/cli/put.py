@@ -1,22 +1,90 @@
+from __future__ import print_function
+
 import argparse
+import sys
+from collections import Counter
 
 from ccc_client.dts.DtsRunner import DtsRunner
-from ccc_client.utils import print_API_response
+from ccc_client.dts.hashing import default_cache_path
+from ccc_client.dts.index import RecordIndex, default_index_path
+from ccc_client.transport import get_transport
+from ccc_client.utils import print_API_response, iter_filepath_from_pattern, \
+    iter_lines
 
 
 def run(args):
-    runner = DtsRunner(args.host, args.port, args.authToken)
-    r = runner.put(args.cccId, args.filepath, args.site, args.user)
-    print_API_response(r)
+    runner = DtsRunner(args.host, args.port, args.authToken,
+                       transport=get_transport(args.jobs),
+                       uuid_strategy=args.strategy,
+                       hash_cache=args.hashCache)
+    try:
+        if not args.no_cache:
+            runner.index = RecordIndex(
+                default_index_path(runner.host, runner.port), ttl=args.cacheTtl
+            )
+
+        if args.cccId is not None:
+            if args.filepath is None or len(args.filepath) != 1:
+                print("[ERROR] --cccId requires exactly one --filepath",
+                      file=sys.stderr)
+                raise ValueError
+            r = runner.put(args.cccId, args.filepath[0], args.site, args.user)
+            print_API_response(r)
+            return
+
+        if args.fromFile is not None:
+            items = _manifest_items(args.fromFile)
+        elif args.filepath is not None:
+            items = iter_filepath_from_pattern(args.filepath)
+        else:
+            print("[ERROR] provide --filepath or --fromFile", file=sys.stderr)
+            raise ValueError
+
+        counts = Counter()
+        results = runner.put_many(items, args.site, args.user, jobs=args.jobs)
+        for item, status, r, error in results:
+            counts[status] += 1
+            filepath = item[1] if isinstance(item, tuple) else item
+            if error is not None:
+                print("[ERROR] Update failed for {0}: {1!r}".format(
+                    filepath, error
+                ), file=sys.stderr)
+            elif status == "failed":
+                print_API_response(r)
+            else:
+                print("{0}\t{1}".format(filepath, status))
+
+        print("unchanged: {0}, updated: {1}, failed: {2}".format(
+            counts["unchanged"], counts["updated"], counts["failed"]
+        ), file=sys.stderr)
+    finally:
+        runner.close()
+
+
+def _manifest_items(source):
+    # "filepath" or "filepath<TAB>cccId", as written by infer-cccId
+    for line in iter_lines(source, strip=False):
+        fields = line.split("\t")
+        if len(fields) > 1:
+            yield fields[1].strip(), fields[0]
+        else:
+            yield fields[0]
 
 
 parser = argparse.ArgumentParser()
 parser.set_defaults(runner=run)
 parser.add_argument(
     "--filepath", "-f",
-    required=True,
     type=str,
-    help="filepath"
+    nargs="+",
+    help="filepath; without --cccId, any number of files and/or patterns "
+         "to glob on, whose cccIds are generated with --strategy"
+)
+parser.add_argument(
+    "--fromFile",
+    type=str,
+    help="read newline delimited 'filepath' or 'filepath<TAB>cccId' "
+         "entries from this file, or from stdin if '-'"
 )
 parser.add_argument(
     "--user", "-u",
@@ -34,7 +102,41 @@ parser.add_argument(
 )
 parser.add_argument(
     "--cccId", "-i",
-    required=True,
     type=str,
-    help="cccId entry to update"
+    help="cccId entry to update; requires a single --filepath"
+)
+parser.add_argument(
+    "--jobs", "-j",
+    type=int,
+    default=1,
+    help="number of files to update concurrently (default: 1)"
+)
+parser.add_argument(
+    "--strategy",
+    type=str,
+    default="SHA-1",
+    choices=["MD5", "SHA-1", "CONTENT-SHA256", "CONTENT-BLAKE2B"],
+    help="strategy used to generate cccIds; the CONTENT-* strategies hash "
+         "the file contents and add a checksum to the record "
+         "(default: SHA-1)"
+)
+parser.add_argument(
+    "--hashCache",
+    type=str,
+    default=default_cache_path(),
+    help="cache of content hashes used by the CONTENT-* strategies "
+         "(default: ~/.ccc_client/hash-cache.sqlite)"
+)
+parser.add_argument(
+    "--no-cache",
+    dest="no_cache",
+    action="store_true",
+    help="bypass the local index of DTS records"
+)
+parser.add_argument(
+    "--cacheTtl",
+    type=int,
+    default=3600,
+    help="seconds a record in the local index is trusted for "
+         "(default: 3600)"
 )
@@ -1,15 +1,50 @@
+from __future__ import print_function
+
 import argparse
+import json
+import sys
 
 from ccc_client.dts.DtsRunner import DtsRunner
-from ccc_client.utils import print_API_response, resolve_filepath_from_pattern
+from ccc_client.dts.index import RecordIndex, default_index_path
+from ccc_client.transport import get_transport
+from ccc_client.utils import print_API_response, iter_filepath_from_pattern
 
 
 def run(args):
-    runner = DtsRunner(args.host, args.port, args.authToken)
-    file_list = resolve_filepath_from_pattern(args.filepath)
-    for file_iter in file_list:
-        r = runner.query(file_iter, args.site)
-        print_API_response(r)
+    runner = DtsRunner(args.host, args.port, args.authToken,
+                       transport=get_transport(args.jobs))
+    try:
+        if not args.no_cache:
+            runner.index = RecordIndex(
+                default_index_path(runner.host, runner.port), ttl=args.cacheTtl
+            )
+        file_list = iter_filepath_from_pattern(args.filepath)
+        if len(args.site) == 1 and args.jobs == 1:
+            for file_iter in file_list:
+                r = runner.query(file_iter, args.site[0])
+                print_API_response(r)
+        else:
+            results = runner.query_many(file_list, args.site, jobs=args.jobs)
+            for file_iter, records, errors in results:
+                print(json.dumps({
+                    "filepath": file_iter,
+                    "records": records,
+                    "errors": dict((site, _describe_error(e))
+                                   for site, e in errors.items())
+                }, sort_keys=True))
+
+        if runner.index is not None and args.debug:
+            print("[DEBUG] local index hits: {0}, misses: {1}".format(
+                runner.index.hits, runner.index.misses
+            ), file=sys.stderr)
+    finally:
+        runner.close()
+
+
+def _describe_error(error):
+    if isinstance(error, Exception):
+        return repr(error)
+    return "[STATUS CODE - {0}] {1}".format(error.status_code, error.text)
 
 
 parser = argparse.ArgumentParser()
@@ -18,14 +53,24 @@ parser.add_argument(
     "filepath",
     type=str,
     nargs="+",
-    help="name of file(s) and/or pattern(s) to glob on"
+    help="name of file(s) and/or pattern(s) to glob on; '**' matches"
+         " any number of directories"
 )
 parser.add_argument(
     "--site", "-s",
     required=True,
     type=str,
+    action="append",
     choices=["central", "dfci", "ohsu", "oicr"],
-    help="site the data resides at"
+    help="site to look for the data at; repeat to query several sites. "
+         "With more than one site or --jobs above 1, the results for each "
+         "file are merged into one JSON line"
+)
+parser.add_argument(
+    "--jobs", "-j",
+    type=int,
+    default=1,
+    help="number of queries to run concurrently (default: 1)"
 )
 parser.add_argument(
     "query_terms",
@@ -35,3 +80,16 @@ parser.add_argument(
          "Can be specified multiple times. "
          "Should be supplied in the form 'FieldName:Term'"
 )
+parser.add_argument(
+    "--no-cache",
+    dest="no_cache",
+    action="store_true",
+    help="bypass the local index of DTS records"
+)
+parser.add_argument(
+    "--cacheTtl",
+    type=int,
+    default=3600,
+    help="seconds a record in the local index is trusted for "
+         "(default: 3600)"
+)
@@ -0,0 +1,133 @@
+from __future__ import print_function
+
+import argparse
+import sys
+from collections import Counter
+
+from ccc_client.dts.DtsRunner import DtsRunner
+from ccc_client.dts.hashing import default_cache_path
+from ccc_client.dts.index import RecordIndex, default_index_path
+from ccc_client.transport import get_transport
+from ccc_client.utils import print_API_response
+
+
+def run(args):
+    runner = DtsRunner(args.host, args.port, args.authToken,
+                       transport=get_transport(args.jobs),
+                       uuid_strategy=args.strategy,
+                       hash_cache=args.hashCache)
+    try:
+        if not args.no_cache:
+            runner.index = RecordIndex(
+                default_index_path(runner.host, runner.port), ttl=args.cacheTtl
+            )
+
+        counts = Counter()
+
+        def report():
+            diffs = runner.reconcile(args.prefix, args.site, jobs=args.jobs)
+            for diff in diffs:
+                counts[diff[0]] += 1
+                yield diff
+
+        if not args.apply:
+            for status, filepath, local, remote in report():
+                if status != "ok" or args.all:
+                    cccId = (remote or {}).get('cccId') or local.cccId
+                    print("{0}\t{1}\t{2}".format(status, filepath, cccId))
+        else:
+            results = runner.apply_reconcile(report(), args.site, args.user,
+                                             jobs=args.jobs)
+            for diff, action, r, error in results:
+                if error is not None:
+                    counts["failed"] += 1
+                    print("[ERROR] Unable to fix {0}: {1!r}".format(
+                        diff[1], error
+                    ), file=sys.stderr)
+                elif r.status_code // 100 == 2:
+                    print("{0}\t{1}\t{2}".format(diff[0], diff[1], action))
+                else:
+                    counts["failed"] += 1
+                    print_API_response(r)
+
+        print(", ".join(
+            "{0}: {1}".format(key, counts[key])
+            for key in ["ok", "unregistered", "missing", "size-mismatch",
+                        "duplicate", "failed"]
+            if args.apply or key != "failed"
+        ), file=sys.stderr)
+    finally:
+        runner.close()
+
+
+parser = argparse.ArgumentParser(
+    description="Compare a local directory tree with the DTS records at a "
+                "site, and optionally fix the differences"
+)
+parser.set_defaults(runner=run)
+parser.add_argument(
+    "--prefix", "-p",
+    required=True,
+    type=str,
+    help="local directory, and path prefix of the records, to compare"
+)
+parser.add_argument(
+    "--site", "-s",
+    required=True,
+    type=str,
+    choices=["central", "dfci", "ohsu", "oicr"],
+    help="site the data resides at"
+)
+parser.add_argument(
+    "--apply",
+    action="store_true",
+    help="register unregistered files, update mismatched sizes and remove "
+         "records of missing files from the site"
+)
+parser.add_argument(
+    "--all",
+    action="store_true",
+    help="also report files that match their record"
+)
+parser.add_argument(
+    "--user", "-u",
+    required=False,
+    type=str,
+    help="site user"
+)
+parser.add_argument(
+    "--jobs", "-j",
+    type=int,
+    default=1,
+    help="number of files to stat, and with --apply requests to run, "
+         "concurrently (default: 1)"
+)
+parser.add_argument(
+    "--strategy",
+    type=str,
+    default="SHA-1",
+    choices=["MD5", "SHA-1", "CONTENT-SHA256", "CONTENT-BLAKE2B"],
+    help="strategy used to generate cccIds; the CONTENT-* strategies hash "
+         "the file contents and add a checksum to the record "
+         "(default: SHA-1)"
+)
+parser.add_argument(
+    "--hashCache",
+    type=str,
+    default=default_cache_path(),
+    help="cache of content hashes used by the CONTENT-* strategies "
+         "(default: ~/.ccc_client/hash-cache.sqlite)"
+)
+parser.add_argument(
+    "--no-cache",
+    dest="no_cache",
+    action="store_true",
+    help="bypass the local index of DTS records"
+)
+parser.add_argument(
+    "--cacheTtl",
+    type=int,
+    default=3600,
+    help="seconds a record in the local index is trusted for "
+         "(default: 3600)"
+)
@@ -0,0 +1,125 @@
+from __future__ import print_function
+
+import argparse
+import sys
+from collections import Counter
+
+from ccc_client.dts.DtsRunner import DtsRunner
+from ccc_client.dts.hashing import default_cache_path
+from ccc_client.dts.ledger import Ledger, default_ledger_path
+from ccc_client.dts.index import RecordIndex, default_index_path
+from ccc_client.transport import get_transport
+from ccc_client.utils import print_API_response, iter_filepath_from_pattern
+
+
+def run(args):
+    runner = DtsRunner(args.host, args.port, args.authToken,
+                       transport=get_transport(args.jobs),
+                       uuid_strategy=args.strategy,
+                       hash_cache=args.hashCache)
+    try:
+        if not args.no_cache:
+            runner.index = RecordIndex(
+                default_index_path(runner.host, runner.port), ttl=args.cacheTtl
+            )
+        if args.ledger is None:
+            args.ledger = default_ledger_path(runner.host, runner.port)
+
+        counts = Counter()
+        with Ledger(args.ledger) as ledger:
+            paths = iter_filepath_from_pattern(args.filepath)
+            results = runner.sync(paths, args.site, ledger, args.user,
+                                  jobs=args.jobs)
+            for record, action, r, error in results:
+                if error is not None:
+                    counts["failed"] += 1
+                    print("[ERROR] Sync failed for {0}: {1!r}".format(
+                        record.path, error
+                    ), file=sys.stderr)
+                elif action == "unchanged":
+                    counts[action] += 1
+                elif r.status_code // 100 == 2:
+                    counts[action] += 1
+                    print("{0}\t{1}\t{2}".format(record.path, action, r.text))
+                else:
+                    counts["failed"] += 1
+                    print_API_response(r)
+
+        print("posted: {0}, updated: {1}, unchanged: {2}, failed: {3}".format(
+            counts["posted"], counts["updated"], counts["unchanged"],
+            counts["failed"]
+        ), file=sys.stderr)
+    finally:
+        runner.close()
+
+
+parser = argparse.ArgumentParser(
+    description="Register new and changed files, skipping files that are "
+                "unchanged since the last sync"
+)
+parser.set_defaults(runner=run)
+parser.add_argument(
+    "--filepath", "-f",
+    required=True,
+    type=str,
+    nargs="+",
+    help="file(s), directories and/or pattern(s) to glob on; directories "
+         "are walked recursively"
+)
+parser.add_argument(
+    "--user", "-u",
+    required=False,
+    type=str,
+    help="user identity"
+)
+parser.add_argument(
+    "--site", "-s",
+    required=True,
+    type=str,
+    nargs="+",
+    choices=["central", "dfci", "ohsu", "oicr"],
+    help="site the data resides at"
+)
+parser.add_argument(
+    "--ledger", "-l",
+    required=False,
+    type=str,
+    help="path of the local registration ledger "
+         "(default: ~/.ccc_client/dts-ledger-<host>-<port>.sqlite)"
+)
+parser.add_argument(
+    "--jobs", "-j",
+    required=False,
+    default=1,
+    type=int,
+    help="number of files to register concurrently (default: 1)"
+)
+parser.add_argument(
+    "--strategy",
+    type=str,
+    default="SHA-1",
+    choices=["MD5", "SHA-1", "CONTENT-SHA256", "CONTENT-BLAKE2B"],
+    help="strategy used to generate cccIds; the CONTENT-* strategies hash "
+         "the file contents and add a checksum to the record "
+         "(default: SHA-1)"
+)
+parser.add_argument(
+    "--hashCache",
+    type=str,
+    default=default_cache_path(),
+    help="cache of content hashes used by the CONTENT-* strategies "
+         "(default: ~/.ccc_client/hash-cache.sqlite)"
+)
+parser.add_argument(
+    "--no-cache",
+    dest="no_cache",
+    action="store_true",
+    help="bypass the local index of DTS records"
+)
+parser.add_argument(
+    "--cacheTtl",
+    type=int,
+    default=3600,
+    help="seconds a record in the local index is trusted for "
+         "(default: 3600)"
+)
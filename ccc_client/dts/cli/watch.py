@@ -0,0 +1,130 @@
+from __future__ import print_function
+
+import argparse
+import sys
+
+from ccc_client.dts.DtsRunner import DtsRunner
+from ccc_client.dts.hashing import default_cache_path
+from ccc_client.dts.index import RecordIndex, default_index_path
+from ccc_client.transport import get_transport
+from ccc_client.utils import print_API_response
+
+
+def run(args):
+    runner = DtsRunner(args.host, args.port, args.authToken,
+                       transport=get_transport(args.jobs),
+                       uuid_strategy=args.strategy,
+                       hash_cache=args.hashCache)
+    try:
+        if not args.no_cache:
+            runner.index = RecordIndex(
+                default_index_path(runner.host, runner.port), ttl=args.cacheTtl
+            )
+
+        results = runner.watch(args.filepath, args.site, args.user,
+                               jobs=args.jobs, settle=args.settle,
+                               interval=args.interval,
+                               batch_size=args.batchSize, poll=args.poll)
+        try:
+            for file_iter, r, error in results:
+                if error is not None:
+                    print("[ERROR] Registration failed for {0}: {1!r}".format(
+                        file_iter, error
+                    ), file=sys.stderr)
+                elif r.status_code // 100 == 2:
+                    print("{0}\t{1}".format(file_iter, r.text))
+                else:
+                    print_API_response(r)
+                sys.stdout.flush()
+        except KeyboardInterrupt:
+            pass
+    finally:
+        runner.close()
+
+
+parser = argparse.ArgumentParser(
+    description="Register files as they appear under the given "
+                "directories, once they have stopped growing"
+)
+parser.set_defaults(runner=run)
+parser.add_argument(
+    "--filepath", "-f",
+    required=True,
+    type=str,
+    nargs="+",
+    help="directories to watch, recursively; files already present are "
+         "left to 'dts sync'"
+)
+parser.add_argument(
+    "--user", "-u",
+    required=False,
+    type=str,
+    help="site user"
+)
+parser.add_argument(
+    "--site", "-s",
+    required=True,
+    type=str,
+    nargs="+",
+    choices=["central", "dfci", "ohsu", "oicr"],
+    help="site the data resides at"
+)
+parser.add_argument(
+    "--settle",
+    type=float,
+    default=5.0,
+    help="seconds a file must stay unchanged before it is registered "
+         "(default: 5)"
+)
+parser.add_argument(
+    "--interval",
+    type=float,
+    default=1.0,
+    help="seconds between checks for settled files (default: 1)"
+)
+parser.add_argument(
+    "--batchSize",
+    type=int,
+    default=100,
+    help="most files registered per micro-batch (default: 100)"
+)
+parser.add_argument(
+    "--poll",
+    action="store_true",
+    help="list the directories every --interval instead of using inotify"
+)
+parser.add_argument(
+    "--jobs", "-j",
+    type=int,
+    default=1,
+    help="number of files to register concurrently (default: 1)"
+)
+parser.add_argument(
+    "--strategy",
+    type=str,
+    default="SHA-1",
+    choices=["MD5", "SHA-1", "CONTENT-SHA256", "CONTENT-BLAKE2B"],
+    help="strategy used to generate cccIds; the CONTENT-* strategies hash "
+         "the file contents and add a checksum to the record "
+         "(default: SHA-1)"
+)
+parser.add_argument(
+    "--hashCache",
+    type=str,
+    default=default_cache_path(),
+    help="cache of content hashes used by the CONTENT-* strategies "
+         "(default: ~/.ccc_client/hash-cache.sqlite)"
+)
+parser.add_argument(
+    "--no-cache",
+    dest="no_cache",
+    action="store_true",
+    help="bypass the local index of DTS records"
+)
+parser.add_argument(
+    "--cacheTtl",
+    type=int,
+    default=3600,
+    help="seconds a record in the local index is trusted for "
+         "(default: 3600)"
+)
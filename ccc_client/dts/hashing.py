@@ -0,0 +1,196 @@
+from __future__ import print_function
+
+import hashlib
+import mmap
+import os
+import sqlite3
+import threading
+import uuid
+
+from ccc_client.utils import bounded_map
+
+
+# hash this much of a mapped file per update call
+CHUNK_SIZE = 64 * 1024 * 1024
+
+ALGORITHMS = ["sha256", "blake2b"]
+
+
+def default_cache_path():
+    return os.path.join(os.path.expanduser("~"), ".ccc_client",
+                        "hash-cache.sqlite")
+
+
+def hash_file(filepath, algorithm="sha256"):
+    """
+    Return the hex digest of the contents of `filepath`. The file is
+    mmap'd and fed to the hash in fixed-size chunks, so nothing is copied
+    into Python and memory use does not grow with file size.
+    """
+    if algorithm not in ALGORITHMS:
+        raise RuntimeError(
+            "hash algorithm: {0} not supported\n".format(algorithm)
+        )
+    h = hashlib.new(algorithm)
+    with open(filepath, "rb") as fh:
+        size = os.fstat(fh.fileno()).st_size
+        if size == 0:
+            return h.hexdigest()
+        mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            view = memoryview(mm)
+            try:
+                for offset in range(0, size, CHUNK_SIZE):
+                    h.update(view[offset:offset + CHUNK_SIZE])
+            finally:
+                view.release()
+        finally:
+            mm.close()
+    return h.hexdigest()
+
+
+def content_cccId(algorithm, hexdigest):
+    """
+    Derive a cccId from a content digest; the same bytes always get the
+    same id, wherever the file lives.
+    """
+    return str(uuid.uuid5(uuid.NAMESPACE_DNS,
+                          "{0}:{1}".format(algorithm, hexdigest)))
+
+
+def _cache_key(st):
+    mtime_ns = getattr(st, "st_mtime_ns", None)
+    if mtime_ns is None:
+        mtime_ns = int(st.st_mtime * 1e9)
+    return (st.st_dev, st.st_ino, st.st_size, mtime_ns)
+
+
+def _hash_job(item):
+    filepath, algorithm = item
+    return hash_file(filepath, algorithm)
+
+
+class HashCache(object):
+    """
+    Persistent SQLite cache of content digests keyed on
+    (device, inode, size, mtime), so unchanged files are never re-hashed.
+    Safe to share between threads.
+    """
+    def __init__(self, path=None, commit_every=100):
+        if path is None:
+            path = default_cache_path()
+        self.path = path
+        self.commit_every = commit_every
+        self._uncommitted = 0
+
+        dirname = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS digests ("
+            "dev INTEGER, ino INTEGER, size INTEGER, mtime_ns INTEGER, "
+            "algorithm TEXT, digest TEXT NOT NULL, "
+            "PRIMARY KEY (dev, ino, size, mtime_ns, algorithm))"
+        )
+        self.conn.commit()
+
+    def get(self, st, algorithm):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT digest FROM digests WHERE dev = ? AND ino = ? "
+                "AND size = ? AND mtime_ns = ? AND algorithm = ?",
+                _cache_key(st) + (algorithm,)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0]
+
+    def put(self, st, algorithm, digest):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO digests "
+                "(dev, ino, size, mtime_ns, algorithm, digest) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                _cache_key(st) + (algorithm, digest)
+            )
+            self._uncommitted += 1
+            if self._uncommitted >= self.commit_every:
+                self.conn.commit()
+                self._uncommitted = 0
+
+    def close(self):
+        with self._lock:
+            self.conn.commit()
+            self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class ContentHasher(object):
+    """
+    Compute content digests, consulting an optional HashCache first.
+    """
+    def __init__(self, algorithm="sha256", cache=None):
+        if algorithm not in ALGORITHMS:
+            raise RuntimeError(
+                "hash algorithm: {0} not supported\n".format(algorithm)
+            )
+        self.algorithm = algorithm
+        self.cache = cache
+
+    def digest(self, filepath, st=None):
+        """
+        Return the hex digest of `filepath`. `st` may be a stat result the
+        caller already has.
+        """
+        if st is None:
+            st = os.stat(filepath)
+        if self.cache is not None:
+            cached = self.cache.get(st, self.algorithm)
+            if cached is not None:
+                return cached
+        digest = hash_file(filepath, self.algorithm)
+        if self.cache is not None:
+            self.cache.put(st, self.algorithm, digest)
+        return digest
+
+    def digest_many(self, filepaths, jobs=1):
+        """
+        Yield (filepath, digest, error) tuples for `filepaths` as they
+        complete. Cache hits are answered in this process; misses are
+        hashed across `jobs` worker processes.
+        """
+        stats = {}
+
+        def items():
+            for filepath in filepaths:
+                yield filepath, self.algorithm
+
+        def check_cache(item):
+            filepath = item[0]
+            try:
+                st = os.stat(filepath)
+            except OSError:
+                # let the worker report it
+                return None
+            cached = None
+            if self.cache is not None:
+                cached = self.cache.get(st, self.algorithm)
+            if cached is None:
+                stats[filepath] = st
+            return cached
+
+        results = bounded_map(_hash_job, items(), jobs, processes=jobs > 1,
+                              shortcut=check_cache)
+        for (filepath, _), digest, error in results:
+            st = stats.pop(filepath, None)
+            if error is None and self.cache is not None and st is not None:
+                self.cache.put(st, self.algorithm, digest)
+            yield filepath, digest, error
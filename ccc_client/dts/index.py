@@ -0,0 +1,166 @@
+from __future__ import print_function
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+def default_index_path(host, port):
+    """
+    Indexes are kept per DTS instance under ~/.ccc_client
+    """
+    return os.path.join(
+        os.path.expanduser("~"), ".ccc_client",
+        "dts-index-{0}-{1}.sqlite".format(host, port)
+    )
+
+
+class RecordIndex(object):
+    """
+    Local read-through index of DTS records, stored in SQLite.
+
+    Records are keyed by cccId; query answers are keyed by
+    (name, path, site) and point at the cccIds they returned. Entries
+    older than `ttl` seconds are treated as missing. Safe to share
+    between threads; `hits` and `misses` count lookups.
+    """
+    def __init__(self, path, ttl=3600):
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+        dirname = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS records ("
+            "cccId TEXT PRIMARY KEY, body TEXT NOT NULL, "
+            "fetched REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS queries ("
+            "name TEXT, path TEXT, site TEXT, cccIds TEXT NOT NULL, "
+            "fetched REAL NOT NULL, PRIMARY KEY (name, path, site))"
+        )
+        self.conn.commit()
+
+    def get(self, cccId):
+        """
+        Return the indexed record body for `cccId` if it is fresh.
+        """
+        with self._lock:
+            body = self._get_record(cccId, self._oldest())
+            self._count(body is not None)
+        return body
+
+    def query(self, name, path, site):
+        """
+        Return the indexed query answer (a JSON list of records) for
+        (name, path, site) if it and all its records are fresh.
+        """
+        with self._lock:
+            oldest = self._oldest()
+            row = self.conn.execute(
+                "SELECT cccIds FROM queries WHERE name = ? AND path = ? "
+                "AND site = ? AND fetched >= ?",
+                (name, path, site, oldest)
+            ).fetchone()
+            body = None
+            if row is not None:
+                bodies = [self._get_record(i, oldest)
+                          for i in json.loads(row[0])]
+                if None not in bodies:
+                    body = "[" + ",".join(bodies) + "]"
+            self._count(body is not None)
+        return body
+
+    def add_records(self, records):
+        """
+        Index DTS records (dicts) that were read from or written to the
+        server. Cached query answers for their locations, old and new, are
+        dropped, since the set of matching records may have changed.
+        """
+        now = time.time()
+        with self._lock:
+            for record in records:
+                row = self.conn.execute(
+                    "SELECT body FROM records WHERE cccId = ?",
+                    (record['cccId'],)
+                ).fetchone()
+                if row is not None:
+                    self._drop_queries(json.loads(row[0]))
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO records (cccId, body, fetched) "
+                    "VALUES (?, ?, ?)",
+                    (record['cccId'], json.dumps(record, sort_keys=True),
+                     now)
+                )
+                self._drop_queries(record)
+            self.conn.commit()
+
+    def _drop_queries(self, record):
+        for location in record.get('location', []):
+            self.conn.execute(
+                "DELETE FROM queries WHERE name = ? AND path = ? "
+                "AND site = ?",
+                (record.get('name'), location.get('path'),
+                 location.get('site'))
+            )
+
+    def add_query(self, name, path, site, records):
+        """
+        Index the answer to a query along with the records it returned.
+        """
+        self.add_records(records)
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO queries "
+                "(name, path, site, cccIds, fetched) VALUES (?, ?, ?, ?, ?)",
+                (name, path, site,
+                 json.dumps([r['cccId'] for r in records]), time.time())
+            )
+            self.conn.commit()
+
+    def forget(self, cccId):
+        """
+        Drop a record, e.g. after it was deleted. Query answers that
+        included it become misses.
+        """
+        with self._lock:
+            self.conn.execute("DELETE FROM records WHERE cccId = ?",
+                              (cccId,))
+            self.conn.commit()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _get_record(self, cccId, oldest):
+        row = self.conn.execute(
+            "SELECT body FROM records WHERE cccId = ? AND fetched >= ?",
+            (cccId, oldest)
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0]
+
+    def _oldest(self):
+        return time.time() - self.ttl
+
+    def _count(self, hit):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
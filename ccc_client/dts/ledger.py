@@ -0,0 +1,106 @@
+from __future__ import print_function
+
+import os
+import sqlite3
+
+
+def default_ledger_path(host, port):
+    """
+    Ledgers are kept per DTS instance under ~/.ccc_client
+    """
+    return os.path.join(
+        os.path.expanduser("~"), ".ccc_client",
+        "dts-ledger-{0}-{1}.sqlite".format(host, port)
+    )
+
+
+class Ledger(object):
+    """
+    Local SQLite record of files successfully registered with the DTS,
+    keyed by path and remembering the size, mtime, cccId and sites that
+    were sent. Used by `dts sync` to send only new or changed files.
+    """
+    def __init__(self, path, commit_every=500):
+        self.path = path
+        self.commit_every = commit_every
+        self._uncommitted = 0
+
+        dirname = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "path TEXT PRIMARY KEY, "
+            "size INTEGER NOT NULL, "
+            "mtime INTEGER NOT NULL, "
+            "cccId TEXT NOT NULL, "
+            "sites TEXT NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS files_cccId ON files (cccId)"
+        )
+        self.conn.commit()
+
+    def get(self, path):
+        """
+        Return the ledger entry for `path` as a dict, or None.
+        """
+        row = self.conn.execute(
+            "SELECT path, size, mtime, cccId, sites FROM files "
+            "WHERE path = ?", (path,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"path": row[0], "size": row[1], "mtime": row[2],
+                "cccId": row[3], "sites": row[4].split(",")}
+
+    def is_current(self, record, sites, entry=None):
+        """
+        True if `record` was registered at all of `sites` and has not
+        changed since.
+        """
+        if entry is None:
+            entry = self.get(record.path)
+        if entry is None:
+            return False
+        return (entry["size"] == record.size and
+                entry["mtime"] == record.mtime and
+                entry["cccId"] == record.cccId and
+                set(sites).issubset(entry["sites"]))
+
+    def add(self, record, sites):
+        """
+        Remember that `record` is registered at `sites`.
+        """
+        self.conn.execute(
+            "INSERT OR REPLACE INTO files (path, size, mtime, cccId, sites) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (record.path, record.size, record.mtime, record.cccId,
+             ",".join(sorted(set(sites))))
+        )
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_every:
+            self.commit()
+
+    def cccIds(self):
+        """
+        Iterate over every cccId in the ledger.
+        """
+        for row in self.conn.execute("SELECT cccId FROM files"):
+            yield row[0]
+
+    def commit(self):
+        self.conn.commit()
+        self._uncommitted = 0
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,95 @@
+from __future__ import print_function
+
+import os
+import stat
+from collections import namedtuple
+
+try:
+    from os import scandir
+except ImportError:
+    # Python 2
+    from scandir import scandir
+
+from ccc_client.utils import bounded_map
+
+
+FileRecord = namedtuple("FileRecord",
+                        ["path", "size", "mtime", "cccId", "checksum"])
+FileRecord.__new__.__defaults__ = (None,)
+FileRecord.__doc__ = """
+Everything the DTS needs to know about a local file, gathered from a
+single stat call. `mtime` is whole seconds, as sent in `timestampUpdated`.
+`checksum` is only set for content based cccIds, as "<algorithm>:<hex>".
+"""
+
+
+def stat_file(filepath, id_func, st=None):
+    """
+    Build a FileRecord for `filepath`. `id_func(filepath, st)` returns the
+    (cccId, checksum) pair. `st` may be an already available stat result
+    (e.g. from a DirEntry) to avoid another stat call.
+    """
+    filepath = os.path.abspath(filepath)
+    if st is None:
+        st = os.stat(filepath)
+    cccId, checksum = id_func(filepath, st)
+    return FileRecord(filepath, st.st_size, st[stat.ST_MTIME],
+                      cccId, checksum)
+
+
+def walk_files(paths):
+    """
+    Yield the regular files under `paths`. Directories are walked with
+    scandir, so no file is stat'ed to discover it; each yielded item is
+    either a plain path (given explicitly) or a DirEntry.
+
+    Each directory is walked depth first with its entries in name order,
+    i.e. files come out ordered by their list of path components.
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+
+    for path in paths:
+        path = os.path.abspath(path)
+        if not os.path.isdir(path):
+            yield path
+            continue
+
+        stack = [_sorted_entries(path)]
+        while stack:
+            entry = next(stack[-1], None)
+            if entry is None:
+                stack.pop()
+            elif entry.is_dir(follow_symlinks=False):
+                stack.append(_sorted_entries(entry.path))
+            elif entry.is_file():
+                yield entry
+
+
+def _sorted_entries(dirpath):
+    return iter(sorted(scandir(dirpath), key=lambda e: e.name))
+
+
+def scan(paths, id_func, jobs=1, ordered=False):
+    """
+    Yield a FileRecord for every regular file under `paths`, stat'ing each
+    file exactly once. With `jobs` > 1 the stat calls are spread over a
+    thread pool, which helps on network filesystems where every stat is a
+    metadata-server round trip; records then arrive in completion order,
+    or in walk order if `ordered` is set.
+    """
+    def record(item):
+        if isinstance(item, str):
+            return stat_file(item, id_func)
+        return stat_file(item.path, id_func, item.stat())
+
+    if jobs <= 1:
+        for item in walk_files(paths):
+            yield record(item)
+        return
+
+    results = bounded_map(record, walk_files(paths), jobs, ordered=ordered)
+    for item, result, error in results:
+        if error is not None:
+            raise error
+        yield result
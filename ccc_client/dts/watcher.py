@@ -0,0 +1,250 @@
+from __future__ import print_function
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import stat
+import struct
+import time
+
+
+# inotify event masks, from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+
+_WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | \
+    IN_CREATE | IN_DELETE
+_EVENT = struct.Struct("iIII")
+
+
+def _load_libc():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError, TypeError):
+        return None
+    return libc
+
+
+class Inotify(object):
+    """
+    Minimal inotify binding over libc. Raises OSError where inotify is
+    not available, so callers can fall back to polling.
+    """
+    def __init__(self):
+        self._libc = _load_libc()
+        if self._libc is None:
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self.watches = {}
+
+    def add_watch(self, path, mask=_WATCH_MASK):
+        wd = self._libc.inotify_add_watch(self.fd, path.encode("utf-8"),
+                                          mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        self.watches[wd] = path
+        return wd
+
+    def read(self, timeout):
+        """
+        Wait up to `timeout` seconds and return a list of
+        (path, mask) events.
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return []
+            raise
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            directory = self.watches.get(wd)
+            if directory is None:
+                if mask & IN_Q_OVERFLOW:
+                    events.append((None, mask))
+                continue
+            path = directory
+            if name:
+                path = os.path.join(directory, name.decode("utf-8"))
+            events.append((path, mask))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class Watcher(object):
+    """
+    Watch directory trees for new files and report them once they have
+    stopped changing for `settle` seconds.
+
+    inotify is used where available, so only the files that events name
+    are looked at; otherwise, or with `poll` set, the trees are re-listed
+    every `interval` seconds. Files present when the watcher starts are
+    not reported.
+
+    A reported file is not reported again unless the caller hands it back
+    with retry(), which it may do `max_retries` times, each after twice
+    as long as the last; done() marks it as handled for good, until it
+    is deleted.
+    """
+    def __init__(self, paths, settle=5.0, interval=1.0, poll=False,
+                 max_retries=3):
+        if isinstance(paths, str):
+            paths = [paths]
+        self.paths = [os.path.abspath(p) for p in paths]
+        self.settle = settle
+        self.interval = interval
+        self.max_retries = max_retries
+        self.inotify = None
+        if not poll:
+            try:
+                self.inotify = Inotify()
+            except OSError:
+                pass
+
+        self.known = set()
+        self.pending = set()
+        self.retries = {}
+        self.candidates = {}
+        for directory in self.paths:
+            self._add_tree(directory, initial=True)
+
+    def batches(self, batch_size=100):
+        """
+        Yield lists of at most `batch_size` new, settled filepaths, for as
+        long as the caller keeps iterating.
+        """
+        while True:
+            if self.inotify is not None:
+                self._read_events()
+            else:
+                time.sleep(self.interval)
+                for directory in self.paths:
+                    self._add_tree(directory)
+
+            settled = self._settled()
+            for i in range(0, len(settled), batch_size):
+                yield settled[i:i + batch_size]
+
+    def done(self, path):
+        """
+        Record that the reported file `path` was handled.
+        """
+        self.pending.discard(path)
+        self.retries.pop(path, None)
+        self.candidates.pop(path, None)
+        self.known.add(path)
+
+    def retry(self, path):
+        """
+        Hand the reported file `path` back, to be reported again later.
+        Returns False, and marks it as done, if it has already been
+        retried `max_retries` times or has gone.
+        """
+        retries = self.retries.get(path, 0) + 1
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+        if st is None or retries > self.max_retries:
+            self.done(path)
+            return False
+        self.pending.discard(path)
+        self.retries[path] = retries
+        # reported once unchanged for settle * 2 ** retries seconds
+        delay = self.settle * (2 ** retries - 1)
+        self.candidates[path] = (st.st_size, st.st_mtime, time.time() + delay)
+        return True
+
+    def close(self):
+        if self.inotify is not None:
+            self.inotify.close()
+
+    def _read_events(self):
+        for path, mask in self.inotify.read(self.interval):
+            if path is None:
+                # the kernel dropped events; list the trees again
+                for directory in self.paths:
+                    self._add_tree(directory)
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                self._forget(path, subtree=bool(mask & IN_ISDIR))
+            elif mask & IN_ISDIR:
+                self._add_tree(path)
+            else:
+                self._add_candidate(path)
+
+    def _add_tree(self, directory, initial=False):
+        found = set()
+        for dirpath, _, filenames in os.walk(directory):
+            if self.inotify is not None:
+                try:
+                    self.inotify.add_watch(dirpath)
+                except OSError:
+                    continue
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                found.add(path)
+                if initial:
+                    self.known.add(path)
+                else:
+                    self._add_candidate(path)
+        # files that have gone since are forgotten
+        prefix = os.path.join(directory, "")
+        self.known -= set(path for path in self.known
+                          if path.startswith(prefix) and path not in found)
+
+    def _forget(self, path, subtree=False):
+        self.known.discard(path)
+        self.retries.pop(path, None)
+        if subtree:
+            prefix = os.path.join(path, "")
+            self.known -= set(p for p in self.known if p.startswith(prefix))
+
+    def _add_candidate(self, path):
+        if path in self.known or path in self.pending or \
+                path in self.candidates:
+            return
+        self.candidates[path] = (None, None, time.time())
+
+    def _settled(self):
+        now = time.time()
+        settled = []
+        for path, (size, mtime, since) in list(self.candidates.items()):
+            try:
+                st = os.stat(path)
+            except OSError:
+                del self.candidates[path]
+                continue
+            if not stat.S_ISREG(st.st_mode):
+                del self.candidates[path]
+                continue
+            if (st.st_size, st.st_mtime) != (size, mtime):
+                self.candidates[path] = (st.st_size, st.st_mtime, now)
+            elif now - since >= self.settle:
+                del self.candidates[path]
+                self.pending.add(path)
+                settled.append(path)
+        return sorted(settled)
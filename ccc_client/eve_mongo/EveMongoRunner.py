@@ -5,14 +5,15 @@ import json
 import os
 import re
 import sys
-import requests
 
+from ccc_client.transport import get_default_transport
 from ccc_client.utils import parseAuthToken
 
 
 class EveMongoRunner(object):
 
-    def __init__(self, host=None, port=None, authToken=None):
+    def __init__(self, host=None, port=None, authToken=None,
+                 transport=None):
         if host is not None:
             host = re.sub("^http[s]?://",  "", host)
         else:
@@ -26,19 +27,24 @@ class EveMongoRunner(object):
         else:
             self.authToken = ""
 
+        if transport is not None:
+            self.transport = transport
+        else:
+            self.transport = get_default_transport()
+
         self.url = "http://{}:{}".format(host, port)
         self.headers = {'Content-Type': 'application/json',
                         'Authorization': 'Bearer ' + self.authToken}
 
     def status(self):
         url = "{}/v0/status".format(self.url)
-        r = requests.get(url=url)
+        r = self.transport.get(url)
         return r
 
     def query(self, endpoint, filter=None):
         url = '{}/v0/{}'.format(self.url, endpoint)
-        r = requests.get(url=url, data=json.dumps(filter),
-                         headers=self.headers)
+        r = self.transport.get(url, data=json.dumps(filter),
+                               headers=self.headers)
         return r
 
     # @classmethod
@@ -76,7 +82,8 @@ class EveMongoRunner(object):
                                                domainName,
                                                self.headers,
                                                self.url,
-                                               self.DomainDescriptors)
+                                               self.DomainDescriptors,
+                                               self.transport)
                 else:
                     response.append(rowParser.pushArrToEveMongo(row))
                 i += 1
@@ -87,7 +94,8 @@ class EveMongoRunner(object):
     class RowParser(object):
         def __init__(self, fileHeader=None, siteId=None, user=None,
                      programCode=None, projectCode=None, domainName=None,
-                     headers=None, url=None, domainDescriptors=None):
+                     headers=None, url=None, domainDescriptors=None,
+                     transport=None):
 
             self.fileHeader = fileHeader
             self.siteId = siteId
@@ -98,6 +106,10 @@ class EveMongoRunner(object):
             self.headers = headers
             self.url = url
             self.domainDescriptors = domainDescriptors
+            if transport is not None:
+                self.transport = transport
+            else:
+                self.transport = get_default_transport()
             self.aliasMap = self.getAliases()
 
         def getAliases(self):
@@ -183,6 +195,7 @@ class EveMongoRunner(object):
 
             url = "{}/v0/submission/{}/{}".format(self.url, self.programCode,
                                                   self.projectCode)
-            r = requests.post(url=url, data=json.dumps(rowMap, sort_keys=True),
-                              headers=self.headers)
+            r = self.transport.post(url,
+                                    data=json.dumps(rowMap, sort_keys=True),
+                                    headers=self.headers)
             return r
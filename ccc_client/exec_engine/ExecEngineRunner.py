@@ -4,9 +4,9 @@ import glob
 import iso8601
 import os
 import re
-import requests
 import sys
 
+from ccc_client.transport import get_default_transport
 from ccc_client.utils import parseAuthToken
 
 
@@ -14,7 +14,8 @@ class ExecEngineRunner(object):
     """
     Send requests to the Execution Engine
     """
-    def __init__(self, host=None, port=None, authToken=None):
+    def __init__(self, host=None, port=None, authToken=None,
+                 transport=None):
 
         if host is not None:
             self.host = re.sub("^http[s]?://",  "", host)
@@ -31,6 +32,11 @@ class ExecEngineRunner(object):
         else:
             self.authToken = ""
 
+        if transport is not None:
+            self.transport = transport
+        else:
+            self.transport = get_default_transport()
+
         # all other endpoints are mapped to this port
         self.secondary_port = "8000"
 
@@ -62,9 +68,9 @@ class ExecEngineRunner(object):
                     item = 'workflowInputs', (f, fh)
                     form_data.append(item)
 
-        response = requests.post(endpoint,
-                                 files=form_data,
-                                 headers=self.headers)
+        response = self.transport.post(endpoint,
+                                       files=form_data,
+                                       headers=self.headers)
         return response
 
     def query(self, query_terms):
@@ -102,7 +108,7 @@ class ExecEngineRunner(object):
         endpoint = "http://{0}:{1}/{2}/query?{3}".format(
             self.host, self.secondary_port, self.endpoint, query_string
         )
-        response = requests.get(endpoint, headers=self.headers)
+        response = self.transport.get(endpoint, headers=self.headers)
         return response
 
     def get_status(self, workflowId):
@@ -121,7 +127,7 @@ class ExecEngineRunner(object):
         endpoint = "http://{0}:{1}/{2}/{3}/abort".format(
             self.host, self.secondary_port, self.endpoint, workflowId
         )
-        response = requests.post(endpoint, headers=self.headers)
+        response = self.transport.post(endpoint, headers=self.headers)
         return response
 
     def _get(self, workflowId, action):
@@ -130,5 +136,5 @@ class ExecEngineRunner(object):
         endpoint = "http://{0}:{1}/{2}/{3}/{4}".format(
             self.host, self.secondary_port, self.endpoint, workflowId, action
         )
-        response = requests.get(endpoint, headers=self.headers)
+        response = self.transport.get(endpoint, headers=self.headers)
         return response
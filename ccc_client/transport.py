@@ -0,0 +1,94 @@
+from __future__ import print_function
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class HttpTransport(object):
+    """
+    Shared HTTP transport for the CCC service runners.
+
+    Owns a single keep-alive requests.Session so that repeated calls to the
+    same service reuse pooled TCP/TLS connections instead of opening a new
+    one per request. Pool sizes can be tuned globally or per host.
+    """
+    def __init__(self, pool_connections=10, pool_maxsize=10,
+                 pool_sizes=None, max_retries=0):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+
+        self.session = requests.Session()
+        self.session.mount("http://", self._adapter(pool_maxsize))
+        self.session.mount("https://", self._adapter(pool_maxsize))
+
+        if pool_sizes is not None:
+            for host, size in pool_sizes.items():
+                self.set_pool_size(host, size)
+
+    def set_pool_size(self, host, size):
+        """
+        Give connections to `host` (e.g. "central-gateway.ccc.org:9510")
+        their own pool of at most `size` connections.
+        """
+        for scheme in ["http", "https"]:
+            prefix = "{0}://{1}/".format(scheme, host)
+            self.session.mount(prefix, self._adapter(size))
+
+    def get(self, url, **kwargs):
+        return self.session.get(url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.session.head(url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.session.post(url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.session.put(url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.session.delete(url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _adapter(self, pool_maxsize):
+        return HTTPAdapter(pool_connections=self.pool_connections,
+                           pool_maxsize=pool_maxsize,
+                           max_retries=self.max_retries)
+
+
+_default_transport = None
+_default_transport_lock = threading.Lock()
+
+
+def get_default_transport():
+    """
+    Return the process-wide transport shared by runners that were not
+    given one explicitly.
+    """
+    global _default_transport
+    with _default_transport_lock:
+        if _default_transport is None:
+            _default_transport = HttpTransport()
+        return _default_transport
+
+
+def get_transport(jobs=1):
+    """
+    Return a transport whose connection pools can serve `jobs` concurrent
+    workers. The shared default is reused when it is large enough.
+    """
+    transport = get_default_transport()
+    if jobs > transport.pool_maxsize:
+        transport = HttpTransport(pool_maxsize=jobs)
+    return transport
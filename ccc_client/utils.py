@@ -1,9 +1,15 @@
 from __future__ import print_function
 
 import glob
+import json
 import os
 import re
 import sys
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, \
+    ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import requests
 
 
 def print_API_response(r):
@@ -15,6 +21,125 @@ def print_API_response(r):
         print(m, file=sys.stderr)
 
 
+def cached_response(url, body):
+    """
+    Wrap a locally cached JSON body in a requests.Response so callers
+    cannot tell it apart from a server answer.
+    """
+    response = requests.models.Response()
+    response.status_code = 200
+    response.url = url
+    response.encoding = "utf-8"
+    response.headers["Content-Type"] = "application/json"
+    response._content = body.encode("utf-8")
+    return response
+
+
+def ndjson_result(fields, r=None, error=None):
+    """
+    Describe the outcome of one request of a bulk operation as a line of
+    JSON: `fields` (a dict identifying the item) plus the status code and
+    body of the response `r`, or the exception `error`.
+    """
+    result = dict(fields)
+    if error is not None:
+        result["error"] = repr(error)
+    else:
+        result["status"] = r.status_code
+        try:
+            result["body"] = json.loads(r.text)
+        except ValueError:
+            result["body"] = r.text
+    return json.dumps(result, sort_keys=True)
+
+
+def iter_lines(source, strip=True):
+    """
+    Yield the non-empty, stripped lines of the file at `source`, or of
+    stdin if `source` is "-". Lines are read as they arrive. With
+    `strip=False` only the line ending is removed, so that paths which
+    begin or end with whitespace survive.
+    """
+    if source == "-":
+        for line in sys.stdin:
+            line = line.strip() if strip else line.rstrip("\r\n")
+            if line:
+                yield line
+        return
+    with open(source) as fh:
+        for line in fh:
+            line = line.strip() if strip else line.rstrip("\r\n")
+            if line:
+                yield line
+
+
+class TsvWriter(object):
+    """
+    Write tab separated rows to `stream`, buffering `buffer_rows` rows at
+    a time so each write hands the stream a large block.
+    """
+    def __init__(self, stream=None, buffer_rows=10000):
+        if stream is None:
+            stream = sys.stdout
+        self.stream = stream
+        self.buffer_rows = buffer_rows
+        self._rows = []
+
+    def writerow(self, *fields):
+        self._rows.append("\t".join(str(f) for f in fields))
+        if len(self._rows) >= self.buffer_rows:
+            self.flush()
+
+    def flush(self):
+        if self._rows:
+            self.stream.write("\n".join(self._rows) + "\n")
+            self._rows = []
+        self.stream.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.flush()
+
+
+class Journal(object):
+    """
+    Append-only file of completed keys, one per line, so an interrupted
+    bulk operation can be re-run and skip the work already done.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        if os.path.exists(path):
+            self.done.update(iter_lines(path))
+        dirname = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        self._fh = open(path, "a")
+
+    def __contains__(self, key):
+        return key in self.done
+
+    def __len__(self):
+        return len(self.done)
+
+    def add(self, key):
+        if key not in self.done:
+            self.done.add(key)
+            self._fh.write(key + "\n")
+            self._fh.flush()
+
+    def close(self):
+        self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
 def parseAuthToken(authToken):
     if isinstance(authToken, str):
         # if the authToken matches a filepath, read the file and use this
@@ -30,18 +155,116 @@ def parseAuthToken(authToken):
 
 
 def resolve_filepath_from_pattern(patterns):
+    return list(iter_filepath_from_pattern(patterns))
+
+
+def iter_filepath_from_pattern(patterns):
+    """
+    Lazily expand one or more glob patterns into absolute filepaths.
+
+    Matches are yielded as soon as they are found, so callers can start
+    work before the whole tree has been listed. `**` matches any number of
+    directories, and a path matched by several patterns is yielded once.
+    Raises ValueError for a pattern that matches nothing.
+    """
     if isinstance(patterns, str):
         patterns = [patterns]
     else:
         assert isinstance(patterns, list) is True
 
-    res = []
+    seen = set()
     for file_pattern in patterns:
-        file_list = glob.glob(os.path.abspath(file_pattern))
-        if file_list == []:
+        matched = False
+        for filepath in _iglob(os.path.abspath(file_pattern)):
+            matched = True
+            if filepath not in seen:
+                seen.add(filepath)
+                yield filepath
+        if not matched:
             print("glob on", file_pattern, "did not return any files",
                   file=sys.stderr)
             raise ValueError
-        else:
-            res += file_list
-    return res
+
+
+def _iglob(pattern):
+    try:
+        return glob.iglob(pattern, recursive=True)
+    except TypeError:
+        # Python 2 has no recursive globbing
+        return glob.iglob(pattern)
+
+
+def chunked(items, size):
+    """
+    Yield lists of up to `size` consecutive elements of `items`.
+    """
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def bounded_map(func, items, jobs=1, ordered=False, processes=False,
+                shortcut=None):
+    """
+    Call `func` on every element of `items` using at most `jobs` threads,
+    or worker processes if `processes` is set (`func` and the items must
+    then be picklable).
+
+    `items` may be any iterable, including a lazy generator: only about
+    2 * `jobs` elements are pulled ahead of the calls in flight. Yields
+    (item, result, error) tuples as calls complete, or in input order if
+    `ordered` is set. An exception raised by `func` is returned as `error`
+    rather than raised, so one failure does not stop the rest.
+
+    `shortcut`, if given, is called on each item in the calling thread
+    before dispatch; when it returns something other than None, that is
+    taken as the item's result and `func` is not called for it.
+    """
+    jobs = max(1, int(jobs))
+    items = iter(items)
+    pending = OrderedDict()
+
+    if processes:
+        pool = ProcessPoolExecutor(max_workers=jobs)
+    else:
+        pool = ThreadPoolExecutor(max_workers=jobs)
+
+    with pool as executor:
+        def fill():
+            while len(pending) < 2 * jobs:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    return
+                result = None
+                if shortcut is not None:
+                    result = shortcut(item)
+                if result is not None:
+                    future = Future()
+                    future.set_result(result)
+                else:
+                    future = executor.submit(func, item)
+                pending[future] = item
+
+        fill()
+        while pending:
+            if ordered:
+                done = [next(iter(pending))]
+                wait(done)
+            else:
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                # report what finished together in input order
+                done = [f for f in pending if f in done]
+            for future in done:
+                item = pending.pop(future)
+                error = future.exception()
+                if error is not None:
+                    yield item, None, error
+                else:
+                    yield item, future.result(), None
+            fill()
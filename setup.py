@@ -28,7 +28,9 @@ setup(
     keywords='tool',
     install_requires=[
         "requests>=2.9.1",
-        "iso8601>=0.1.11"
+        "iso8601>=0.1.11",
+        "futures>=3.0.5; python_version < '3'",
+        "scandir>=1.5; python_version < '3'"
     ],
     entry_points={
         'console_scripts': [
@@ -1,9 +1,11 @@
+import io
 import unittest
 import tempfile
 import json
 
 from mock import patch
 from ccc_client import AppRepoRunner
+from ccc_client.app_repo.multipart import MultipartEncoder
 
 
 class TestAppRepoRunner(unittest.TestCase):
@@ -59,7 +61,7 @@ class TestAppRepoRunner(unittest.TestCase):
 
     def test_ar_upload_image(self):
         # mimic successful post with single input json
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             mock_post.return_value.status_code = 201
             self.ar_client.upload_image(
                 imageBlob=self.mock_img_filepath,
@@ -69,7 +71,7 @@ class TestAppRepoRunner(unittest.TestCase):
             assert mock_post.called
 
         # pass path of image tarball that does not exist
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             mock_post.return_value.status_code = 500
             with self.assertRaises(IOError):
                 self.ar_client.upload_image(
@@ -78,11 +80,54 @@ class TestAppRepoRunner(unittest.TestCase):
                     imageTag=self.imageTag
                 )
 
+    def test_ar_upload_image_streams(self):
+        with tempfile.NamedTemporaryFile(suffix=".tar") as image:
+            image.write(b"layer" * 1000)
+            image.flush()
+            with patch('requests.Session.post') as mock_post:
+                mock_post.return_value.status_code = 201
+                self.ar_client.upload_image(image.name, None, None)
+                args, kwargs = mock_post.call_args
+        body = kwargs["data"]
+        self.assertIsInstance(body, MultipartEncoder)
+        self.assertEqual(kwargs["headers"]["Content-Type"],
+                         body.content_type)
+        self.assertNotIn("files", kwargs)
+        # the image is closed once the request has been sent
+        self.assertTrue(body._parts[1].closed)
+
+    def test_multipart_encoder(self):
+        image = io.BytesIO(b"skip" + b"x" * 10000)
+        image.read(4)
+        body = MultipartEncoder([("file", ("mock.tar", image)),
+                                 ("imageName", "mock")],
+                                boundary="b0und")
+        expected = (
+            b'--b0und\r\nContent-Disposition: form-data; name="file"; '
+            b'filename="mock.tar"\r\n'
+            b'Content-Type: application/octet-stream\r\n\r\n' +
+            b"x" * 10000 +
+            b'\r\n--b0und\r\nContent-Disposition: form-data; '
+            b'name="imageName"\r\n\r\nmock\r\n--b0und--\r\n'
+        )
+        self.assertEqual(body.len, len(expected))
+        self.assertEqual(body.content_type,
+                         "multipart/form-data; boundary=b0und")
+
+        chunks = []
+        chunk = body.read(333)
+        while chunk:
+            self.assertLessEqual(len(chunk), 333)
+            chunks.append(chunk)
+            chunk = body.read(333)
+        self.assertEqual(b"".join(chunks), expected)
+        self.assertEqual(body.read(), b"")
+
     def test_ar_create_or_update_metadata(self):
         url = "http://central-gateway.ccc.org:8082/api/v1/tool/{0}"
 
         # mimic successful put metadata request w/ metadata file path
-        with patch('requests.put') as mock_put:
+        with patch('requests.Session.put') as mock_put:
             mock_put.return_value.status_code = 201
             self.ar_client._AppRepoRunner__create_or_update_metadata(
                 imageId=self.imageId,
@@ -98,7 +143,7 @@ class TestAppRepoRunner(unittest.TestCase):
             )
 
         # mimic successful put metadata request w/ metadata json str
-        with patch('requests.put') as mock_put:
+        with patch('requests.Session.put') as mock_put:
             mock_put.return_value.status_code = 201
             self.ar_client._AppRepoRunner__create_or_update_metadata(
                 imageId=self.imageId,
@@ -114,7 +159,7 @@ class TestAppRepoRunner(unittest.TestCase):
             )
 
         # mimic successful put metadata request w/ metadata dict
-        with patch('requests.put') as mock_put:
+        with patch('requests.Session.put') as mock_put:
             mock_put.return_value.status_code = 201
             self.ar_client._AppRepoRunner__create_or_update_metadata(
                 imageId=self.imageId,
@@ -129,8 +174,19 @@ class TestAppRepoRunner(unittest.TestCase):
                 data=self.valid_metadata_str
             )
 
-        # mimic unsuccessful put metadata request w/ invalid json
-        with patch('requests.put') as mock_put:
+        # record the image digest in the metadata
+        with patch('requests.Session.put') as mock_put:
+            mock_put.return_value.status_code = 201
+            self.ar_client.update_metadata(
+                imageId=self.imageId,
+                metadata=dict(self.valid_metadata_dict),
+                sha256="ab" * 32
+            )
+            args, kwargs = mock_put.call_args
+            self.assertEqual(json.loads(kwargs["data"])["imageSha256"],
+                             "ab" * 32)
+
+        with patch('requests.Session.put') as mock_put:
             with self.assertRaises(ValueError):
                 self.ar_client._AppRepoRunner__create_or_update_metadata(
                     imageId=self.imageId,
@@ -139,7 +195,7 @@ class TestAppRepoRunner(unittest.TestCase):
 
         # mimic unsuccessful put metadata request w/ valid json, invalid json
         # schema
-        with patch('requests.put') as mock_put:
+        with patch('requests.Session.put') as mock_put:
             with self.assertRaises(KeyError):
                 self.ar_client._AppRepoRunner__create_or_update_metadata(
                     imageId=self.imageId,
@@ -148,7 +204,7 @@ class TestAppRepoRunner(unittest.TestCase):
 
         # mimic unsuccessful put metadata request where imageId doesn't match
         # metadata imageId field
-        with patch('requests.put') as mock_put:
+        with patch('requests.Session.put') as mock_put:
             with self.assertRaises(AssertionError):
                 self.ar_client._AppRepoRunner__create_or_update_metadata(
                     imageId=self.imageId,
@@ -157,7 +213,7 @@ class TestAppRepoRunner(unittest.TestCase):
 
     def test_ar_upload_metadata(self):
         # try to overwrite existing metadata
-        with patch('requests.get') as mock_get:
+        with patch('requests.Session.get') as mock_get:
             mock_get.return_value.status_code = 201
             with self.assertRaises(ValueError):
                 self.ar_client.upload_metadata(
@@ -168,7 +224,7 @@ class TestAppRepoRunner(unittest.TestCase):
     def test_ar_get_metadata(self):
         # mimic successful get request:
         # by image id
-        with patch('requests.get') as mock_get:
+        with patch('requests.Session.get') as mock_get:
             url = "http://central-gateway.ccc.org:8082/api/v1/tool/{0}"
             mock_get.return_value.status_code = 200
             self.ar_client.get_metadata(
@@ -183,7 +239,7 @@ class TestAppRepoRunner(unittest.TestCase):
             )
 
         # by image name
-        with patch('requests.get') as mock_get:
+        with patch('requests.Session.get') as mock_get:
             url = "http://central-gateway.ccc.org:8082/api/v1/tool/{0}/data"
             mock_get.return_value.status_code = 500
             self.ar_client.get_metadata(
@@ -199,7 +255,7 @@ class TestAppRepoRunner(unittest.TestCase):
 
     def test_ar_delete_metadata(self):
         # mimic delete request:
-        with patch('requests.delete') as mock_delete:
+        with patch('requests.Session.delete') as mock_delete:
             self.ar_client.delete_metadata(
                 imageId=self.imageId,
             )
@@ -214,7 +270,7 @@ class TestAppRepoRunner(unittest.TestCase):
 
     def test_ar_list_tools(self):
         # mimic list_tools request:
-        with patch('requests.get') as mock_get:
+        with patch('requests.Session.get') as mock_get:
             self.ar_client.list_tools()
             mock_get.assert_called_with(
                 "https://docker-centos7:5000/v2/_catalog",
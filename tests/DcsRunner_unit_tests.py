@@ -2,7 +2,7 @@ import unittest
 import json
 import uuid
 
-from mock import patch
+from mock import MagicMock, patch
 from ccc_client import DcsRunner
 
 
@@ -14,7 +14,7 @@ class TestDcsRunner(unittest.TestCase):
 
     def test_create_link(self):
         # mimic successful link creation
-        with patch('requests.put') as mock_put:
+        with patch('requests.Session.put') as mock_put:
             mock_put.return_value.status_code = 201
             self.dcs_client.create_link(
                 setId=self.mock_setId,
@@ -30,7 +30,7 @@ class TestDcsRunner(unittest.TestCase):
             )
 
     def test_find_common_sets(self):
-        with patch("requests.post") as mock_post:
+        with patch("requests.Session.post") as mock_post:
             mock_post.return_value.status_code = 201
             self.dcs_client.find_common_sets(
                 ids=self.mock_cccId
@@ -43,8 +43,48 @@ class TestDcsRunner(unittest.TestCase):
                          "Authorization": "Bearer "}
             )
 
+    def test_find_common_sets_chunked(self):
+        ids = ["r{0}".format(i) for i in range(10)]
+        answers = {
+            "r0": [{"id": "s1"}, {"id": "s2"}, {"id": "s3"}],
+            "r3": [{"id": "s3"}, {"id": "s2"}],
+            "r6": [{"id": "s2"}, {"id": "s3"}, {"id": "s4"}],
+            "r9": [{"id": "s2"}],
+        }
+
+        def mock_post_response(url, data, **kwargs):
+            response = MagicMock()
+            response.status_code = 200
+            first = json.loads(data)["cccIds"][0]
+            response.text = json.dumps(answers[first])
+            return response
+
+        with patch("requests.Session.post") as mock_post:
+            mock_post.side_effect = mock_post_response
+            r = self.dcs_client.find_common_sets(iter(ids), chunk_size=3,
+                                                 jobs=2)
+            self.assertEqual(mock_post.call_count, 4)
+            sent = [json.loads(c[1]["data"])["cccIds"]
+                    for c in mock_post.call_args_list]
+        self.assertEqual(sorted(sum(sent, [])), ids)
+        self.assertEqual(r.json(), [{"id": "s2"}])
+
+        # an empty intersection stops the search
+        answers["r0"] = []
+        with patch("requests.Session.post") as mock_post:
+            mock_post.side_effect = mock_post_response
+            r = self.dcs_client.find_common_sets(ids, chunk_size=3, jobs=1)
+            self.assertLess(mock_post.call_count, 4)
+        self.assertEqual(r.json(), [])
+
+        # a failed chunk is returned as is
+        with patch("requests.Session.post") as mock_post:
+            mock_post.return_value.status_code = 413
+            r = self.dcs_client.find_common_sets(ids, chunk_size=3)
+        self.assertEqual(r.status_code, 413)
+
     def test_list_sets(self):
-        with patch("requests.get") as mock_get:
+        with patch("requests.Session.get") as mock_get:
             mock_get.return_value.status_code = 201
             self.dcs_client.list_sets(
                 cccId=self.mock_cccId
@@ -57,7 +97,7 @@ class TestDcsRunner(unittest.TestCase):
             )
 
     def test_list_resources(self):
-        with patch("requests.get") as mock_get:
+        with patch("requests.Session.get") as mock_get:
             mock_get.return_value.status_code = 201
             self.dcs_client.list_resources(
                 setId=self.mock_setId
@@ -70,7 +110,7 @@ class TestDcsRunner(unittest.TestCase):
             )
 
     def test_delete_link(self):
-        with patch("requests.delete") as mock_delete:
+        with patch("requests.Session.delete") as mock_delete:
             mock_delete.return_value.status_code = 201
             self.dcs_client.delete_link(
                 setId=self.mock_setId,
@@ -85,8 +125,103 @@ class TestDcsRunner(unittest.TestCase):
                          "Authorization": "Bearer "}
             )
 
+    def test_create_delete_links(self):
+        cccIds = [str(uuid.uuid4()) for _ in range(10)]
+        with patch("requests.Session.put") as mock_put:
+            mock_put.side_effect = [IOError("boom")] + \
+                [mock_put.return_value] * 9
+            mock_put.return_value.status_code = 201
+            results = list(self.dcs_client.create_links(
+                self.mock_setId, iter(cccIds), jobs=3, ordered=True
+            ))
+            self.assertEqual(mock_put.call_count, 10)
+            sent = sorted(json.loads(c[1]["data"])["childId"]
+                          for c in mock_put.call_args_list)
+        self.assertEqual(sent, sorted(cccIds))
+        self.assertEqual([r[0] for r in results], cccIds)
+        self.assertEqual(len([r for r in results if r[2] is not None]), 1)
+
+        with patch("requests.Session.delete") as mock_delete:
+            mock_delete.return_value.status_code = 200
+            results = list(self.dcs_client.delete_links(
+                self.mock_setId, cccIds, jobs=3
+            ))
+            self.assertEqual(mock_delete.call_count, 10)
+        self.assertEqual(sorted(r[0] for r in results), sorted(cccIds))
+
+    def test_walk(self):
+        # study -> (s1, s2); s1 -> (f1, s2); s2 -> (f2, study)
+        tree = {"study": ["s1", "s2"], "s1": ["f1", "s2"],
+                "s2": ["f2", "study"], "f1": []}
+
+        def mock_get_response(url, **kwargs):
+            node = url.split("/")[-2]
+            response = MagicMock()
+            if node == "f2":
+                response.status_code = 404
+            elif node == "s1" and "fail" in tree:
+                response.status_code = 500
+            else:
+                response.status_code = 200
+                response.text = json.dumps(tree[node])
+            return response
+
+        with patch("requests.Session.get") as mock_get:
+            mock_get.side_effect = mock_get_response
+            results = list(self.dcs_client.walk("study", jobs=2))
+            self.assertEqual(mock_get.call_count, 5)
+        self.assertEqual(sorted(results), [("f1", None), ("f2", None)])
+
+        tree["fail"] = True
+        with patch("requests.Session.get") as mock_get:
+            mock_get.side_effect = mock_get_response
+            results = list(self.dcs_client.walk("study", jobs=2))
+        self.assertEqual(sorted(r[0] for r in results), ["f2", "s1"])
+
+    def test_sync(self):
+        current = {"s1": ["a", "b"], "s2": ["c"]}
+
+        def mock_get_response(url, **kwargs):
+            node = url.split("/")[-2]
+            response = MagicMock()
+            if node == "new":
+                response.status_code = 404
+            elif node == "broken":
+                response.status_code = 500
+            else:
+                response.status_code = 200
+                response.text = json.dumps(current[node])
+            return response
+
+        membership = {"s1": ["b", "d"], "s2": ["c"], "new": ["e"],
+                      "broken": ["f"]}
+        with patch("requests.Session.get") as mock_get, \
+                patch("requests.Session.put") as mock_put, \
+                patch("requests.Session.delete") as mock_delete:
+            mock_get.side_effect = mock_get_response
+            mock_put.return_value.status_code = 201
+            mock_delete.return_value.status_code = 200
+            results = list(self.dcs_client.sync(membership, jobs=2))
+            self.assertEqual(mock_get.call_count, 4)
+            self.assertEqual(mock_put.call_count, 2)
+            self.assertEqual(mock_delete.call_count, 1)
+        self.assertEqual(
+            sorted(r[:3] for r in results),
+            [("link", "new", "e"), ("link", "s1", "d"),
+             ("read", "broken", None), ("unlink", "s1", "a")]
+        )
+
+        with patch("requests.Session.get") as mock_get, \
+                patch("requests.Session.put") as mock_put:
+            mock_get.side_effect = mock_get_response
+            results = list(self.dcs_client.sync(membership, prune=False,
+                                                dry_run=True))
+            self.assertFalse(mock_put.called)
+        self.assertEqual(sorted(r[0] for r in results),
+                         ["link", "link", "read"])
+
     def test_delete_set(self):
-        with patch("requests.delete") as mock_delete:
+        with patch("requests.Session.delete") as mock_delete:
             mock_delete.return_value.status_code = 201
             self.dcs_client.delete_set(
                 setId=self.mock_setId
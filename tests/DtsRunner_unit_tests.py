@@ -4,8 +4,8 @@ import json
 import os
 import uuid
 
-from mock import patch
-from ccc_client import DtsRunner
+from mock import MagicMock, patch
+from ccc_client import DtsRunner, utils
 
 
 class TestDtsRunner(unittest.TestCase):
@@ -22,7 +22,7 @@ class TestDtsRunner(unittest.TestCase):
 
     def test_dts_post(self):
         # mimic successful post
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             mock_post.return_value.status_code = 201
             self.dts_client.post(
                 filepath=self.mock_filepath,
@@ -56,9 +56,9 @@ class TestDtsRunner(unittest.TestCase):
             )
 
         # mimic file already being registered
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             mock_post.return_value.status_code = 500
-            with patch('requests.get') as mock_get:
+            with patch('requests.Session.get') as mock_get:
                 mock_get.return_value.status_code = 201
                 with self.assertRaises(ValueError):
                     self.dts_client.post(
@@ -69,9 +69,9 @@ class TestDtsRunner(unittest.TestCase):
                     )
 
         # mimic successful post w/ user provided ccc id
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             mock_post.return_value.status_code = 201
-            with patch('requests.get') as mock_get:
+            with patch('requests.Session.get') as mock_get:
                 mock_get.return_value.status_code = 500
                 self.dts_client.post(
                     filepath=self.mock_filepath,
@@ -104,9 +104,9 @@ class TestDtsRunner(unittest.TestCase):
                 )
 
         # mimic failed post w/ user provided ccc id
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             mock_post.return_value.status_code = 500
-            with patch('requests.get') as mock_get:
+            with patch('requests.Session.get') as mock_get:
                 mock_get.return_value.status_code = 201
                 with self.assertRaises(ValueError):
                     self.dts_client.post(
@@ -116,11 +116,36 @@ class TestDtsRunner(unittest.TestCase):
                         cccId=self.ccc_id
                     )
 
+    def test_dts_post_many(self):
+        # one registration failing must not stop the rest of the batch
+        missing_filepath = "/ZAfvcacADF/missing.bam"
+        with patch('requests.Session.post') as mock_post:
+            mock_post.return_value.status_code = 201
+            results = list(self.dts_client.post_many(
+                [self.mock_filepath, missing_filepath, self.mock_filepath],
+                self.site,
+                user=self.user,
+                jobs=2
+            ))
+            self.assertEqual(mock_post.call_count, 2)
+
+        self.assertEqual(
+            sorted(r[0] for r in results),
+            sorted([self.mock_filepath, missing_filepath, self.mock_filepath])
+        )
+        for filepath, response, error in results:
+            if filepath == missing_filepath:
+                self.assertIsNone(response)
+                self.assertIsInstance(error, OSError)
+            else:
+                self.assertIsNone(error)
+                self.assertEqual(response.status_code, 201)
+
     def test_dts_update(self):
         # mimic successful update
-        with patch('requests.put') as mock_put:
+        with patch('requests.Session.put') as mock_put:
             mock_put.return_value.status_code = 201
-            with patch('requests.get') as mock_get:
+            with patch('requests.Session.get') as mock_get:
                 mock_get.return_value.status_code = 201
                 mock_get.return_value.text = json.dumps({
                     "cccId": self.ccc_id,
@@ -182,7 +207,7 @@ class TestDtsRunner(unittest.TestCase):
                 )
 
         # mimic update attempt where filepath doesn't match expected cccId
-        with patch('requests.get') as mock_get:
+        with patch('requests.Session.get') as mock_get:
             mock_get.return_value.status_code = 201
             mock_get.return_value.text = json.dumps(
                 {
@@ -207,8 +232,58 @@ class TestDtsRunner(unittest.TestCase):
                     cccId=self.ccc_id
                 )
 
+    def test_dts_put_many(self):
+        current = {
+            "cccId": self.ccc_id,
+            "name": os.path.basename(self.mock_filepath),
+            "size": os.path.getsize(self.mock_filepath),
+            "location": [{
+                "site": "http://10.73.127.6",
+                "path": os.path.dirname(self.mock_filepath),
+                "timestampUpdated": os.stat(self.mock_filepath)[-2],
+                "user": {
+                    "name": self.user
+                }
+            }]
+        }
+        stale = json.loads(json.dumps(current))
+        stale["location"][0]["timestampUpdated"] = 0
+
+        def mock_get_response(url, **kwargs):
+            response = MagicMock()
+            if url.endswith("/missing"):
+                response.status_code = 404
+            else:
+                response.status_code = 200
+                if url.endswith("/stale"):
+                    response.text = json.dumps(stale)
+                else:
+                    response.text = json.dumps(current)
+            return response
+
+        with patch('requests.Session.get') as mock_get:
+            mock_get.side_effect = mock_get_response
+            with patch('requests.Session.put') as mock_put:
+                mock_put.return_value.status_code = 200
+                results = list(self.dts_client.put_many(
+                    [self.mock_filepath,
+                     ("stale", self.mock_filepath),
+                     ("missing", self.mock_filepath)],
+                    self.site,
+                    user=self.user,
+                    jobs=3
+                ))
+                self.assertEqual(mock_put.call_count, 1)
+                self.assertEqual(
+                    json.loads(mock_put.call_args[1]["data"]),
+                    current
+                )
+
+        self.assertEqual(sorted(r[1] for r in results),
+                         ["failed", "unchanged", "updated"])
+
     def test_dts_get(self):
-        with patch('requests.get') as mock_get:
+        with patch('requests.Session.get') as mock_get:
             mock_get.return_value.status_code = 201
             self.dts_client.get(
                 cccId=self.ccc_id
@@ -221,7 +296,7 @@ class TestDtsRunner(unittest.TestCase):
             )
 
     def test_dts_query(self):
-        with patch('requests.get') as mock_get:
+        with patch('requests.Session.get') as mock_get:
             mock_get.return_value.status_code = 201
             self.dts_client.query(
                 self.mock_filepath, self.site
@@ -236,8 +311,42 @@ class TestDtsRunner(unittest.TestCase):
                          "Authorization": "Bearer "}
             )
 
+    def test_dts_query_many(self):
+        record = {"cccId": self.ccc_id,
+                  "name": os.path.basename(self.mock_filepath)}
+
+        def mock_get_response(url, **kwargs):
+            response = MagicMock()
+            if url.endswith("10.73.127.14"):
+                response.status_code = 500
+                response.text = "boom"
+            else:
+                response.status_code = 200
+                response.text = json.dumps([record])
+            return response
+
+        with patch('requests.Session.get') as mock_get:
+            mock_get.side_effect = mock_get_response
+            results = list(self.dts_client.query_many(
+                [self.mock_filepath, self.mock_filepath + ".bai"],
+                ["ohsu", "central", "oicr"],
+                jobs=4
+            ))
+            self.assertEqual(mock_get.call_count, 6)
+
+        self.assertEqual(sorted(r[0] for r in results),
+                         [self.mock_filepath, self.mock_filepath + ".bai"])
+        for filepath, records, errors in results:
+            self.assertEqual(records, [record])
+            self.assertEqual(list(errors), ["oicr"])
+            self.assertEqual(errors["oicr"].status_code, 500)
+
+        with self.assertRaises(KeyError):
+            list(self.dts_client.query_many([self.mock_filepath],
+                                            ["ohsu", self.invalid_site]))
+
     def test_dts_delete(self):
-        with patch('requests.delete') as mock_delete:
+        with patch('requests.Session.delete') as mock_delete:
             mock_delete.return_value.status_code = 201
             self.dts_client.delete(
                 cccId=self.ccc_id
@@ -249,6 +358,99 @@ class TestDtsRunner(unittest.TestCase):
                          "Authorization": "Bearer "}
             )
 
+    def bulk_records(self):
+        ohsu = "http://10.73.127.6"
+        central = "http://10.73.127.1"
+        return [
+            {"cccId": "a", "location": [{"site": ohsu, "path": "/data/x"}]},
+            {"cccId": "b", "location": [{"site": ohsu, "path": "/data"},
+                                        {"site": central, "path": "/c"}]},
+            {"cccId": "c", "location": [{"site": ohsu, "path": "/database"}]},
+        ]
+
+    def test_dts_list_records(self):
+        with patch('requests.Session.get') as mock_get:
+            mock_get.return_value.status_code = 200
+            mock_get.return_value.text = json.dumps(self.bulk_records())
+            records = self.dts_client.list_records(self.site, "/data/")
+            mock_get.assert_called_with(
+                "http://central-gateway.ccc.org:9510/api/v1/dts/file/"
+                "?site=http://10.73.127.6",
+                headers={"Content-Type": "application/json",
+                         "Authorization": "Bearer "}
+            )
+        self.assertEqual([r["cccId"] for r in records], ["a", "b"])
+
+    def test_dts_relocate(self):
+        journal = utils.Journal(tempfile.mktemp())
+        journal.add("b")
+        records = self.bulk_records()[:2]
+        with patch('requests.Session.put') as mock_put:
+            mock_put.return_value.status_code = 200
+            results = list(self.dts_client.relocate(
+                "/data", "/archive", self.site, jobs=2, journal=journal,
+                records=records
+            ))
+            self.assertEqual(mock_put.call_count, 1)
+            sent = json.loads(mock_put.call_args[1]["data"])
+        self.assertEqual(len(results), 1)
+        self.assertEqual(sent["location"][0]["path"], "/archive/x")
+        self.assertIn("a", journal)
+        journal.close()
+        os.remove(journal.path)
+
+    def test_dts_delete_prefix(self):
+        records = self.bulk_records()[:2]
+        with patch('requests.Session.put') as mock_put:
+            mock_put.return_value.status_code = 200
+            with patch('requests.Session.delete') as mock_delete:
+                mock_delete.return_value.status_code = 200
+                results = list(self.dts_client.delete_prefix(
+                    "/data", self.site, jobs=2, records=records
+                ))
+                self.assertTrue(mock_delete.call_args[0][0].endswith("/a"))
+            sent = json.loads(mock_put.call_args[1]["data"])
+        self.assertEqual(sorted((r[0]["cccId"], r[1]) for r in results),
+                         [("a", "deleted"), ("b", "updated")])
+        self.assertEqual(sent["location"],
+                         [{"site": "http://10.73.127.1", "path": "/c"}])
+
+    def test_dts_delete_prefix_error(self):
+        journal = utils.Journal(tempfile.mktemp())
+        records = self.bulk_records()[:2]
+        with patch('requests.Session.put') as mock_put:
+            mock_put.return_value.status_code = 200
+            with patch('requests.Session.delete') as mock_delete:
+                mock_delete.side_effect = IOError("connection refused")
+                results = list(self.dts_client.delete_prefix(
+                    "/data", self.site, jobs=2, journal=journal,
+                    records=records
+                ))
+        results = dict((r[0]["cccId"], r[1:]) for r in results)
+        self.assertEqual(results["a"][:2], (None, None))
+        self.assertIsInstance(results["a"][2], IOError)
+        self.assertEqual(results["b"][0], "updated")
+        self.assertNotIn("a", journal)
+        self.assertIn("b", journal)
+        journal.close()
+        os.remove(journal.path)
+
+    def test_dts_get_delete_many(self):
+        cccIds = ["id{0}".format(i) for i in range(10)]
+        with patch('requests.Session.get') as mock_get:
+            mock_get.return_value.status_code = 200
+            results = list(self.dts_client.get_many(iter(cccIds), jobs=3,
+                                                    ordered=True))
+            self.assertEqual(mock_get.call_count, 10)
+        self.assertEqual([r[0] for r in results], cccIds)
+
+        with patch('requests.Session.delete') as mock_delete:
+            mock_delete.side_effect = [IOError("boom")] + \
+                [mock_delete.return_value] * 9
+            results = list(self.dts_client.delete_many(cccIds, jobs=3))
+        self.assertEqual(sorted(r[0] for r in results), cccIds)
+        self.assertEqual(len([r for r in results if r[2] is not None]), 1)
+
     def test_cccId_generation(self):
         self.assertEqual(
             self.dts_client.infer_cccId(filepath=self.mock_filepath,
@@ -271,6 +473,22 @@ class TestDtsRunner(unittest.TestCase):
             str(uuid.uuid3(uuid.NAMESPACE_DNS, self.mock_filepath))
         )
 
+    def test_infer_cccIds(self):
+        paths = ["/data/run{0}/file{1}.bam".format(i // 10, i)
+                 for i in range(95)]
+        expected = [(p, str(uuid.uuid5(uuid.NAMESPACE_DNS, p)), None)
+                    for p in paths]
+        self.assertEqual(
+            list(self.dts_client.infer_cccIds(iter(paths), batch_size=10)),
+            expected
+        )
+        self.assertEqual(
+            list(self.dts_client.infer_cccIds(paths, jobs=2, batch_size=7)),
+            expected
+        )
+        with self.assertRaises(RuntimeError):
+            list(self.dts_client.infer_cccIds(paths, "CRC32"))
+
     def test_site_mapping(self):
         self.assertEqual(
             self.dts_client._map_site_to_ip("central"),
@@ -49,16 +49,16 @@ class TestEveMongoRunner(unittest.TestCase):
     em_mock_file.close()
 
     def test_status(self):
-        with patch('requests.get') as mock_get:
+        with patch('requests.Session.get') as mock_get:
             mock_get.return_value.status_code = 201
             self.em_client.status()
             mock_get.assert_called_with(
-                url="http://192.168.99.100:8000/v0/status"
+                "http://192.168.99.100:8000/v0/status"
             )
 
     def test_publish(self):
         # Mimic successful post
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             mock_post.return_value.status_code = 201
             self.em_client.publish(
                 tsv=self.em_mock_filepath,
@@ -69,7 +69,7 @@ class TestEveMongoRunner(unittest.TestCase):
                 domainName='file'
             )
             mock_post.assert_called_with(
-                url="http://192.168.99.100:8000/v0/submission/{}/{}".format(
+                "http://192.168.99.100:8000/v0/submission/{}/{}".format(
                     self.program, self.project),
                 data=json.dumps(
                     {
@@ -87,7 +87,7 @@ class TestEveMongoRunner(unittest.TestCase):
             )
 
         # Check bad domain
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             mock_post.return_value.status_code = 201
             with self.assertRaises(RuntimeError):
                 self.em_client.publish(
@@ -100,7 +100,7 @@ class TestEveMongoRunner(unittest.TestCase):
                 )
 
         # Test new domain file
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             mock_post.return_value.status_code = 201
             self.em_client.publish(
                 tsv=self.em_mock_filepath,
@@ -113,13 +113,13 @@ class TestEveMongoRunner(unittest.TestCase):
             )
 
     def test_query(self):
-        with patch('requests.get') as mock_get:
+        with patch('requests.Session.get') as mock_get:
             mock_get.return_value.status_code = 201
             self.em_client.query(
                 endpoint='files'
             )
             mock_get.assert_called_with(
-                url="http://192.168.99.100:8000/v0/files",
+                "http://192.168.99.100:8000/v0/files",
                 data=json.dumps(None),
                 headers={"Content-Type": "application/json",
                          "Authorization": "Bearer "}
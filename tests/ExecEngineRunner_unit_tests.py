@@ -50,7 +50,7 @@ workflow test {
             }
         )
         # mimic successful post with single input json
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             mock_post.return_value.status_code = 201
             mock_post.return_value.text = mock_response
             resp = self.ee_client.submit_workflow(
@@ -69,7 +69,7 @@ workflow test {
                 }
             }
         )
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             mock_post.return_value.status_code = 201
             mock_post.return_value.text = mock_response
             resp = self.ee_client.submit_workflow(
@@ -83,7 +83,7 @@ workflow test {
             self.assertEqual(resp.text, mock_response)
 
         # pass path to wdl that does not exist
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             mock_post.return_value.status_code = 500
             with self.assertRaises(IOError):
                 self.ee_client.submit_workflow(
@@ -93,7 +93,7 @@ workflow test {
                 )
 
         # pass inputs file incorrectly
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             mock_post.return_value.status_code = 500
             with self.assertRaises(TypeError):
                 self.ee_client.submit_workflow(
@@ -105,7 +105,7 @@ workflow test {
     def test_ee_query(self):
         # mimic successful get request to query endpoint
         terms = ["Status:Submitted", "name=testWorkflow"]
-        with patch('requests.get') as mock_get:
+        with patch('requests.Session.get') as mock_get:
             mock_get.return_value.status_code = 201
             self.ee_client.query(
                 terms
@@ -118,7 +118,7 @@ workflow test {
 
         # invalid search term
         terms = ["task:foobar"]
-        with patch('requests.get') as mock_get:
+        with patch('requests.Session.get') as mock_get:
             with self.assertRaises(ValueError):
                 self.ee_client.query(
                     terms
@@ -126,7 +126,7 @@ workflow test {
 
         # invalid status
         terms = ["Status:foobar", "name=testWorkflow"]
-        with patch('requests.get') as mock_get:
+        with patch('requests.Session.get') as mock_get:
             with self.assertRaises(ValueError):
                 self.ee_client.query(
                     terms
@@ -134,7 +134,7 @@ workflow test {
 
     def test_ee_status(self):
         # mimic successful get request to status endpoint
-        with patch('requests.get') as mock_get:
+        with patch('requests.Session.get') as mock_get:
             mock_get.return_value.status_code = 201
             self.ee_client.get_status(
                 workflowId=self.mock_workflow_id
@@ -147,7 +147,7 @@ workflow test {
 
     def test_ee_metadata(self):
         # mimic successful get request to status endpoint
-        with patch('requests.get') as mock_get:
+        with patch('requests.Session.get') as mock_get:
             mock_get.return_value.status_code = 201
             self.ee_client.get_metadata(
                 workflowId=self.mock_workflow_id
@@ -160,7 +160,7 @@ workflow test {
 
     def test_ee_outputs(self):
         # mimic successful get request to status endpoint
-        with patch('requests.get') as mock_get:
+        with patch('requests.Session.get') as mock_get:
             mock_get.return_value.status_code = 201
             self.ee_client.get_outputs(
                 workflowId=self.mock_workflow_id
@@ -0,0 +1,142 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import MagicMock, patch
+from ccc_client import DcsRunner
+from ccc_client.dcs.adjacency import AdjacencyCache, CHILDREN, PARENTS, \
+    parse_ids
+
+
+class TestAdjacencyCache(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join(self.root, "adjacency.sqlite")
+        self.cache = AdjacencyCache(self.path)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.root)
+
+    def test_parse_ids(self):
+        self.assertEqual(parse_ids('["a", "b"]'), ["a", "b"])
+        self.assertEqual(parse_ids('[{"cccId": "a"}, {"id": "b"}]'),
+                         ["a", "b"])
+        self.assertEqual(parse_ids('{"parents": ["a"]}'), ["a"])
+        self.assertRaises(ValueError, parse_ids, '[{"name": "a"}]')
+
+    def test_cache(self):
+        self.assertIsNone(self.cache.get(PARENTS, "r1"))
+        self.cache.put(PARENTS, "r1", '["s1", "s2"]', ["s1", "s2"])
+        self.cache.put(PARENTS, "r2", '["s2", "s3"]', ["s2", "s3"])
+        self.cache.put(CHILDREN, "s2", '["r1", "r2"]', ["r1", "r2"])
+        self.assertEqual(self.cache.get(PARENTS, "r1"), '["s1", "s2"]')
+        self.assertEqual(self.cache.ids(CHILDREN, "s2"), ["r1", "r2"])
+        self.assertEqual(self.cache.common_parents(["r1", "r2"]), ["s2"])
+        self.assertIsNone(self.cache.common_parents(["r1", "r3"]))
+
+        # a new process sees the same adjacency
+        other = AdjacencyCache(self.path)
+        self.assertEqual(other.common_parents(["r1", "r2"]), ["s2"])
+        other.close()
+
+        self.cache.invalidate_link("s2", "r1")
+        self.assertIsNone(self.cache.get(PARENTS, "r1"))
+        self.assertIsNone(self.cache.get(CHILDREN, "s2"))
+        self.assertEqual(self.cache.ids(PARENTS, "r2"), ["s2", "s3"])
+
+        self.cache.invalidate_set("s3")
+        self.assertIsNone(self.cache.get(PARENTS, "r2"))
+        other = AdjacencyCache(self.path)
+        self.assertIsNone(other.get(PARENTS, "r2"))
+        other.close()
+
+        self.cache.put(PARENTS, "r1", '["s1"]', ["s1"])
+        self.cache.ttl = -1
+        self.assertIsNone(self.cache.get(PARENTS, "r1"))
+
+    def test_runner(self):
+        dcs_client = DcsRunner(adjacency=self.cache)
+
+        def mock_get_response(url, **kwargs):
+            response = MagicMock()
+            response.status_code = 200
+            if "/r1/" in url:
+                response.text = json.dumps(["s1", "s2"])
+            else:
+                response.text = json.dumps(["s2"])
+            return response
+
+        with patch("requests.Session.get") as mock_get:
+            mock_get.side_effect = mock_get_response
+            dcs_client.list_sets("r1")
+            dcs_client.list_sets("r2")
+            r = dcs_client.list_sets("r1")
+            self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(r.json(), ["s1", "s2"])
+
+        with patch("requests.Session.post") as mock_post:
+            r = dcs_client.find_common_sets(["r1", "r2"])
+            self.assertFalse(mock_post.called)
+        self.assertEqual(r.json(), ["s2"])
+
+        with patch("requests.Session.put") as mock_put:
+            mock_put.return_value.status_code = 201
+            dcs_client.create_link("s3", "r2")
+        with patch("requests.Session.post") as mock_post:
+            mock_post.return_value.status_code = 200
+            dcs_client.find_common_sets(["r1", "r2"])
+            self.assertTrue(mock_post.called)
+
+    def test_sync(self):
+        dcs_client = DcsRunner(adjacency=self.cache)
+        # stale: the server says s1 holds r1 and r3
+        self.cache.put(CHILDREN, "s1", '["r1"]', ["r1"])
+        self.cache.put(PARENTS, "r2", '["s2"]', ["s2"])
+        self.cache.put(PARENTS, "r3", '["s1"]', ["s1"])
+
+        with patch("requests.Session.get") as mock_get, \
+                patch("requests.Session.put") as mock_put, \
+                patch("requests.Session.delete") as mock_delete:
+            mock_get.return_value.status_code = 200
+            mock_get.return_value.text = json.dumps(["r1", "r3"])
+            mock_put.return_value.status_code = 201
+            mock_delete.return_value.status_code = 200
+            results = list(dcs_client.sync({"s1": ["r1", "r2"]}))
+            self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(sorted(r[:3] for r in results),
+                         [("link", "s1", "r2"), ("unlink", "s1", "r3")])
+
+        # the changed links are no longer answered from the cache
+        self.assertIsNone(self.cache.get(PARENTS, "r2"))
+        self.assertIsNone(self.cache.get(PARENTS, "r3"))
+        self.assertIsNone(self.cache.get(CHILDREN, "s1"))
+
+    def test_common_sets_shape(self):
+        dcs_client = DcsRunner(adjacency=self.cache)
+        sets = [{"id": "s1", "name": "study"}, {"id": "s2", "name": "run"}]
+
+        with patch("requests.Session.post") as mock_post:
+            mock_post.return_value.status_code = 200
+            mock_post.return_value.text = json.dumps(sets[:1])
+            cold = json.loads(
+                dcs_client.find_common_sets(["r1", "r2"]).text
+            )
+
+        with patch("requests.Session.get") as mock_get:
+            mock_get.return_value.status_code = 200
+            mock_get.return_value.text = json.dumps(sets)
+            dcs_client.list_sets("r1")
+            mock_get.return_value.text = json.dumps(sets[:1])
+            dcs_client.list_sets("r2")
+        with patch("requests.Session.post") as mock_post:
+            warm = dcs_client.find_common_sets(["r1", "r2"]).json()
+            self.assertFalse(mock_post.called)
+        self.assertEqual(warm, cold)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import uuid
+
+from mock import patch
+from ccc_client import DtsRunner
+from ccc_client.dts.bloom import BloomFilter, iter_export_cccIds
+from ccc_client.dts.ledger import Ledger
+
+
+class TestBloomFilter(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.cccIds = [str(uuid.uuid4()) for _ in range(1000)]
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_membership(self):
+        bloom = BloomFilter.from_cccIds(self.cccIds, capacity=1000,
+                                        error_rate=0.01)
+        self.assertEqual(len(bloom), 1000)
+        for cccId in self.cccIds:
+            self.assertIn(cccId, bloom)
+        others = [str(uuid.uuid4()) for _ in range(1000)]
+        false_positives = sum(1 for cccId in others if cccId in bloom)
+        self.assertLess(false_positives, 50)
+
+        self.assertRaises(ValueError, BloomFilter, 0)
+        self.assertRaises(ValueError, BloomFilter, 10, 1.5)
+
+    def test_save_load(self):
+        path = os.path.join(self.root, "bloom.bin")
+        bloom = BloomFilter.from_cccIds(self.cccIds, capacity=1000)
+        bloom.save(path)
+        loaded = BloomFilter.load(path)
+        self.assertEqual(loaded.bits, bloom.bits)
+        self.assertEqual(len(loaded), len(bloom))
+        self.assertIn(self.cccIds[0], loaded)
+
+        with open(path, "r+b") as fh:
+            fh.truncate(20)
+        self.assertRaises(ValueError, BloomFilter.load, path)
+
+    def test_sources(self):
+        export = os.path.join(self.root, "export.txt")
+        with open(export, "w") as fh:
+            fh.write("a\n")
+            fh.write(json.dumps({"cccId": "b"}) + "\n")
+            fh.write(json.dumps([{"cccId": "c"}, {"cccId": "d"}]) + "\n")
+        self.assertEqual(list(iter_export_cccIds(export)),
+                         ["a", "b", "c", "d"])
+
+        ledger_path = os.path.join(self.root, "ledger.sqlite")
+        data_dir = os.path.join(self.root, "data")
+        os.makedirs(data_dir)
+        with open(os.path.join(data_dir, "a.bam"), "w") as fh:
+            fh.write("a")
+        record = next(DtsRunner().scan(data_dir))
+        with Ledger(ledger_path) as ledger:
+            ledger.add(record, ["ohsu"])
+            bloom = BloomFilter.from_cccIds(ledger.cccIds(), capacity=10)
+        self.assertIn(record.cccId, bloom)
+
+    def test_post_skips_check(self):
+        filepath = os.path.join(self.root, "a.bam")
+        with open(filepath, "w") as fh:
+            fh.write("a")
+        dts_client = DtsRunner(known_cccIds=BloomFilter(capacity=10))
+
+        # an unknown cccId is posted without a GET
+        with patch('requests.Session.get') as mock_get:
+            with patch('requests.Session.post') as mock_post:
+                mock_post.return_value.status_code = 201
+                dts_client.post(filepath, "ohsu", "tester", cccId="1234")
+                self.assertFalse(mock_get.called)
+        self.assertIn("1234", dts_client.known_cccIds)
+
+        # a possibly known one is checked with the server
+        with patch('requests.Session.get') as mock_get:
+            mock_get.return_value.status_code = 200
+            with self.assertRaises(ValueError):
+                dts_client.post(filepath, "ohsu", "tester", cccId="1234")
+            self.assertEqual(mock_get.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,16 @@
 import argparse
+import os
+import shutil
+import tempfile
 import unittest
 
 from nose.tools import eq_
 from mock import patch, call
 
 from ccc_client import cli
+from ccc_client.dts.DtsRunner import path_cccId
+from ccc_client.dts.bloom import BloomFilter
+from ccc_client.dts.hashing import HashCache
 
 
 def run_cli(args):
@@ -44,6 +50,16 @@ def test_dts_post(mock):
     ])
 
 
+@patch('ccc_client.dts.DtsRunner.DtsRunner.post_many')
+def test_dts_post_jobs(mock):
+    run_cli("dts post --filepath /dev/null /dev/tty "
+            "--user test --site central --jobs 4")
+    args, kwargs = mock.call_args
+    eq_(list(args[0]), ["/dev/null", "/dev/tty"])
+    eq_(args[1:], (["central"], "test"))
+    eq_(kwargs, {"jobs": 4})
+
+
 @patch('ccc_client.dts.DtsRunner.DtsRunner.put')
 def test_dts_put(mock):
     run_cli("dts put --filepath /dev/null --user test --site central "
@@ -53,6 +69,126 @@ def test_dts_put(mock):
     ])
 
 
+@patch('ccc_client.dts.DtsRunner.DtsRunner.sync')
+def test_dts_sync(mock):
+    ledger = tempfile.NamedTemporaryFile(suffix=".sqlite")
+    run_cli("dts sync --filepath /dev/null --site ohsu --user test "
+            "--jobs 2 --ledger " + ledger.name)
+    args, kwargs = mock.call_args
+    eq_(list(args[0]), ["/dev/null"])
+    eq_(args[1], ["ohsu"])
+    eq_(args[2].path, ledger.name)
+    eq_(args[3], "test")
+    eq_(kwargs, {"jobs": 2})
+
+
+@patch('ccc_client.dts.DtsRunner.DtsRunner.infer_cccIds')
+def test_dts_infer_cccId_from_file(mock):
+    paths = tempfile.NamedTemporaryFile(mode="w")
+    paths.write("/data/a.bam\n/data/b.bam \n")
+    paths.flush()
+    run_cli("dts infer-cccId --fromFile {0} --jobs 2 --batchSize 5".format(
+        paths.name
+    ))
+    args, kwargs = mock.call_args
+    eq_(list(args[0]), ["/data/a.bam", "/data/b.bam "])
+    eq_(kwargs, {"jobs": 2, "batch_size": 5})
+
+
+def test_dts_infer_cccId_hash_cache():
+    root = tempfile.mkdtemp()
+    try:
+        data = os.path.join(root, "a.bam")
+        with open(data, "wb") as fh:
+            fh.write(b"abc")
+        cache = os.path.join(root, "cache.db")
+        run_cli("dts infer-cccId --strategy CONTENT-SHA256 --hashCache "
+                "{0} {1}".format(cache, data))
+        with HashCache(cache) as hash_cache:
+            rows = hash_cache.conn.execute("SELECT COUNT(*) FROM digests")
+            eq_(rows.fetchone()[0], 1)
+    finally:
+        shutil.rmtree(root)
+
+
+@patch('ccc_client.dts.DtsRunner.DtsRunner.put_many')
+def test_dts_put_many(mock):
+    run_cli("dts put --filepath /dev/null /dev/tty --user test "
+            "--site central --jobs 3")
+    args, kwargs = mock.call_args
+    eq_(list(args[0]), ["/dev/null", "/dev/tty"])
+    eq_(args[1:], (["central"], "test"))
+    eq_(kwargs, {"jobs": 3})
+
+
+@patch('ccc_client.dts.DtsRunner.DtsRunner.query')
+def test_dts_query(mock):
+    # the form given in USAGE.txt, and a site between the positionals
+    run_cli("dts query --site ohsu /dev/null name:foo")
+    run_cli("dts query /dev/null --site ohsu name:foo")
+    eq_(mock.call_args_list, [call("/dev/null", "ohsu")] * 2)
+
+
+@patch('ccc_client.dts.DtsRunner.DtsRunner.query_many')
+def test_dts_query_many(mock):
+    run_cli("dts query /dev/null -s ohsu --site central --jobs 4 name:foo")
+    args, kwargs = mock.call_args
+    eq_(list(args[0]), ["/dev/null"])
+    eq_(args[1], ["ohsu", "central"])
+    eq_(kwargs, {"jobs": 4})
+
+
+def test_dts_build_bloom():
+    export = tempfile.NamedTemporaryFile(mode="w")
+    export.write("foo\nbar\n")
+    export.flush()
+    output = tempfile.NamedTemporaryFile(suffix=".bin")
+    run_cli("dts build-bloom --fromFile {0} --output {1} "
+            "--capacity 10".format(export.name, output.name))
+    bloom = BloomFilter.load(output.name)
+    eq_(len(bloom), 2)
+    assert "foo" in bloom
+
+
+@patch('requests.Session.post')
+def test_dts_post_bloom(mock):
+    mock.return_value.status_code = 201
+    data = tempfile.NamedTemporaryFile(suffix=".bam")
+    output = tempfile.NamedTemporaryFile(suffix=".bin")
+    BloomFilter.from_cccIds(["foo"], capacity=10).save(output.name)
+    run_cli("dts post --filepath {0} --site ohsu --user tester --no-cache "
+            "--bloom {1}".format(data.name, output.name))
+    bloom = BloomFilter.load(output.name)
+    eq_(len(bloom), 2)
+    assert path_cccId(data.name) in bloom
+
+
+@patch('ccc_client.dts.DtsRunner.DtsRunner.relocate')
+@patch('ccc_client.dts.DtsRunner.DtsRunner.list_records')
+def test_dts_relocate(list_mock, relocate_mock):
+    list_mock.return_value = [{"cccId": "foo"}]
+    run_cli("dts relocate --prefix /data --newPrefix /archive --site ohsu "
+            "--jobs 4 --no-cache")
+    eq_(list_mock.call_args_list, [call("ohsu", "/data")])
+    args, kwargs = relocate_mock.call_args
+    eq_(args, ("/data", "/archive", "ohsu"))
+    eq_(kwargs, {"jobs": 4, "journal": None, "records": [{"cccId": "foo"}]})
+
+
+@patch('ccc_client.dts.DtsRunner.DtsRunner.apply_reconcile')
+@patch('ccc_client.dts.DtsRunner.DtsRunner.reconcile')
+def test_dts_reconcile(reconcile_mock, apply_mock):
+    run_cli("dts reconcile --prefix /data --site ohsu --jobs 2 --no-cache")
+    eq_(reconcile_mock.call_args_list, [call("/data", "ohsu", jobs=2)])
+    assert not apply_mock.called
+
+    run_cli("dts reconcile --prefix /data --site ohsu --apply --user test "
+            "--no-cache")
+    args, kwargs = apply_mock.call_args
+    eq_(args[1:], ("ohsu", "test"))
+    eq_(kwargs, {"jobs": 1})
+
+
 @patch('ccc_client.dts.DtsRunner.DtsRunner.get')
 def test_dts_get(mock):
     run_cli("dts get foo")
@@ -65,6 +201,89 @@ def test_dts_delete(mock):
     eq_(mock.call_args_list, [call('foo')])
 
 
+@patch('ccc_client.dts.DtsRunner.DtsRunner.get_many')
+def test_dts_get_many(mock):
+    cccIds = tempfile.NamedTemporaryFile(mode="w")
+    cccIds.write("bar\nbaz\n")
+    cccIds.flush()
+    run_cli("dts get foo --fromFile {0} --jobs 8 --ordered".format(
+        cccIds.name
+    ))
+    args, kwargs = mock.call_args
+    eq_(list(args[0]), ["foo", "bar", "baz"])
+    eq_(kwargs, {"jobs": 8, "ordered": True})
+
+
+@patch('ccc_client.dts.DtsRunner.DtsRunner.delete_many')
+def test_dts_delete_many(mock):
+    run_cli("dts delete foo bar --jobs 2")
+    args, kwargs = mock.call_args
+    eq_(list(args[0]), ["foo", "bar"])
+    eq_(kwargs, {"jobs": 2, "ordered": False})
+
+
+@patch('ccc_client.dcs.DcsRunner.DcsRunner.create_links')
+def test_dcs_create_links(mock):
+    cccIds = tempfile.NamedTemporaryFile(mode="w")
+    cccIds.write("bar\nbaz\n")
+    cccIds.flush()
+    run_cli("dcs create-link --setId set --cccId foo --fromFile {0} "
+            "--jobs 8".format(cccIds.name))
+    args, kwargs = mock.call_args
+    eq_(args[0], "set")
+    eq_(list(args[1]), ["foo", "bar", "baz"])
+    eq_(kwargs, {"jobs": 8})
+
+
+@patch('ccc_client.dcs.DcsRunner.DcsRunner.delete_link')
+def test_dcs_delete_link(mock):
+    run_cli("dcs delete-link --setId set --cccId foo bar")
+    eq_(mock.call_args_list, [call("set", "foo"), call("set", "bar")])
+
+
+@patch('ccc_client.dcs.DcsRunner.DcsRunner.list_sets')
+def test_dcs_list_sets(mock):
+    run_cli("dcs list-sets foo --no-cache")
+    eq_(mock.call_args_list, [call("foo")])
+
+
+@patch('ccc_client.dcs.DcsRunner.DcsRunner.find_common_sets')
+def test_dcs_find_common_sets(mock):
+    run_cli("dcs find-common-sets foo bar --no-cache")
+    eq_(mock.call_args_list, [call(["foo", "bar"])])
+
+
+@patch('ccc_client.dcs.DcsRunner.DcsRunner.find_common_sets')
+def test_dcs_find_common_sets_chunked(mock):
+    ids = tempfile.NamedTemporaryFile(mode="w")
+    ids.write("bar\nbaz\n")
+    ids.flush()
+    run_cli("dcs find-common-sets foo --fromFile {0} --chunkSize 2 "
+            "--jobs 3 --no-cache".format(ids.name))
+    args, kwargs = mock.call_args
+    eq_(list(args[0]), ["foo", "bar", "baz"])
+    eq_(kwargs, {"chunk_size": 2, "jobs": 3})
+
+
+@patch('ccc_client.dcs.DcsRunner.DcsRunner.walk')
+def test_dcs_walk(mock):
+    run_cli("dcs walk foo --jobs 8 --no-cache")
+    eq_(mock.call_args_list, [call("foo", jobs=8)])
+
+
+@patch('ccc_client.dcs.DcsRunner.DcsRunner.sync')
+def test_dcs_sync(mock):
+    manifest = tempfile.NamedTemporaryFile(mode="w")
+    manifest.write("# setId\tcccId\ns1\ta\ns1\tb\ns2\ta\n")
+    manifest.flush()
+    run_cli("dcs sync {0} --jobs 3 --addOnly --no-cache".format(
+        manifest.name
+    ))
+    args, kwargs = mock.call_args
+    eq_(dict(args[0]), {"s1": set(["a", "b"]), "s2": set(["a"])})
+    eq_(kwargs, {"jobs": 3, "prune": False, "dry_run": False})
+
+
 @patch('ccc_client.exec_engine.ExecEngineRunner'
        '.ExecEngineRunner.submit_workflow')
 def test_exec_submit(mock):
@@ -107,6 +326,35 @@ def test_app_upload_image(image_mock, meta_mock):
     eq_(meta_mock.call_args_list, [call(None, "/dev/null")])
 
 
+@patch('ccc_client.app_repo.AppRepoRunner.AppRepoRunner.upload_metadata')
+@patch('ccc_client.app_repo.AppRepoRunner.AppRepoRunner.upload_image')
+def test_app_upload_image_digest(image_mock, meta_mock):
+    image_mock.return_value.sha256 = "ab" * 32
+    run_cli("app-repo upload-image -b /dev/null --metadata /dev/null "
+            "--recordDigest")
+    eq_(meta_mock.call_args_list, [
+        call(None, "/dev/null", sha256="ab" * 32)
+    ])
+
+
+@patch('ccc_client.app_repo.AppRepoRunner.AppRepoRunner.push_image_layers')
+def test_app_upload_image_layers(mock):
+    mock.return_value.pushed = []
+    mock.return_value.existing = []
+    run_cli("app-repo upload-image -b /dev/null --layers --jobs 2")
+    eq_(mock.call_args_list, [call("/dev/null", None, None, jobs=2)])
+
+
+@patch('ccc_client.app_repo.AppRepoRunner.AppRepoRunner.upload_image_chunked')
+def test_app_upload_image_chunked(mock):
+    run_cli("app-repo upload-image -b /dev/null -n testImage --chunked "
+            "--chunkSize 2 --jobs 6 --journal /tmp/upload.journal")
+    eq_(mock.call_args_list, [
+        call("/dev/null", "testImage", None, chunk_size=2 * 1024 * 1024,
+             jobs=6, journal="/tmp/upload.journal")
+    ])
+
+
 @patch('ccc_client.app_repo.AppRepoRunner.AppRepoRunner.upload_metadata')
 def test_app_upload_metadata(mock):
     run_cli("app-repo upload-metadata --metadata /dev/null --imageId foo")
@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+from ccc_client import DtsRunner
+from ccc_client.dts import hashing
+
+
+class TestHashing(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.files = []
+        for name, content in [("a.bam", b"abc" * 1000), ("b.bam", b"")]:
+            filepath = os.path.join(self.root, name)
+            with open(filepath, "wb") as fh:
+                fh.write(content)
+            self.files.append(filepath)
+        self.cache = hashing.HashCache(os.path.join(self.root, "cache.db"))
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.root)
+
+    def test_hash_file(self):
+        self.assertEqual(hashing.hash_file(self.files[0]),
+                         hashlib.sha256(b"abc" * 1000).hexdigest())
+        self.assertEqual(hashing.hash_file(self.files[0], "blake2b"),
+                         hashlib.blake2b(b"abc" * 1000).hexdigest())
+        self.assertEqual(hashing.hash_file(self.files[1]),
+                         hashlib.sha256(b"").hexdigest())
+        with self.assertRaises(RuntimeError):
+            hashing.hash_file(self.files[0], "crc32")
+
+    def test_cache(self):
+        hasher = hashing.ContentHasher("sha256", self.cache)
+        digest = hasher.digest(self.files[0])
+        with patch('ccc_client.dts.hashing.hash_file') as mock_hash:
+            self.assertEqual(hasher.digest(self.files[0]), digest)
+            self.assertFalse(mock_hash.called)
+
+        # a modified file is hashed again
+        with open(self.files[0], "ab") as fh:
+            fh.write(b"more")
+        os.utime(self.files[0], (0, 0))
+        self.assertNotEqual(hasher.digest(self.files[0]), digest)
+
+    def test_digest_many(self):
+        hasher = hashing.ContentHasher("sha256", self.cache)
+        missing = os.path.join(self.root, "missing.bam")
+        results = hasher.digest_many(self.files + [missing], jobs=2)
+        results = dict((r[0], r[1:]) for r in results)
+        self.assertEqual(sorted(results), sorted(self.files + [missing]))
+        for filepath in self.files:
+            digest, error = results[filepath]
+            self.assertIsNone(error)
+            self.assertEqual(digest, hashing.hash_file(filepath))
+        self.assertIsNotNone(results[missing][1])
+
+        # everything is now answered from the cache
+        with patch('ccc_client.utils.ProcessPoolExecutor') as mock_pool:
+            results = list(hasher.digest_many(self.files, jobs=2))
+            self.assertFalse(mock_pool.return_value.__enter__.return_value
+                             .submit.called)
+        self.assertTrue(all(r[1] is not None for r in results))
+
+    def test_content_cccId_post(self):
+        dts_client = DtsRunner(uuid_strategy="CONTENT-SHA256",
+                               hash_cache=self.cache)
+        digest = hashlib.sha256(b"abc" * 1000).hexdigest()
+        with patch('requests.Session.post') as mock_post:
+            mock_post.return_value.status_code = 201
+            dts_client.post(self.files[0], "ohsu", "tester")
+            sent = json.loads(mock_post.call_args[1]["data"])
+        self.assertEqual(sent["checksum"], "sha256:" + digest)
+        self.assertEqual(sent["cccId"],
+                         hashing.content_cccId("sha256", digest))
+
+        # the id follows the content, not the path
+        moved = os.path.join(self.root, "moved.bam")
+        shutil.copy(self.files[0], moved)
+        self.assertEqual(dts_client.infer_cccId(moved), sent["cccId"])
+        self.assertNotEqual(dts_client.infer_cccId(moved, "SHA-1"),
+                            sent["cccId"])
+
+    def test_close_persists_cache(self):
+        path = os.path.join(self.root, "runner.db")
+        with DtsRunner(uuid_strategy="CONTENT-SHA256",
+                       hash_cache=path) as dts_client:
+            dts_client.infer_cccId(self.files[0])
+        self.assertEqual(dts_client.hash_cache, path)
+
+        with hashing.HashCache(path) as cache:
+            rows = cache.conn.execute("SELECT COUNT(*) FROM digests")
+            self.assertEqual(rows.fetchone()[0], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+from ccc_client import DtsRunner
+from ccc_client.dts.index import RecordIndex
+
+
+class TestRecordIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.index = RecordIndex(os.path.join(self.root, "index.sqlite"))
+        self.dts_client = DtsRunner(index=self.index)
+        self.record = {
+            "cccId": "1234",
+            "name": "a.bam",
+            "size": 10,
+            "location": [{"site": "http://10.73.127.6", "path": "/data"}]
+        }
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.root)
+
+    def test_index(self):
+        self.assertIsNone(self.index.get("1234"))
+        self.index.add_records([self.record])
+        self.assertEqual(json.loads(self.index.get("1234")), self.record)
+
+        self.index.add_query("a.bam", "/data", "http://10.73.127.6",
+                             [self.record])
+        found = self.index.query("a.bam", "/data", "http://10.73.127.6")
+        self.assertEqual(json.loads(found), [self.record])
+
+        # writing a record drops the query answers for its locations
+        self.index.add_records([self.record])
+        self.assertIsNone(
+            self.index.query("a.bam", "/data", "http://10.73.127.6")
+        )
+
+        self.index.forget("1234")
+        self.assertIsNone(self.index.get("1234"))
+        self.assertEqual(self.index.hits, 2)
+        self.assertEqual(self.index.misses, 3)
+
+        # expired entries are misses
+        self.index.add_records([self.record])
+        self.index.ttl = -1
+        self.assertIsNone(self.index.get("1234"))
+
+    def test_relocating_put(self):
+        with patch('requests.Session.get') as mock_get:
+            mock_get.return_value.status_code = 200
+            mock_get.return_value.text = json.dumps([self.record])
+            self.dts_client.query("/data/a.bam", "ohsu")
+
+        moved = dict(self.record, location=[
+            {"site": "http://10.73.127.6", "path": "/archive"}
+        ])
+        with patch('requests.Session.put') as mock_put:
+            mock_put.return_value.status_code = 200
+            self.dts_client._put_record(moved)
+
+        # the answer for the old path is not served from the index
+        with patch('requests.Session.get') as mock_get:
+            mock_get.return_value.status_code = 200
+            mock_get.return_value.text = "[]"
+            self.dts_client.query("/data/a.bam", "ohsu")
+            self.assertEqual(mock_get.call_count, 1)
+
+    def test_get_read_through(self):
+        with patch('requests.Session.get') as mock_get:
+            mock_get.return_value.status_code = 200
+            mock_get.return_value.text = json.dumps(self.record)
+            first = self.dts_client.get("1234")
+            second = self.dts_client.get("1234")
+            self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(json.loads(first.text), second.json())
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json(), self.record)
+
+        # a delete invalidates the entry
+        with patch('requests.Session.delete') as mock_delete:
+            mock_delete.return_value.status_code = 200
+            self.dts_client.delete("1234")
+        with patch('requests.Session.get') as mock_get:
+            mock_get.return_value.status_code = 404
+            self.assertEqual(self.dts_client.get("1234").status_code, 404)
+            self.assertEqual(mock_get.call_count, 1)
+
+    def test_writes_read_the_server(self):
+        self.index.add_records([self.record])
+        filepath = os.path.join(self.root, "a.bam")
+        with open(filepath, "w") as fh:
+            fh.write("a")
+        # the server's copy differs from the indexed one, whose size
+        # would not match the file
+        current = dict(self.record, size=1, location=[
+            {"site": "http://10.73.127.1", "path": "/elsewhere"}
+        ])
+        with patch('requests.Session.get') as mock_get, \
+                patch('requests.Session.put') as mock_put:
+            mock_get.return_value.status_code = 200
+            mock_get.return_value.text = json.dumps(current)
+            mock_put.return_value.status_code = 200
+            self.dts_client.put("1234", filepath, "ohsu", "tester")
+            self.assertEqual(mock_get.call_count, 1)
+            results = list(self.dts_client.put_many([("1234", filepath)],
+                                                    "ohsu", "tester"))
+            self.assertEqual(mock_get.call_count, 2)
+            self.assertEqual(results[0][1], "updated")
+            self.assertTrue(self.dts_client._check_cccId("1234"))
+            self.assertEqual(mock_get.call_count, 3)
+
+    def test_query_read_through(self):
+        with patch('requests.Session.get') as mock_get:
+            mock_get.return_value.status_code = 200
+            mock_get.return_value.text = json.dumps([self.record])
+            self.dts_client.query("/data/a.bam", "ohsu")
+            r = self.dts_client.query("/data/a.bam", "ohsu")
+            self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(r.json(), [self.record])
+
+        # an update to the record goes back to the server
+        with patch('requests.Session.put') as mock_put:
+            mock_put.return_value.status_code = 200
+            self.dts_client._put_record(self.record)
+        with patch('requests.Session.get') as mock_get:
+            mock_get.return_value.status_code = 200
+            mock_get.return_value.text = json.dumps([self.record])
+            self.dts_client.query("/data/a.bam", "ohsu")
+            self.assertEqual(mock_get.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
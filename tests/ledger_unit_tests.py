@@ -0,0 +1,86 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+from ccc_client import DtsRunner
+from ccc_client.dts.ledger import Ledger
+
+
+class TestLedger(unittest.TestCase):
+    dts_client = DtsRunner()
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.data_dir = os.path.join(self.root, "data")
+        os.makedirs(self.data_dir)
+        for name in ["a.bam", "b.bam"]:
+            with open(os.path.join(self.data_dir, name), "w") as fh:
+                fh.write(name)
+        self.ledger = Ledger(os.path.join(self.root, "ledger.sqlite"))
+
+    def tearDown(self):
+        self.ledger.close()
+        shutil.rmtree(self.root)
+
+    def sync(self):
+        return list(self.dts_client.sync(self.data_dir, ["ohsu"],
+                                         self.ledger, user="tester"))
+
+    def test_ledger(self):
+        record = next(self.dts_client.scan(self.data_dir))
+        self.assertIsNone(self.ledger.get(record.path))
+        self.assertFalse(self.ledger.is_current(record, ["ohsu"]))
+
+        self.ledger.add(record, ["ohsu", "central"])
+        self.assertTrue(self.ledger.is_current(record, ["ohsu"]))
+        self.assertFalse(self.ledger.is_current(record, ["oicr"]))
+        self.assertFalse(self.ledger.is_current(
+            record._replace(size=record.size + 1), ["ohsu"]
+        ))
+        self.assertEqual(list(self.ledger.cccIds()), [record.cccId])
+
+    def test_sync(self):
+        # first sync registers everything
+        with patch('requests.Session.post') as mock_post:
+            mock_post.return_value.status_code = 201
+            results = self.sync()
+            self.assertEqual(mock_post.call_count, 2)
+        self.assertEqual([r[1] for r in results], ["posted", "posted"])
+
+        # second sync sends nothing
+        with patch('requests.Session.post') as mock_post:
+            with patch('requests.Session.get') as mock_get:
+                results = self.sync()
+                self.assertFalse(mock_post.called)
+                self.assertFalse(mock_get.called)
+        self.assertEqual([r[1] for r in results], ["unchanged", "unchanged"])
+
+        # a changed file is updated in place without a POST
+        changed = os.path.join(self.data_dir, "b.bam")
+        with open(changed, "a") as fh:
+            fh.write("more data")
+        record = self.ledger.get(changed)
+        with patch('requests.Session.post') as mock_post:
+            with patch('requests.Session.get') as mock_get:
+                mock_get.return_value.status_code = 200
+                mock_get.return_value.text = json.dumps({
+                    "cccId": record["cccId"],
+                    "name": "b.bam",
+                    "size": record["size"],
+                    "location": []
+                })
+                with patch('requests.Session.put') as mock_put:
+                    mock_put.return_value.status_code = 200
+                    results = self.sync()
+                    self.assertFalse(mock_post.called)
+                    sent = json.loads(mock_put.call_args[1]["data"])
+        self.assertEqual([r[1] for r in results], ["unchanged", "updated"])
+        self.assertEqual(sent["size"], os.path.getsize(changed))
+        self.assertEqual(self.ledger.get(changed)["size"], sent["size"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+from ccc_client import DtsRunner
+from ccc_client.dts.DtsRunner import path_cccId
+
+
+class TestReconcile(unittest.TestCase):
+    dts_client = DtsRunner()
+    ohsu = "http://10.73.127.6"
+    central = "http://10.73.127.1"
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.data_dir = os.path.join(self.root, "data")
+        os.makedirs(os.path.join(self.data_dir, "sub"))
+        for name in ["a.bam", "c.bam", os.path.join("sub", "b.bam")]:
+            with open(os.path.join(self.data_dir, name), "w") as fh:
+                fh.write(name)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def record(self, cccId, name, size, path=None, site=None):
+        return {
+            "cccId": cccId,
+            "name": name,
+            "size": size,
+            "location": [{"site": site or self.ohsu,
+                          "path": path or self.data_dir}]
+        }
+
+    def records(self):
+        d = self.record("d", "d.bam", 5)
+        d["location"].append({"site": self.central, "path": "/central"})
+        return [
+            self.record("b", "b.bam", 1, os.path.join(self.data_dir, "sub")),
+            d,
+            self.record("a", "a.bam", len("a.bam")),
+            self.record("a2", "a.bam", len("a.bam")),
+            self.record("x", "x.bam", 1, site=self.central),
+        ]
+
+    def test_reconcile(self):
+        diffs = list(self.dts_client.reconcile(self.data_dir, "ohsu",
+                                               records=self.records()))
+        self.assertEqual(
+            [(d[0], os.path.relpath(d[1], self.data_dir)) for d in diffs],
+            [("ok", "a.bam"),
+             ("duplicate", "a.bam"),
+             ("unregistered", "c.bam"),
+             ("missing", "d.bam"),
+             ("size-mismatch", os.path.join("sub", "b.bam"))]
+        )
+        self.assertEqual(diffs[0][3]["cccId"], "a")
+        self.assertEqual(diffs[2][2].size, len("c.bam"))
+
+    def test_apply_reconcile(self):
+        diffs = self.dts_client.reconcile(self.data_dir, "ohsu",
+                                          records=self.records())
+        with patch('requests.Session.get') as mock_get, \
+                patch('requests.Session.post') as mock_post, \
+                patch('requests.Session.put') as mock_put, \
+                patch('requests.Session.delete') as mock_delete:
+            mock_get.return_value.status_code = 404
+            mock_post.return_value.status_code = 201
+            mock_put.return_value.status_code = 200
+            mock_delete.return_value.status_code = 200
+            results = list(self.dts_client.apply_reconcile(
+                diffs, "ohsu", user="tester", jobs=2
+            ))
+            self.assertEqual(mock_post.call_count, 1)
+            self.assertEqual(mock_put.call_count, 2)
+            self.assertTrue(mock_delete.call_args[0][0].endswith("/a2"))
+            sent = sorted((json.loads(c[1]["data"])
+                           for c in mock_put.call_args_list),
+                          key=lambda r: r["cccId"])
+
+        self.assertEqual(
+            sorted((d[0], action) for d, action, r, e in results),
+            [("duplicate", "deleted"), ("missing", "updated"),
+             ("size-mismatch", "updated"), ("unregistered", "posted")]
+        )
+        self.assertEqual(sent[0]["size"], len("sub/b.bam"))
+        self.assertEqual(sent[0]["location"][0]["user"], {"name": "tester"})
+        self.assertEqual(sent[1]["location"],
+                         [{"site": self.central, "path": "/central"}])
+
+    def test_duplicate_keeps_local_cccId(self):
+        cccId = path_cccId(os.path.join(self.data_dir, "a.bam"))
+        records = [self.record("a2", "a.bam", len("a.bam")),
+                   self.record(cccId, "a.bam", len("a.bam"))]
+        diffs = list(self.dts_client.reconcile(self.data_dir, "ohsu",
+                                               records=records))
+        self.assertEqual([(d[0], d[3]["cccId"]) for d in diffs[:2]],
+                         [("ok", cccId), ("duplicate", "a2")])
+
+    def test_unregistered_elsewhere(self):
+        filepath = os.path.join(self.data_dir, "c.bam")
+        existing = self.record(path_cccId(filepath), "c.bam", len("c.bam"),
+                               path="/central", site=self.central)
+        diffs = [d for d in self.dts_client.reconcile(
+            self.data_dir, "ohsu", records=[]
+        ) if d[1] == filepath]
+        with patch('requests.Session.get') as mock_get, \
+                patch('requests.Session.post') as mock_post, \
+                patch('requests.Session.put') as mock_put:
+            mock_get.return_value.status_code = 200
+            mock_get.return_value.text = json.dumps(existing)
+            mock_put.return_value.status_code = 200
+            results = list(self.dts_client.apply_reconcile(
+                diffs, "ohsu", user="tester"
+            ))
+            self.assertFalse(mock_post.called)
+            sent = json.loads(mock_put.call_args[1]["data"])
+        self.assertEqual(results[0][1], "located")
+        self.assertEqual(
+            [(loc["site"], loc["path"]) for loc in sent["location"]],
+            [(self.central, "/central"), (self.ohsu, self.data_dir)]
+        )
+
+    def test_relative_prefix(self):
+        cwd = os.getcwd()
+        os.chdir(self.root)
+        try:
+            diffs = list(self.dts_client.reconcile("data", "ohsu",
+                                                   records=self.records()))
+        finally:
+            os.chdir(cwd)
+        self.assertEqual(
+            [d[0] for d in diffs],
+            ["ok", "duplicate", "unregistered", "missing", "size-mismatch"]
+        )
+
+    def test_missing_prefix(self):
+        diffs = self.dts_client.reconcile(
+            os.path.join(self.root, "unmounted"), "ohsu",
+            records=self.records()
+        )
+        self.assertRaises(ValueError, list, diffs)
+
+    def test_unregistered_already_located(self):
+        filepath = os.path.join(self.data_dir, "c.bam")
+        existing = self.record(path_cccId(filepath), "c.bam", len("c.bam"))
+        diffs = [("unregistered", filepath,
+                  self.dts_client._file_record(filepath), None)]
+        with patch('requests.Session.get') as mock_get, \
+                patch('requests.Session.put') as mock_put:
+            mock_get.return_value.status_code = 200
+            mock_get.return_value.text = json.dumps(existing)
+            results = list(self.dts_client.apply_reconcile(
+                diffs, "ohsu", user="tester"
+            ))
+            self.assertFalse(mock_put.called)
+        self.assertEqual(results[0][1], "unchanged")
+
+
+if __name__ == '__main__':
+    unittest.main()
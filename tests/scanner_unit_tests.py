@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+import unittest
+import uuid
+
+from mock import patch
+from ccc_client import DtsRunner
+from ccc_client.dts import scanner
+
+
+class TestScanner(unittest.TestCase):
+    dts_client = DtsRunner()
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.files = []
+        for relpath in ["b.txt", "a/x.bam", "a/y.bam", "a/c/z.vcf"]:
+            filepath = os.path.join(self.root, relpath)
+            if not os.path.isdir(os.path.dirname(filepath)):
+                os.makedirs(os.path.dirname(filepath))
+            with open(filepath, "w") as fh:
+                fh.write(relpath)
+            self.files.append(filepath)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_scan(self):
+        records = list(self.dts_client.scan(self.root))
+        self.assertEqual(
+            [r.path for r in records],
+            [os.path.join(self.root, p)
+             for p in ["a/c/z.vcf", "a/x.bam", "a/y.bam", "b.txt"]]
+        )
+        for r in records:
+            self.assertEqual(r.size, os.path.getsize(r.path))
+            self.assertEqual(r.mtime, os.stat(r.path)[-2])
+            self.assertEqual(r.cccId,
+                             str(uuid.uuid5(uuid.NAMESPACE_DNS, r.path)))
+
+        # explicit files and a thread pool give the same records
+        threaded = self.dts_client.scan([self.root, self.files[0]], jobs=4)
+        self.assertEqual(sorted(threaded),
+                         sorted(records + [records[-1]]))
+
+    def test_post_with_record_does_not_stat(self):
+        record = scanner.stat_file(self.files[0],
+                                   self.dts_client._identify)
+        with patch('requests.Session.post') as mock_post:
+            mock_post.return_value.status_code = 201
+            with patch('os.stat') as mock_stat:
+                self.dts_client.post(record, ["ohsu", "central"], "tester")
+                self.assertFalse(mock_stat.called)
+            self.assertIn('"size": {0}'.format(record.size),
+                          mock_post.call_args[1]["data"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+
+from mock import patch
+from ccc_client import DtsRunner, DcsRunner, HttpTransport
+from ccc_client.transport import get_default_transport
+
+
+class TestHttpTransport(unittest.TestCase):
+
+    def test_default_transport_is_shared(self):
+        self.assertIs(get_default_transport(), get_default_transport())
+        self.assertIs(DtsRunner().transport, DcsRunner().transport)
+
+    def test_runner_uses_given_transport(self):
+        transport = HttpTransport()
+        runner = DtsRunner(transport=transport)
+        self.assertIs(runner.transport, transport)
+        with patch.object(transport.session, 'get') as mock_get:
+            runner.get("foo")
+            mock_get.assert_called_with(
+                "http://central-gateway.ccc.org:9510/api/v1/dts/file/foo",
+                headers={"Content-Type": "application/json",
+                         "Authorization": "Bearer "}
+            )
+
+    def test_pool_sizes(self):
+        transport = HttpTransport(pool_maxsize=4,
+                                  pool_sizes={"example.org:9510": 32})
+        default = transport.session.get_adapter("http://other.org/")
+        self.assertEqual(default._pool_maxsize, 4)
+        adapter = transport.session.get_adapter(
+            "http://example.org:9510/api/v1/dts/file"
+        )
+        self.assertEqual(adapter._pool_maxsize, 32)
+        adapter = transport.session.get_adapter(
+            "https://example.org:9510/api/v1/dts/file"
+        )
+        self.assertEqual(adapter._pool_maxsize, 32)
+        transport.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,301 @@
+import hashlib
+import io
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+from email.parser import BytesParser
+
+from mock import MagicMock, patch
+from benchmarks.stand_in_server import StandInHandler, start_server, \
+    start_upload_server
+from ccc_client import AppRepoRunner, HttpTransport
+from ccc_client.app_repo.image import HashingReader, ManifestReader, \
+    parse_repo_tag
+
+
+def docker_save_tar(repo_tags):
+    """
+    A small tarball laid out like `docker save` output, manifest last.
+    """
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w") as tar:
+        layer = os.urandom(100 * 1024 + 3)
+        long_name = "a" * 64 + "/" + "b" * 90 + "/layer.tar"
+        manifest = json.dumps([{"Config": "config.json",
+                                "RepoTags": repo_tags,
+                                "Layers": [long_name]}]).encode()
+        for name, data in [(long_name, layer), ("config.json", b"{}"),
+                           ("manifest.json", manifest)]:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+class Pipe(object):
+    """
+    A readable stream that cannot seek, like stdin from `docker save`.
+    """
+    def __init__(self, data, read_size=None):
+        self._buffer = io.BytesIO(data)
+        self.read_size = read_size
+
+    def read(self, size=-1):
+        if self.read_size is not None and (size < 0 or
+                                           size > self.read_size):
+            size = self.read_size
+        return self._buffer.read(size)
+
+
+class RecordingHandler(StandInHandler):
+
+    def do_POST(self):
+        self.server.requests.append(
+            (dict(self.headers), b"".join(self._iter_body()))
+        )
+        self._respond(201, drain=False)
+
+
+class TestChunkedUpload(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.image = os.path.join(self.root, "mock.tar")
+        self.data = os.urandom(10 * 1024 + 17)
+        with open(self.image, "wb") as fh:
+            fh.write(self.data)
+        self.journal = os.path.join(self.root, "upload.journal")
+        self.transport = HttpTransport()
+
+    def tearDown(self):
+        self.transport.close()
+        shutil.rmtree(self.root)
+
+    def upload(self, server):
+        runner = AppRepoRunner("127.0.0.1", server.server_address[1],
+                               transport=self.transport)
+        return runner.upload_image_chunked(self.image, chunk_size=1024,
+                                           jobs=3, journal=self.journal)
+
+    def test_upload(self):
+        server = start_upload_server()
+        try:
+            r = self.upload(server)
+        finally:
+            server.shutdown()
+        self.assertEqual(r.status_code, 201)
+        self.assertEqual(r.json()["imageName"], "mock")
+        self.assertEqual(r.json()["size"], len(self.data))
+        self.assertEqual(r.json()["sha256"],
+                         hashlib.sha256(self.data).hexdigest())
+        self.assertEqual(sorted(server.chunk_puts), list(range(11)))
+        self.assertFalse(os.path.exists(self.journal))
+
+    def test_resume(self):
+        server = start_upload_server(fail_chunks=[2, 7])
+        try:
+            with self.assertRaises(ValueError):
+                self.upload(server)
+            self.assertTrue(os.path.exists(self.journal))
+
+            # only the failed chunks are sent again
+            del server.chunk_puts[:]
+            r = self.upload(server)
+            self.assertEqual(r.status_code, 201)
+            self.assertEqual(sorted(server.chunk_puts), [2, 7])
+            self.assertEqual(r.json()["sha256"],
+                             hashlib.sha256(self.data).hexdigest())
+        finally:
+            server.shutdown()
+
+    def test_restart_unknown_upload(self):
+        server = start_upload_server(fail_chunks=[0])
+        try:
+            with self.assertRaises(ValueError):
+                self.upload(server)
+            # the server has lost the upload; it is started over
+            server.uploads.clear()
+            del server.chunk_puts[:]
+            r = self.upload(server)
+            self.assertEqual(r.status_code, 201)
+            self.assertEqual(sorted(server.chunk_puts), list(range(11)))
+        finally:
+            server.shutdown()
+
+
+class TestStreamUpload(unittest.TestCase):
+
+    def setUp(self):
+        self.server = start_server(RecordingHandler)
+        self.server.requests = []
+        self.transport = HttpTransport()
+        self.runner = AppRepoRunner("127.0.0.1",
+                                    self.server.server_address[1],
+                                    transport=self.transport)
+        self.image = docker_save_tar(
+            ["registry.example.org:5000/tools/bwa:0.7"]
+        )
+
+    def tearDown(self):
+        self.transport.close()
+        self.server.shutdown()
+
+    def parts(self):
+        headers, body = self.server.requests[-1]
+        message = BytesParser().parsebytes(
+            b"Content-Type: " + headers["Content-Type"].encode() +
+            b"\r\n\r\n" + body
+        )
+        return headers, [
+            (part.get_param("name", header="content-disposition"),
+             part.get_payload(decode=True))
+            for part in message.get_payload()
+        ]
+
+    def test_pipe(self):
+        r = self.runner.upload_image(Pipe(self.image, read_size=1000))
+        self.assertEqual(r.status_code, 201)
+        self.assertEqual(r.sha256, hashlib.sha256(self.image).hexdigest())
+        headers, parts = self.parts()
+        self.assertEqual(headers.get("Transfer-Encoding"), "chunked")
+        # the name comes from the manifest, at the end of the stream
+        self.assertEqual(parts, [("file", self.image),
+                                 ("imageName", b"tools/bwa"),
+                                 ("imageTag", b"0.7")])
+
+        self.runner.upload_image(Pipe(self.image), "bwa", None)
+        self.assertEqual(self.parts()[1][1:], [("imageName", b"bwa"),
+                                               ("imageTag", b"0.7")])
+
+        image = docker_save_tar(None)
+        with self.assertRaises(ValueError):
+            self.runner.upload_image(Pipe(image))
+        self.runner.upload_image(Pipe(image), "bwa", None)
+        self.assertEqual(self.parts()[1][1:], [("imageName", b"bwa"),
+                                               ("imageTag", b"latest")])
+
+    def test_file(self):
+        with tempfile.NamedTemporaryFile(suffix=".tar") as fh:
+            fh.write(self.image)
+            fh.flush()
+            r = self.runner.upload_image(fh.name)
+        self.assertEqual(r.sha256, hashlib.sha256(self.image).hexdigest())
+        headers, parts = self.parts()
+        self.assertEqual(int(headers["Content-Length"]),
+                         len(self.server.requests[-1][1]))
+        self.assertEqual(parts, [("file", self.image),
+                                 ("imageName", b"tools/bwa"),
+                                 ("imageTag", b"0.7")])
+
+    def test_readers(self):
+        reader = ManifestReader(Pipe(self.image))
+        self.assertEqual(reader.read(100 * 1024), self.image[:100 * 1024])
+        self.assertEqual(reader.image_name(), (None, None))
+        while reader.read(333):
+            pass
+        self.assertEqual(reader.image_name(), ("tools/bwa", "0.7"))
+
+        hashed = HashingReader(Pipe(self.image))
+        hashed.read(1000)
+        self.assertIsNone(hashed.hexdigest())
+        while hashed.read(4096):
+            pass
+        self.assertEqual(hashed.hexdigest(),
+                         hashlib.sha256(self.image).hexdigest())
+
+        self.assertEqual(parse_repo_tag("bwa"), ("bwa", None))
+        self.assertEqual(parse_repo_tag("tools/bwa:0.7"),
+                         ("tools/bwa", "0.7"))
+        self.assertEqual(parse_repo_tag("localhost:5000/bwa"),
+                         ("bwa", None))
+
+
+class TestLayerPush(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.image = os.path.join(self.root, "image.tar")
+        self.layer_a = os.urandom(5000)
+        self.layer_b = os.urandom(7000)
+        self.config = b'{"architecture": "amd64"}'
+        manifest = json.dumps([{
+            "Config": "abc.json",
+            "RepoTags": ["tools/bwa:0.7"],
+            "Layers": ["a1/layer.tar", "b2/layer.tar", "c3/layer.tar"]
+        }]).encode()
+        with tarfile.open(self.image, mode="w") as tar:
+            for name, data in [("a1/layer.tar", self.layer_a),
+                               ("b2/layer.tar", self.layer_b),
+                               ("abc.json", self.config),
+                               ("manifest.json", manifest)]:
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+            # a layer shared with another image is a link to one copy
+            info = tarfile.TarInfo("c3/layer.tar")
+            info.type = tarfile.SYMTYPE
+            info.linkname = "../a1/layer.tar"
+            tar.addfile(info)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_push_missing_layers(self):
+        def digest(data):
+            return "sha256:" + hashlib.sha256(data).hexdigest()
+
+        registry = "https://docker-centos7:5000/v2/tools/bwa"
+        uploaded = {}
+
+        def mock_head(url, **kwargs):
+            response = MagicMock()
+            found = url == registry + "/blobs/" + digest(self.layer_a)
+            response.status_code = 200 if found else 404
+            return response
+
+        def mock_put(url, **kwargs):
+            if "digest=" in url:
+                uploaded[url.split("digest=")[1]] = kwargs["data"].read()
+            response = MagicMock()
+            response.status_code = 201
+            return response
+
+        with patch('requests.Session.head') as head, \
+                patch('requests.Session.post') as post, \
+                patch('requests.Session.put') as put:
+            head.side_effect = mock_head
+            post.return_value.status_code = 202
+            post.return_value.headers = {
+                "Location": "/v2/tools/bwa/blobs/uploads/1?_state=x"
+            }
+            put.side_effect = mock_put
+            r = AppRepoRunner().push_image_layers(self.image, jobs=2)
+
+            self.assertEqual(head.call_count, 3)
+            self.assertEqual(post.call_count, 2)
+            self.assertEqual(
+                put.call_args_list[0][0][0].split("digest=")[0],
+                registry + "/blobs/uploads/1?_state=x&"
+            )
+            url, kwargs = put.call_args
+        self.assertEqual(uploaded, {digest(self.layer_b): self.layer_b,
+                                    digest(self.config): self.config})
+        self.assertEqual(sorted(r.pushed), sorted(uploaded))
+        self.assertEqual(r.existing, [digest(self.layer_a)])
+
+        self.assertEqual(url[0], registry + "/manifests/0.7")
+        manifest = json.loads(kwargs["data"])
+        self.assertEqual(manifest["config"]["digest"], digest(self.config))
+        self.assertEqual(
+            [(layer["digest"], layer["size"])
+             for layer in manifest["layers"]],
+            [(digest(self.layer_a), 5000), (digest(self.layer_b), 7000),
+             (digest(self.layer_a), 5000)]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,11 @@
+import io
+import json
+import os
+import shutil
 import unittest
 import tempfile
+import threading
+import time
 
 from ccc_client import utils
 
@@ -34,3 +40,125 @@ class TestUtils(unittest.TestCase):
         # pass authToken in file that doesnt exist
         with self.assertRaises(IOError):
             result = utils.parseAuthToken(self.invalid_filepath)
+
+    def test_iter_filepath_from_pattern(self):
+        root = tempfile.mkdtemp()
+        try:
+            for relpath in ["a.bam", "x/b.bam", "x/y/c.bam", "x/y/d.vcf"]:
+                filepath = os.path.join(root, relpath)
+                if not os.path.isdir(os.path.dirname(filepath)):
+                    os.makedirs(os.path.dirname(filepath))
+                open(filepath, "w").close()
+
+            result = utils.iter_filepath_from_pattern(
+                os.path.join(root, "**", "*.bam")
+            )
+            self.assertFalse(isinstance(result, list))
+            self.assertEqual(
+                sorted(result),
+                [os.path.join(root, p)
+                 for p in ["a.bam", "x/b.bam", "x/y/c.bam"]]
+            )
+
+            # overlapping patterns only yield each file once
+            result = list(utils.iter_filepath_from_pattern([
+                os.path.join(root, "x", "**", "*"),
+                os.path.join(root, "x", "y", "*.vcf")
+            ]))
+            self.assertEqual(len(result), len(set(result)))
+            self.assertIn(os.path.join(root, "x/y/d.vcf"), result)
+
+            with self.assertRaises(ValueError):
+                list(utils.iter_filepath_from_pattern(
+                    os.path.join(root, "**", "*.cram")
+                ))
+        finally:
+            shutil.rmtree(root)
+
+    def test_chunked(self):
+        self.assertEqual(list(utils.chunked(iter(range(7)), 3)),
+                         [[0, 1, 2], [3, 4, 5], [6]])
+        self.assertEqual(list(utils.chunked([], 3)), [])
+
+    def test_iter_lines(self):
+        lines = tempfile.NamedTemporaryFile(mode="w", delete=False)
+        lines.write("/a/b\n\n  /c/d  \n")
+        lines.close()
+        self.assertEqual(list(utils.iter_lines(lines.name)),
+                         ["/a/b", "/c/d"])
+        self.assertEqual(list(utils.iter_lines(lines.name, strip=False)),
+                         ["/a/b", "  /c/d  "])
+        os.remove(lines.name)
+
+    def test_tsv_writer(self):
+        out = io.StringIO()
+        with utils.TsvWriter(out, buffer_rows=2) as writer:
+            writer.writerow("/a", "x")
+            self.assertEqual(out.getvalue(), "")
+            writer.writerow("/b", "y")
+            writer.writerow("/c", "z")
+        self.assertEqual(out.getvalue(), "/a\tx\n/b\ty\n/c\tz\n")
+
+    def test_ndjson_result(self):
+        class Response(object):
+            status_code = 200
+            text = '{"cccId": "a"}'
+        self.assertEqual(
+            json.loads(utils.ndjson_result({"cccId": "a"}, Response())),
+            {"cccId": "a", "status": 200, "body": {"cccId": "a"}}
+        )
+        Response.status_code = 404
+        Response.text = "Not Found"
+        self.assertEqual(
+            json.loads(utils.ndjson_result({"cccId": "a"}, Response())),
+            {"cccId": "a", "status": 404, "body": "Not Found"}
+        )
+        self.assertEqual(
+            json.loads(utils.ndjson_result({"cccId": "a"},
+                                           error=IOError("boom"))),
+            {"cccId": "a", "error": repr(IOError("boom"))}
+        )
+
+    def test_journal(self):
+        root = tempfile.mkdtemp()
+        path = os.path.join(root, "journal")
+        with utils.Journal(path) as journal:
+            journal.add("a")
+            journal.add("b")
+            journal.add("a")
+        with utils.Journal(path) as journal:
+            self.assertIn("a", journal)
+            self.assertNotIn("c", journal)
+            self.assertEqual(len(journal), 2)
+        with open(path) as fh:
+            self.assertEqual(fh.read(), "a\nb\n")
+        shutil.rmtree(root)
+
+    def test_bounded_map(self):
+        lock = threading.Lock()
+        state = {"running": 0, "peak": 0}
+
+        def work(i):
+            with lock:
+                state["running"] += 1
+                state["peak"] = max(state["peak"], state["running"])
+            time.sleep(0.01 * (i % 3))
+            with lock:
+                state["running"] -= 1
+            if i == 5:
+                raise ValueError(i)
+            return i * 2
+
+        results = list(utils.bounded_map(work, iter(range(20)), jobs=3))
+        self.assertLessEqual(state["peak"], 3)
+        self.assertEqual(sorted(r[0] for r in results), list(range(20)))
+        for item, result, error in results:
+            if item == 5:
+                self.assertIsInstance(error, ValueError)
+            else:
+                self.assertEqual(result, item * 2)
+
+        # ordered mode preserves input order
+        results = utils.bounded_map(lambda i: i, range(20), jobs=4,
+                                    ordered=True)
+        self.assertEqual([r[1] for r in results], list(range(20)))
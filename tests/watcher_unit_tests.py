@@ -0,0 +1,152 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from mock import MagicMock, patch
+from ccc_client import DtsRunner
+from ccc_client.dts.watcher import Watcher
+
+
+class TestWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        with open(os.path.join(self.root, "old.bam"), "w") as fh:
+            fh.write("old")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def check_watcher(self, poll):
+        watcher = Watcher(self.root, settle=0.1, interval=0.05, poll=poll)
+        if not poll and watcher.inotify is None:
+            watcher.close()
+            self.skipTest("inotify is not available")
+        batches = watcher.batches(batch_size=1)
+        try:
+            sub_dir = os.path.join(self.root, "run1")
+            os.makedirs(sub_dir)
+            for name in ["b.bam", "a.bam"]:
+                with open(os.path.join(sub_dir, name), "w") as fh:
+                    fh.write(name)
+            found = next(batches) + next(batches)
+        finally:
+            batches.close()
+            watcher.close()
+        self.assertEqual(found, [os.path.join(sub_dir, "a.bam"),
+                                 os.path.join(sub_dir, "b.bam")])
+
+    def test_inotify(self):
+        self.check_watcher(poll=False)
+
+    def test_poll(self):
+        self.check_watcher(poll=True)
+
+    def test_settle(self):
+        watcher = Watcher(self.root, settle=60, poll=True)
+        path = os.path.join(self.root, "new.bam")
+        with open(path, "w") as fh:
+            fh.write("new")
+        watcher._add_tree(self.root)
+        self.assertEqual(watcher._settled(), [])
+        self.assertIn(path, watcher.candidates)
+        self.assertNotIn(os.path.join(self.root, "old.bam"),
+                         watcher.candidates)
+
+    def test_dts_watch(self):
+        dts_client = DtsRunner()
+        with patch('requests.Session.post') as mock_post:
+            mock_post.return_value.status_code = 201
+            results = dts_client.watch(self.root, "ohsu", "tester",
+                                       settle=0.1, interval=0.05, poll=True)
+            path = os.path.join(self.root, "new.bam")
+            with open(path, "w") as fh:
+                fh.write("new")
+            filepath, r, error = next(results)
+            results.close()
+            self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(filepath, path)
+        self.assertIsNone(error)
+
+    def test_dts_watch_retry(self):
+        dts_client = DtsRunner()
+        failed, created = MagicMock(), MagicMock()
+        failed.status_code = 500
+        created.status_code = 201
+        with patch('requests.Session.post') as mock_post, \
+                patch('requests.Session.get') as mock_get:
+            mock_post.side_effect = [failed, created]
+            mock_get.return_value.status_code = 404
+            results = dts_client.watch(self.root, "ohsu", "tester",
+                                       settle=0.1, interval=0.05, poll=True)
+            path = os.path.join(self.root, "new.bam")
+            with open(path, "w") as fh:
+                fh.write("new")
+            first = next(results)
+            second = next(results)
+            results.close()
+            self.assertEqual(mock_post.call_count, 2)
+        self.assertEqual([first[0], first[1].status_code],
+                         [path, 500])
+        self.assertEqual([second[0], second[1].status_code],
+                         [path, 201])
+
+    def test_dts_watch_no_retry(self):
+        dts_client = DtsRunner()
+        conflict, created = MagicMock(), MagicMock()
+        conflict.status_code = 409
+        created.status_code = 201
+        with patch('requests.Session.post') as mock_post, \
+                patch('requests.Session.get') as mock_get:
+            mock_post.side_effect = [conflict, created]
+            mock_get.return_value.status_code = 404
+            results = dts_client.watch(self.root, "ohsu", "tester",
+                                       settle=0.1, interval=0.05, poll=True)
+            paths = [os.path.join(self.root, n) for n in ["a.bam", "b.bam"]]
+            with open(paths[0], "w") as fh:
+                fh.write("a")
+            first = next(results)
+            with open(paths[1], "w") as fh:
+                fh.write("b")
+            second = next(results)
+            results.close()
+            self.assertEqual(mock_post.call_count, 2)
+        self.assertEqual([first[0], second[0]], paths)
+
+    def test_retry_limit(self):
+        watcher = Watcher(self.root, settle=1, poll=True, max_retries=2)
+        path = os.path.join(self.root, "new.bam")
+        with open(path, "w") as fh:
+            fh.write("new")
+        self.assertTrue(watcher.retry(path))
+        # held back for longer than the settle time
+        self.assertEqual(watcher._settled(), [])
+        self.assertGreater(watcher.candidates[path][2], time.time())
+        self.assertTrue(watcher.retry(path))
+        self.assertFalse(watcher.retry(path))
+        self.assertIn(path, watcher.known)
+        self.assertNotIn(path, watcher.candidates)
+
+    def test_forget_deleted(self):
+        watcher = Watcher(self.root, settle=0, poll=True)
+        old = os.path.join(self.root, "old.bam")
+        self.assertIn(old, watcher.known)
+        os.remove(old)
+        watcher._add_tree(self.root)
+        self.assertNotIn(old, watcher.known)
+
+        path = os.path.join(self.root, "new.bam")
+        with open(path, "w") as fh:
+            fh.write("new")
+        watcher._add_tree(self.root)
+        watcher._settled()
+        self.assertEqual(watcher._settled(), [path])
+        watcher.done(path)
+        watcher._forget(path)
+        self.assertEqual(watcher.known, set())
+
+
+if __name__ == '__main__':
+    unittest.main()